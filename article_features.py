@@ -0,0 +1,537 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Artikel-Merkmale, die sowohl die Pipeline (scripts/) als auch
+# die Streamlit-Apps (demo8.py, demo9.py) brauchen. Liegen hier an einer Stelle,
+# damit offline berechnete Artefakte dieselben Kategorien sehen wie die App.
+# ---------------------------------------------------------
+PRODUCT_TYPE_TO_MACRO = {
+    "Hoodie": "TOP", "Sweater": "TOP", "Top": "TOP", "T-shirt": "TOP", "Shirt": "TOP",
+    "Polo shirt": "TOP", "Blouse": "TOP", "Cardigan": "TOP", "Vest top": "TOP",
+    "Sweatshirt": "TOP", "Long sleeve top": "TOP", "Longsleeve": "TOP",
+    "Trousers": "BOTTOM", "Jeans": "BOTTOM", "Shorts": "BOTTOM", "Skirt": "BOTTOM", "Leggings/Tights": "BOTTOM",
+    "Jacket": "OUTERWEAR", "Coat": "OUTERWEAR", "Blazer": "OUTERWEAR",
+    "Sneakers": "SHOES", "Boots": "SHOES", "Bootie": "SHOES", "Ballerinas": "SHOES",
+    "Moccasins": "SHOES", "Pumps": "SHOES", "Heels": "SHOES", "Heeled sandals": "SHOES",
+    "Sandals": "SHOES", "Flat shoe": "SHOES", "Flat shoes": "SHOES", "Flip flop": "SHOES", "Other shoe": "SHOES",
+    "Cap": "ACCESSORY", "Beanie": "ACCESSORY", "Headband": "ACCESSORY", "Hat/beanie": "ACCESSORY",
+    "Hat/brim": "ACCESSORY", "Straw hat": "ACCESSORY", "Felt hat": "ACCESSORY", "Bucket hat": "ACCESSORY", "Bag": "ACCESSORY",
+}
+
+MACRO_DISPLAY_ORDER = ["ACCESSORY", "TOP", "OUTERWEAR", "BOTTOM", "SHOES"]
+
+
+def fix_outerwear_mislabels(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    
+    # 1) Konkrete bekannte Fehlklassifikation korrigieren
+    jacket_ids = [176209023]  # Mr Harrington w/hood
+    df.loc[df["article_id"].isin(jacket_ids), "macro_category"] = "OUTERWEAR"
+    df.loc[df["article_id"].isin(jacket_ids), "product_type_name"] = "Jacket"
+
+    # 2) Generische Regel: Texte enthalten "jacket"/"coat"/"parka" etc.
+    jacket_keywords = ["jacket", "coat", "parka", "anorak", "puffer"]
+    mask_text = (
+        df["detail_desc"].str.lower().fillna("").str.contains("|".join(jacket_keywords))
+        | df["prod_name"].str.lower().fillna("").str.contains("|".join(jacket_keywords))
+    )
+    # Nur Oberkörper-Gruppen umlabeln, die bisher kein OUTERWEAR sind
+    mask_group = df["product_group_name"].str.contains("Garment Upper body", na=False)
+    mask = mask_text & mask_group & (df["macro_category"] != "OUTERWEAR")
+
+    df.loc[mask, "macro_category"] = "OUTERWEAR"
+    # product_type_name kannst du optional lassen oder pauschal auf "Jacket" setzen
+    # df.loc[mask, "product_type_name"] = "Jacket"
+
+    return df
+
+
+def get_macro_by_article(df_articles: pd.DataFrame) -> pd.Series:
+    """
+    article_id -> macro_category, wie in demo9.load_data berechnet
+    (Mapping über product_type_name + Outerwear-Korrektur).
+    Artikel ohne Makrokategorie fehlen im Ergebnis.
+    """
+    df = df_articles
+    if "macro_category" not in df.columns:
+        df = df.assign(macro_category=df["product_type_name"].map(PRODUCT_TYPE_TO_MACRO))
+        df = fix_outerwear_mislabels(df)
+    macro = pd.Series(df["macro_category"].to_numpy(), index=df["article_id"].astype("int64").to_numpy())
+    return macro.dropna()
+
+
+# ---------------------------------------------------------
+# Farb-Familien, Gender, Stil (demo9) und Stil-/Funktionstyp (demo8)
+#
+# Werden offline einmal für alle Artikel berechnet
+# (scripts/build_article_features.py -> data_processed/articles_store/).
+# Die Apps brauchen sie nur noch für Artikel, die nicht aus dem
+# Artefakt kommen (z. B. das hochgeladene Foto in demo9).
+# ---------------------------------------------------------
+COLOR_PALETTES = {
+    "beige": ["dark green", "dark blue", "denim blue", "white", "black", "brown", "khaki", "red"],
+    "black": ["white", "beige", "grey", "light grey", "silver", "gold", "red", "light blue", "pink", "khaki"],
+    "white": ["black", "blue", "dark blue", "beige", "grey", "silver", "denim blue", "khaki", "pink", "red"],
+    "off white": ["black", "blue", "dark blue", "beige", "brown", "khaki", "grey"],
+    "grey": ["white", "black", "light pink", "pink", "blue", "denim blue", "dark blue", "red", "purple"],
+    "dark grey": ["white", "black", "light pink", "yellow", "light blue", "grey"],
+    "blue": ["white", "beige", "grey", "black", "yellow", "orange", "silver"],
+    "dark blue": ["white", "beige", "grey", "yellow", "gold", "red", "denim blue", "black"], 
+    "light blue": ["dark blue", "white", "beige", "pink", "silver", "grey"],
+    "red": ["black", "white", "dark blue", "denim blue", "beige", "grey"],
+    "dark red": ["black", "beige", "grey", "white", "dark blue"],
+    "pink": ["grey", "white", "dark blue", "denim blue", "black", "silver"],
+    "green": ["beige", "white", "black", "navy", "denim blue", "yellow"],
+    "dark green": ["beige", "gold", "brown", "white", "black", "grey"],
+    "khaki": ["white", "black", "orange", "red", "denim blue"],
+    "yellow": ["blue", "grey", "white", "black", "navy", "denim blue"],
+    "orange": ["blue", "white", "black", "grey", "khaki"],
+    "brown": ["beige", "white", "blue", "denim blue", "green", "dark green", "black"],
+    "gold": ["black", "white", "dark green", "dark red", "dark blue"],
+    "silver": ["black", "white", "blue", "grey", "pink"],
+}
+
+
+# Farb-Familien für die UI (vereinfacht aus demo8)
+COLOR_FAMILY_MAP_UI = {
+    # Beige / Braun
+    "beige": "Beige/Brown",
+    "dark beige": "Beige/Brown",
+    "light beige": "Beige/Brown",
+    "greyish beige": "Beige/Brown",
+    "yellowish brown": "Beige/Brown",
+    "brown": "Beige/Brown",
+    "dark brown": "Beige/Brown",
+    "light brown": "Beige/Brown",
+    "khaki": "Beige/Brown",
+
+    # Schwarz / Weiß / Grau
+    "black": "Black",
+    "white": "White",
+    "off white": "White",
+    "grey": "Grey",
+    "gray": "Grey",
+    "dark grey": "Grey",
+    "light grey": "Grey",
+
+    # Blau
+    "blue": "Blue",
+    "dark blue": "Blue",
+    "light blue": "Blue",
+    "navy": "Blue",
+    "denim blue": "Blue",
+
+    # Rot / Pink
+    "red": "Red",
+    "dark red": "Red",
+    "light red": "Red",
+    "other red": "Red",
+    "pink": "Pink",
+    "dark pink": "Pink",
+    "light pink": "Pink",
+    "other pink": "Pink",
+
+    # Grün
+    "green": "Green",
+    "dark green": "Green",
+    "light green": "Green",
+    "other green": "Green",
+    "lime": "Green",
+    "olive": "Green",
+
+    # Gelb
+    "yellow": "Yellow",
+    "dark yellow": "Yellow",
+    "light yellow": "Yellow",
+    "other yellow": "Yellow",
+
+    # Orange
+    "orange": "Orange",
+    "dark orange": "Orange",
+    "light orange": "Orange",
+    "other orange": "Orange",
+
+    # Lila
+    "purple": "Purple",
+    "dark purple": "Purple",
+    "light purple": "Purple",
+    "lilac": "Purple",
+
+    # Metallic / Spezial
+    "gold": "Metallic",
+    "silver": "Metallic",
+    "metallic": "Metallic",
+
+    # Bunt / Sonstiges
+    "multi": "Multicolour",
+    "multicolour": "Multicolour",
+    "multi coloured": "Multicolour",
+    "other": "Other/Unknown",
+    "unknown": "Other/Unknown",
+}
+
+def get_color_family_ui(name: str) -> str:
+    """
+    Liefert die 'schönen' Farbfamilien wie in demo8 für die UI.
+    Input kann z.B. 'dark blue' oder 'beige' sein.
+    """
+    name = (name or "").strip().lower()
+    if not name:
+        return "Other/Unknown"
+    if name in COLOR_FAMILY_MAP_UI:
+        return COLOR_FAMILY_MAP_UI[name]
+    # Fallback: Einfach lesbar machen
+    return name.title()
+
+
+
+BUSINESS_TYPES = ['Blazer', 'Shirt', 'Blouse', 'Trousers', 'Skirt', 'Coat', 'Pumps', 'Heels', 'Loafers', 'Boots', 'Polo shirt']
+ANTI_BUSINESS_KEYWORDS = ['jogger', 'sweat', 'runner', 'loose', 'relaxed', 'cargo', 'denim', 'jeans']
+SPORT_KEYWORDS = ['sport', 'running', 'training', 'gym', 'racer', 'seamless', 'leggings', 'bra', 'technical', 'yoga']
+PARTY_KEYWORDS = ['sequin', 'glitter', 'sparkle', 'metallic', 'satin', 'velvet', 'tuxedo', 'suit', 'dressy', 'party', 'rhinestone']
+LOUNGE_KEYWORDS = ['pyjama', 'robe', 'sleep', 'night', 'fleece', 'soft', 'home', 'slipper', 'jogger', 'hoodie']
+
+def get_color_family(name: str) -> str:
+    name = (name or "").lower().strip()
+    if not name or name == "nan": return "other"
+    for k in COLOR_PALETTES.keys():
+        if k in name: return k
+    return name
+
+
+def assign_gender(idx_name):
+    idx = str(idx_name)
+    if 'Menswear' in idx: return 'Herren'
+    if 'Baby' in idx or 'Children' in idx: return 'Kinder'
+    return 'Damen'
+
+
+def get_style(row):
+    """Grober Stil für demo9 (Kids/Sport/Lounge/Party/Business/Casual)."""
+    idx = str(row['index_name'])
+    pt = str(row['product_type_name'])
+    name = str(row['prod_name']).lower()
+    if 'Baby' in idx or 'Children' in idx: return 'Kids'
+    if 'Sport' in idx or pt in ('Sneakers', 'Leggings/Tights') or any(k in name for k in SPORT_KEYWORDS): return 'Sport'
+    if any(k in name for k in LOUNGE_KEYWORDS): return 'Lounge'
+    if any(k in name for k in PARTY_KEYWORDS) or ('gold' in str(row['colour_group_name']).lower()): return 'Party'
+    if pt in BUSINESS_TYPES:
+        if 'Divided' in idx or any(k in name for k in ANTI_BUSINESS_KEYWORDS): return 'Casual'
+        return 'Business'
+    return 'Casual'
+
+
+# sehr robuste Erkennung für Jacken/Mäntel
+def is_outerwear_like(row):
+    macro = str(row.get("macro_category", "") or "")
+    if macro == "OUTERWEAR":
+        return True
+
+    pt = str(row.get("product_type_name", "") or "").lower()
+    name = str(row.get("prod_name", "") or "").lower()
+
+    keywords = [
+        "jacket", "coat", "parka", "anorak", "blazer",
+        "outerwear", "puffer", "down jacket", "windbreaker"
+    ]
+
+    if any(k in pt for k in keywords):
+        return True
+    if any(k in name for k in keywords):
+        return True
+
+    return False
+
+
+STYLE_KEYWORDS = {
+    'SPORT': {'sport':3, 'running':3, 'gym':3, 'seamless':2, 'dry':2, 'leggings':1, 'bra':1},
+    'ELEGANT': {'blazer':3, 'suit':3, 'tailored':3, 'satin':2, 'silk':2, 'blouse':2, 'pump':3, 'loafer':3},
+    'STREETWEAR': {'hoodie':3, 'sweatshirt':3, 'oversized':2, 'relaxed':1, 'cargo':2, 'sneakers':2, 'cap':2, 'bucket':2},
+    'SUMMER': {'linen':3, 'bikini':3, 'swim':3, 'shorts':2, 'sandal':3, 'straw':3, 'hat':1},
+    'CASUAL': {'denim':2, 'jeans':2, 't-shirt':2, 'basic':2, 'jersey':1, 'cardigan':1, 'knit':1}
+}
+
+def get_style_category_v2(row):
+    text = " ".join([
+        str(row.get('product_type_name','') or ''),
+        str(row.get('prod_name','') or ''),
+        str(row.get('detail_desc','') or ''),
+        str(row.get('index_name','') or ''),
+    ]).lower()
+
+    scores = {k: 0.0 for k in STYLE_KEYWORDS}
+    for style, tokens in STYLE_KEYWORDS.items():
+        for token, weight in tokens.items():
+            if token in text:
+                scores[style] += weight
+
+    best_style = max(scores, key=scores.get)
+    if scores[best_style] == 0:
+        return 'CASUAL'
+    return best_style
+
+def get_functional_type(row):
+    p_type = str(row.get('product_type_name', '')).lower()
+    desc = str(row.get('detail_desc', '')).lower()
+
+    if p_type in ['coat']:
+        return 'HEAVY_OUTER'
+    if p_type == 'jacket':
+        if any(x in desc for x in ['padded', 'down', 'wool', 'warm', 'lined', 'puffer', 'heavy', 'faux fur', 'shearling']):
+            return 'HEAVY_OUTER'
+
+    if p_type in ['beanie', 'hat/beanie', 'scarf', 'gloves']:
+        return 'WINTER_ACC'
+    if p_type in ['boots', 'bootie']:
+        return 'WINTER_SHOES'
+    if p_type in ['sweater', 'cardigan']:
+        if any(x in desc for x in ['wool', 'cashmere', 'knit', 'heavy', 'warm', 'mohair']):
+            return 'WINTER_TOP'
+
+    if p_type in ['sandals', 'flip flop', 'heeled sandals', 'mules']:
+        return 'SUMMER_SHOES'
+    if p_type in ['straw hat', 'cap', 'bucket hat', 'visor']:
+        return 'SUMMER_ACC'
+    if p_type in ['shorts', 'vest top', 'crop top', 'bikini', 'swimsuit']:
+        return 'SUMMER_WEAR'
+    if p_type == 'skirt':
+        if 'linen' in desc or 'short' in desc or 'mini' in desc:
+            return 'SUMMER_WEAR'
+    if p_type == 'dress':
+        if any(x in desc for x in ['linen', 'sleeveless', 'straps', 'viscose', 'beach']):
+            return 'SUMMER_WEAR'
+
+    if 'linen' in desc:
+        return 'SUMMER_WEAR'
+
+    if 'leggings' in p_type or 'tights' in p_type:
+        return 'LEGGINGS'
+    if p_type in ['blazer', 'suit']:
+        return 'FORMAL_LAYER'
+
+    return 'STANDARD'
+
+
+# ---------------------------------------------------------
+# Gemessene Bildfarbe
+#
+# Jeder Pixel (Bild auf 50x50 verkleinert, mittlere 60 % ausgeschnitten)
+# zählt für die nächstgelegene Farbe aus DOMINANT_COLORS; kräftige,
+# nicht-neutrale Pixel zählen dreifach. Wird offline für den ganzen
+# Katalog gerechnet (scripts/build_image_colors.py) und in demo9 für
+# hochgeladene Fotos ("Match my Closet").
+# ---------------------------------------------------------
+DOMINANT_COLORS = {
+    "black": (0, 0, 0), "white": (255, 255, 255), "grey": (128, 128, 128),
+    "red": (255, 0, 0), "blue": (0, 0, 255), "navy": (0, 0, 128), "green": (0, 128, 0),
+    "yellow": (255, 255, 0), "beige": (245, 245, 220), "brown": (165, 42, 42),
+    "pink": (255, 192, 203), "orange": (255, 165, 0), "purple": (128, 0, 128),
+    "turquoise": (64, 224, 208)
+}
+NEUTRAL_COLORS = ["white", "grey", "black", "beige"]
+# Gemessene Farbe -> Farbfamilie wie in COLOR_PALETTES (demo9)
+DOMINANT_TO_FAMILY = {"navy": "dark blue", "turquoise": "light blue"}
+# Farbhistogramm in % pro DOMINANT_COLORS (article_colors.csv, articles_store)
+HIST_COLUMNS = [f"hist_{name}" for name in DOMINANT_COLORS]
+# Spalten aus article_colors.csv, die ins Artikel-Artefakt übernommen werden
+COLOR_COLUMNS = ["article_id", "colour_family_measured", "dominant_share"] + HIST_COLUMNS
+
+_PALETTE = np.array(list(DOMINANT_COLORS.values()), dtype=np.float32)
+_NEUTRAL_IDX = [list(DOMINANT_COLORS).index(name) for name in NEUTRAL_COLORS]
+
+
+def prepare_color_pixels(image) -> np.ndarray:
+    """PIL-Bild -> RGB-Array der Bildmitte (30x30x3, uint8)."""
+    img = image.convert("RGB").resize((50, 50))
+    w, h = img.size
+    img = img.crop((w*0.2, h*0.2, w*0.8, h*0.8))
+    return np.asarray(img)
+
+
+def color_histogram(rgb: np.ndarray) -> np.ndarray:
+    """Gewichtete Pixelzahl pro Farbe (Reihenfolge wie DOMINANT_COLORS) für ein RGB-Array (..., 3)."""
+    pixels = rgb.reshape(-1, 3).astype(np.float32)
+    dist = ((pixels[:, None, :] - _PALETTE[None, :, :]) ** 2).sum(axis=2)
+    best = dist.argmin(axis=1)
+
+    # Sättigung und Helligkeit wie colorsys.rgb_to_hsv
+    v = pixels.max(axis=1) / 255
+    s = np.where(v > 0, (v - pixels.min(axis=1) / 255) / np.maximum(v, 1e-9), 0)
+    vivid = (s > 0.1) & (v > 0.2) & (v < 0.9) & ~np.isin(best, _NEUTRAL_IDX)
+    return np.bincount(best, weights=np.where(vivid, 3, 1), minlength=len(_PALETTE))
+
+
+def get_dominant_color_name(image) -> str:
+    """Dominante Farbe eines PIL-Bildes (Name aus DOMINANT_COLORS)."""
+    hist = color_histogram(prepare_color_pixels(image))
+    if hist.sum() == 0:
+        return "grey"
+    return list(DOMINANT_COLORS)[int(hist.argmax())]
+
+
+# ---------------------------------------------------------
+# Popularität (scripts/build_article_popularity.py)
+#
+# Statt Fallbacks per DataFrame.sample zu ziehen, wird pro Segment
+# (z. B. gender + macro_category) einmal ein nach Popularität sortiertes
+# Array von Zeilenpositionen gebaut; pro Anfrage werden davon nur die
+# ersten Einträge gelesen. Sortiert wird nach sales_4w, dann sales.
+# ---------------------------------------------------------
+POPULARITY_COLUMNS = ["sales", "buyers", "sales_4w", "median_price"]
+
+
+def add_popularity(df: pd.DataFrame, df_popularity: pd.DataFrame) -> pd.DataFrame:
+    """Hängt die Verkaufsstatistik an; Artikel ohne Verkäufe bekommen 0 (median_price NaN)."""
+    df = df.drop(columns=[c for c in POPULARITY_COLUMNS if c in df.columns])
+    df = df.merge(df_popularity[["article_id"] + POPULARITY_COLUMNS], on="article_id", how="left")
+    for col in ["sales", "buyers", "sales_4w"]:
+        df[col] = df[col].fillna(0).astype(np.int64)
+    df["median_price"] = df["median_price"].astype(np.float32)
+    return df
+
+
+def popularity_order(df: pd.DataFrame) -> np.ndarray:
+    """Zeilenpositionen von df, beliebteste zuerst (ohne Popularität: Reihenfolge von df)."""
+    positions = np.arange(len(df))
+    if "sales" not in df.columns:
+        return positions
+    return np.lexsort((positions, -df["sales"].to_numpy(), -df["sales_4w"].to_numpy()))
+
+
+def segment_rankings(df: pd.DataFrame, by: list) -> dict:
+    """
+    Segment -> Zeilenpositionen (für df.iloc), beliebteste zuerst.
+    Schlüssel wie bei groupby: bei einer Spalte der Wert, sonst ein Tupel.
+    """
+    order = popularity_order(df)
+    groups = df.iloc[order].groupby(by if len(by) > 1 else by[0], sort=False, observed=True).indices
+    return {key: order[idx] for key, idx in groups.items()}
+
+
+def pick_popular(ranked: np.ndarray, article_ids: np.ndarray, n: int, exclude=()) -> np.ndarray:
+    """Die ersten n Positionen aus ranked, deren article_id nicht in exclude liegt."""
+    exclude = list(exclude)
+    head = np.asarray(ranked[:n + len(exclude)], dtype=np.int64)
+    if exclude:
+        head = head[~np.isin(article_ids[head], exclude)]
+    return head[:n]
+
+
+# ---------------------------------------------------------
+# Artikel-Artefakt (scripts/build_article_features.py)
+#
+# Alle oben definierten Merkmale einmal offline für den ganzen Katalog:
+#   macro_category, gender, colour_family, colour_family_ui, style,
+#   is_outerwear (demo9) sowie style_category, functional_type (demo8)
+#   (+ gemessene Bildfarbe mit Farbhistogramm hist_<farbe> als float16,
+#   NaN = kein Bild gemessen, und Verkaufsstatistik, falls vorhanden)
+# gespeichert als Ordner mit .npy-Dateien: Text-Spalten als
+# Kategorie-Codes + Kategorien, bool/Zahlen unverändert. Die Apps
+# blenden die Dateien per mmap ein statt read_csv + zeilenweisem apply.
+# ---------------------------------------------------------
+def build_article_features(df_articles: pd.DataFrame, df_colors: pd.DataFrame = None,
+                           df_popularity: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Artikel + alle Merkmale, wie demo9.load_data sie berechnet.
+    df_colors: gemessene Bildfarben (article_colors.csv) oder None.
+    df_popularity: Verkaufsstatistik (article_popularity.csv) oder None.
+    """
+    df = df_articles.copy()
+    df["article_id"] = df["article_id"].astype("int64")
+    df["article_id_str"] = df["article_id"].astype(str).str.zfill(10)
+
+    df["macro_category"] = df["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
+    df = fix_outerwear_mislabels(df)
+
+    df["gender"] = df["index_name"].apply(assign_gender)
+    df["colour_family"] = df["colour_group_name"].apply(get_color_family)
+
+    # Gemessene Bildfarbe ersetzt grobe Katalogfarben ("other", "multi", ...)
+    if df_colors is not None:
+        df = df.merge(df_colors[[c for c in COLOR_COLUMNS if c in df_colors.columns]], on="article_id", how="left")
+        coarse = ~df["colour_family"].isin(list(COLOR_PALETTES)) & df["colour_family_measured"].notna()
+        df.loc[coarse, "colour_family"] = df.loc[coarse, "colour_family_measured"]
+        # Histogramm kompakt (ganze Prozent passen exakt in float16)
+        for col in HIST_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype(np.float16)
+
+    df["colour_family_ui"] = df["colour_family"].apply(get_color_family_ui)
+    df["style"] = df.apply(get_style, axis=1)
+    df["is_outerwear"] = df.apply(is_outerwear_like, axis=1).astype(bool)
+
+    df["style_category"] = df.apply(get_style_category_v2, axis=1)
+    df["functional_type"] = df.apply(get_functional_type, axis=1)
+
+    if df_popularity is not None:
+        df = add_popularity(df, df_popularity)
+    return df
+
+
+def save_article_artifact(df: pd.DataFrame, store_dir):
+    """
+    Schreibt df als Ordner mit einer .npy-Datei pro Spalte + meta.json.
+    Text-Spalten werden kategorisch gespeichert (<spalte>.codes.npy +
+    <spalte>.categories.npy); Spalten mit lauter verschiedenen Werten ohne
+    Lücken (z. B. article_id_str) als feste Strings. Der Ordner wird
+    erst komplett daneben geschrieben und dann ausgetauscht.
+    """
+    store_dir = Path(store_dir)
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    columns = []
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_numeric_dtype(s.dtype) and not isinstance(s.dtype, pd.CategoricalDtype):
+            np.save(tmp_dir / f"{col}.npy", s.to_numpy())
+            columns.append({"name": col, "kind": "array"})
+        elif s.notna().all() and s.nunique() == len(s):
+            np.save(tmp_dir / f"{col}.npy", np.asarray(s.astype(str), dtype=str))
+            columns.append({"name": col, "kind": "array"})
+        else:
+            cat = s.astype("category")
+            np.save(tmp_dir / f"{col}.codes.npy", cat.cat.codes.to_numpy())
+            np.save(tmp_dir / f"{col}.categories.npy", np.asarray(cat.cat.categories.astype(str), dtype=str))
+            columns.append({"name": col, "kind": "category"})
+
+    with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"n_rows": int(len(df)), "columns": columns}, f, indent=2)
+
+    # Laufende Apps behalten ihre (gelöschten) Dateien per mmap, bis sie neu laden
+    old_dir = store_dir.with_name(store_dir.name + ".old")
+    if store_dir.exists():
+        store_dir.rename(old_dir)
+    tmp_dir.rename(store_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+
+
+def load_article_artifact(store_dir, mmap_mode: str = "r") -> pd.DataFrame:
+    """
+    Artefakt aus save_article_artifact als DataFrame (Text-Spalten als
+    pd.Categorical). Mit mmap_mode="r" zeigen Zahlen-, bool- und
+    Code-Spalten direkt auf die read-only eingeblendeten Dateien: alle
+    Sessions und Server-Prozesse teilen sich dieselben Seiten im
+    Page-Cache. Nur Kategorien und feste Strings werden kopiert.
+    """
+    store_dir = Path(store_dir)
+    with open(store_dir / "meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    out = {}
+    for column in meta["columns"]:
+        col = column["name"]
+        if column["kind"] == "category":
+            codes = np.load(store_dir / f"{col}.codes.npy", mmap_mode=mmap_mode)
+            categories = np.load(store_dir / f"{col}.categories.npy")
+            out[col] = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            out[col] = np.load(store_dir / f"{col}.npy", mmap_mode=mmap_mode)
+    return pd.DataFrame(out, columns=[c["name"] for c in meta["columns"]], copy=False)
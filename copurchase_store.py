@@ -0,0 +1,604 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from article_features import MACRO_DISPLAY_ORDER, PRODUCT_TYPE_TO_MACRO
+
+# ---------------------------------------------------------
+# Co-Purchase-Artefakte für die Apps
+#
+# Top-K-Partnerlisten: pro Basisartikel und Ziel-Makrokategorie
+# (TOP/BOTTOM/SHOES/OUTERWEAR/ACCESSORY) die K am häufigsten
+# gemeinsam gekauften Partner. Die Apps lesen damit z. B. direkt
+# "die K besten Hosen zu diesem Top", statt alle Paare eines Artikels
+# zu holen und erst danach nach Kategorie zu filtern.
+#
+# Neben count (alle Zeiten) gibt es Zeitfenster-Spalten (siehe
+# scripts/build_copurchase_filtered.py). Pro Artikel und Ziel-Makro wird
+# die Vereinigung der Top-K aller Spalten gespeichert, damit die App das
+# Fenster pro Anfrage wählen kann (window=...). rank bezieht sich auf count.
+# ---------------------------------------------------------
+TOPK_COLUMNS = ["article_id", "target_macro", "rank", "partner_id", "count"]
+WINDOW_COLUMNS = ["count", "count_4w", "count_3m", "score_decay"]
+
+
+def build_topk_table(id_1, id_2, counts, macro_by_article: pd.Series, k: int = 20,
+                     windows: dict = None) -> pd.DataFrame:
+    """
+    Baut aus Paaren (id_1, id_2, count) die Top-K-Tabelle.
+
+    Jedes Paar zählt für beide Richtungen (A -> B und B -> A).
+    macro_by_article: article_id -> macro_category des Partners;
+    Partner ohne Makrokategorie fallen heraus.
+    windows: optionale weitere Spalten {name: werte} (z. B. count_4w);
+    ein Partner bleibt, wenn er in irgendeiner Spalte unter den Top-K ist.
+    """
+    id_1 = np.asarray(id_1, dtype=np.int64)
+    id_2 = np.asarray(id_2, dtype=np.int64)
+    columns = {"count": np.asarray(counts)}
+    columns.update({name: np.asarray(values) for name, values in (windows or {}).items()})
+
+    df = pd.DataFrame({
+        "article_id": np.concatenate([id_1, id_2]),
+        "partner_id": np.concatenate([id_2, id_1]),
+        **{name: np.concatenate([values, values]) for name, values in columns.items()},
+    })
+    # Doppelte Paare (z. B. aus mehreren CSV-Teilen) aufsummieren
+    df = df.groupby(["article_id", "partner_id"], as_index=False, sort=False)[list(columns)].sum()
+
+    df["target_macro"] = df["partner_id"].map(macro_by_article)
+    df = df.dropna(subset=["target_macro"])
+
+    for name in reversed(list(columns)):   # zuletzt nach count -> rank
+        df = df.sort_values(
+            ["article_id", "target_macro", name, "partner_id"],
+            ascending=[True, True, False, True],
+        )
+        df["rank"] = df.groupby(["article_id", "target_macro"], sort=False).cumcount()
+        df[f"_keep_{name}"] = df["rank"] < k
+    keep = df[[f"_keep_{name}" for name in columns]].any(axis=1)
+    df = df[keep]
+    return df[TOPK_COLUMNS + [c for c in columns if c != "count"]].reset_index(drop=True)
+
+
+def load_topk(path) -> pd.DataFrame:
+    """
+    Lädt die Top-K-Tabelle, indiziert nach article_id (sortiert),
+    damit ein Basisartikel per .loc ohne Full-Scan gefunden wird.
+    """
+    df = pd.read_csv(
+        path,
+        dtype={"article_id": "int64", "target_macro": "category", "rank": "int16",
+               "partner_id": "int64", "count": "int64"},
+    )
+    return df.set_index("article_id").sort_index()
+
+
+def get_topk_partners(topk, base_article_id: int, target_macro: str = None,
+                      window: str = "count", k: int = None) -> pd.DataFrame:
+    """
+    Partner eines Basisartikels (optional nur eine Ziel-Makrokategorie),
+    nach der Spalte window absteigend (count, count_4w, count_3m,
+    score_decay; fehlt die Spalte, wird count genommen). Mit k höchstens
+    k Partner pro Ziel-Makro. Spalten: partner_id, target_macro, count
+    (+ window).
+
+    topk: Top-K-Tabelle (load_topk) oder CopurchasePartitions.
+    """
+    if isinstance(topk, CopurchasePartitions):
+        rows = topk.partners(base_article_id)
+    elif base_article_id in topk.index:
+        rows = topk.loc[[base_article_id]]
+    else:
+        rows = topk.iloc[:0]
+
+    if window not in rows.columns:
+        window = "count"
+    columns = list(dict.fromkeys(["partner_id", "target_macro", "count", window]))
+    if target_macro is not None:
+        rows = rows[rows["target_macro"] == target_macro]
+    if window != "count":
+        rows = rows[rows[window] > 0]
+    rows = rows.sort_values([window, "partner_id"], ascending=[False, True])
+    if k is not None:
+        rows = rows.groupby("target_macro", observed=True, sort=False).head(k)
+    return rows[columns].reset_index(drop=True)
+
+
+# ---------------------------------------------------------
+# Nach Artikel partitionierter Binär-Speicher (ersetzt copurchase_parts_5)
+#
+# Layout (Ordner, z. B. data_processed/copurchase_store/):
+#   meta.json        Anzahl Partitionen, Spalten, Quelle
+#   index.npy        article_id -> (partition, start, stop), sortiert nach article_id
+#   part_XXX.npy     Partner-Zeilen aller Artikel dieser Partition
+#                    (partner_id, target_macro, count, count_4w, count_3m, score_decay),
+#                    pro Artikel zusammenhängend und nach count absteigend
+#
+# Jedes Paar steht in beiden Richtungen drin, d. h. die Partner eines
+# Artikels liegen komplett in genau einer Partition. Die Partition ergibt
+# sich aus einem Hash der article_id; die Anzahl wird so gewählt, dass
+# jede Datei unter max_partition_mb bleibt (Repo-Limit).
+# ---------------------------------------------------------
+PARTITION_DTYPE = np.dtype([
+    ("partner_id", "<u4"),
+    ("target_macro", "u1"),     # Position in MACRO_DISPLAY_ORDER, 255 = unbekannt
+    ("count", "<u4"),
+    ("count_4w", "<u4"),
+    ("count_3m", "<u4"),
+    ("score_decay", "<f4"),
+])
+INDEX_DTYPE = np.dtype([
+    ("article_id", "<i8"),
+    ("partition", "<u2"),
+    ("start", "<u4"),
+    ("stop", "<u4"),
+])
+NO_MACRO = 255
+
+
+def partition_of_articles(article_ids: np.ndarray, n_partitions: int) -> np.ndarray:
+    """Multiplikatives Hashing (Knuth), damit die Partitionen gleichmäßig gefüllt sind."""
+    hashed = (np.asarray(article_ids).astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    return (hashed % np.uint64(n_partitions)).astype(np.int64)
+
+
+def write_partitioned_store(id_1, id_2, columns: dict, macro_by_article: pd.Series,
+                            store_dir, max_partition_mb: float = 40.0, source: str = None) -> dict:
+    """
+    Schreibt Paare (id_1, id_2, {count, count_4w, ...}) als partitionierten
+    Speicher. Fehlende Zeitfenster-Spalten werden mit 0 gefüllt.
+    Gibt die Meta-Daten zurück.
+    """
+    id_1 = np.asarray(id_1, dtype=np.int64)
+    id_2 = np.asarray(id_2, dtype=np.int64)
+    n_rows = 2 * len(id_1)
+
+    rows = np.zeros(n_rows, dtype=PARTITION_DTYPE)
+    article = np.concatenate([id_1, id_2])
+    rows["partner_id"] = np.concatenate([id_2, id_1])
+    for name in WINDOW_COLUMNS:
+        if name in columns:
+            values = np.asarray(columns[name])
+            rows[name] = np.concatenate([values, values])
+
+    macro_codes = macro_by_article.map({m: i for i, m in enumerate(MACRO_DISPLAY_ORDER)})
+    rows["target_macro"] = pd.Series(rows["partner_id"].astype(np.int64)).map(macro_codes) \
+        .fillna(NO_MACRO).to_numpy(dtype=np.uint8)
+
+    return _write_partitions(rows, article, [c for c in WINDOW_COLUMNS if c in columns],
+                             store_dir, max_partition_mb, source)
+
+
+def write_topk_store(topk: pd.DataFrame, store_dir, max_partition_mb: float = 40.0, source: str = None) -> dict:
+    """
+    Schreibt die Top-K-Tabelle (build_topk_table) im selben Layout wie
+    write_partitioned_store. CopurchasePartitions liest sie dann per
+    memmap statt als DataFrame im RAM jedes Server-Prozesses; die
+    Partner eines Artikels sind genau seine Top-K-Zeilen.
+    """
+    rows = np.zeros(len(topk), dtype=PARTITION_DTYPE)
+    rows["partner_id"] = topk["partner_id"].to_numpy()
+    columns = [c for c in WINDOW_COLUMNS if c in topk.columns]
+    for name in columns:
+        rows[name] = topk[name].to_numpy()
+    macro_codes = {m: i for i, m in enumerate(MACRO_DISPLAY_ORDER)}
+    rows["target_macro"] = topk["target_macro"].astype(object).map(macro_codes) \
+        .fillna(NO_MACRO).to_numpy(dtype=np.uint8)
+    article = topk["article_id"].to_numpy(dtype=np.int64)
+    return _write_partitions(rows, article, columns, store_dir, max_partition_mb, source)
+
+
+def _write_partitions(rows: np.ndarray, article: np.ndarray, columns: list, store_dir,
+                      max_partition_mb: float, source: str) -> dict:
+    """Verteilt Partner-Zeilen (PARTITION_DTYPE) auf Partitionen und schreibt Index + meta.json."""
+    n_rows = len(rows)
+
+    # Anzahl Partitionen: so viele, dass jede Datei sicher unter dem Limit bleibt
+    max_bytes = max_partition_mb * 2**20
+    n_partitions = max(1, int(np.ceil(n_rows * PARTITION_DTYPE.itemsize / (0.8 * max_bytes))))
+    while True:
+        partition = partition_of_articles(article, n_partitions)
+        sizes = np.bincount(partition, minlength=n_partitions) * PARTITION_DTYPE.itemsize
+        if sizes.max(initial=0) <= max_bytes or n_partitions >= 65535:
+            break
+        n_partitions *= 2
+
+    # Sortierung: Partition, Artikel, count absteigend
+    order = np.lexsort((rows["partner_id"], -rows["count"].astype(np.int64), article, partition))
+    rows, article, partition = rows[order], article[order], partition[order]
+
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    for old in store_dir.glob("part_*.npy"):
+        old.unlink()
+
+    part_bounds = np.searchsorted(partition, np.arange(n_partitions + 1))
+    index_parts = []
+    for p in range(n_partitions):
+        lo, hi = part_bounds[p], part_bounds[p + 1]
+        np.save(store_dir / f"part_{p:03d}.npy", rows[lo:hi])
+
+        # Zeilenbereich pro Artikel innerhalb der Partition
+        part_articles, starts = np.unique(article[lo:hi], return_index=True)
+        stops = np.append(starts[1:], hi - lo)
+        idx = np.zeros(len(part_articles), dtype=INDEX_DTYPE)
+        idx["article_id"], idx["partition"], idx["start"], idx["stop"] = part_articles, p, starts, stops
+        index_parts.append(idx)
+
+    index = np.concatenate(index_parts) if index_parts else np.zeros(0, dtype=INDEX_DTYPE)
+    index = index[np.argsort(index["article_id"], kind="stable")]
+    np.save(store_dir / "index.npy", index)
+
+    meta = {
+        "n_partitions": n_partitions,
+        "n_articles": int(len(index)),
+        "n_rows": int(n_rows),
+        "columns": columns,
+        "macros": MACRO_DISPLAY_ORDER,
+        "max_partition_bytes": int(sizes.max(initial=0)),
+        "source": source,
+    }
+    with open(store_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class CopurchasePartitions:
+    """
+    Lesezugriff auf den partitionierten Co-Purchase-Speicher.
+    Beim Öffnen wird nur index.npy gelesen; eine Partition wird erst
+    beim ersten Zugriff auf einen ihrer Artikel per memmap geöffnet.
+
+    Beispiel:
+        store = CopurchasePartitions("data_processed/copurchase_store")
+        store.partners(108775015)      # DataFrame, nach count absteigend
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        index_path = self.store_dir / "index.npy"
+        if not index_path.exists():
+            raise FileNotFoundError(
+                f"Kein Co-Purchase-Speicher gefunden unter {self.store_dir}. "
+                f"Bitte zuerst scripts/build_copurchase_partitions.py ausführen."
+            )
+        with open(self.store_dir / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.index = np.load(index_path)
+        self._partitions = {}
+
+    @property
+    def loaded_partitions(self) -> list:
+        return sorted(self._partitions)
+
+    def _partition(self, p: int) -> np.ndarray:
+        if p not in self._partitions:
+            self._partitions[p] = np.load(self.store_dir / f"part_{p:03d}.npy", mmap_mode="r")
+        return self._partitions[p]
+
+    def partner_rows(self, article_id: int) -> np.ndarray:
+        """Rohe Partner-Zeilen (PARTITION_DTYPE) eines Artikels; leer, wenn unbekannt."""
+        pos = np.searchsorted(self.index["article_id"], article_id)
+        if pos >= len(self.index) or self.index["article_id"][pos] != article_id:
+            return np.zeros(0, dtype=PARTITION_DTYPE)
+        entry = self.index[pos]
+        return np.asarray(self._partition(int(entry["partition"]))[entry["start"]:entry["stop"]])
+
+    def partners(self, article_id: int) -> pd.DataFrame:
+        """Partner eines Artikels als DataFrame (Spalten wie in der Top-K-Tabelle)."""
+        rows = self.partner_rows(article_id)
+        macros = np.array(self.meta["macros"] + [None], dtype=object)
+        codes = np.minimum(rows["target_macro"].astype(np.int64), len(macros) - 1)
+        df = pd.DataFrame({
+            "partner_id": rows["partner_id"].astype(np.int64),
+            "target_macro": macros[codes],
+            **{c: rows[c].astype(np.float64 if c == "score_decay" else np.int64) for c in self.meta["columns"]},
+        })
+        return df.dropna(subset=["target_macro"])
+
+
+# ---------------------------------------------------------
+# CSR-Adjazenz für Nachbar-Lookups (demo8)
+#
+# Symmetrische Adjazenz über dichte Artikelindizes:
+#   article_ids  int64, sortiert (dichter Index -> article_id)
+#   indptr       int64, Länge n_articles + 1
+#   indices      int32, Partner-Index
+#   counts       uint32, Co-Purchase-Count
+# Die Partner von Artikel i stehen in indices[indptr[i]:indptr[i + 1]],
+# schon beim Bauen dedupliziert und nach count absteigend sortiert.
+# Ein Lookup ist damit ein Slice (O(Grad)) statt eines Scans über alle
+# Paare mit anschließendem apply + groupby.
+# ---------------------------------------------------------
+def _row_count_key(rows: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Sortierschlüssel (row aufsteigend, count absteigend) in einem int64 statt lexsort."""
+    inverted = np.uint32(0xFFFFFFFF) - np.asarray(counts).astype(np.uint32)
+    return (np.asarray(rows, dtype=np.int64) << 32) | inverted.astype(np.int64)
+
+
+class CopurchaseAdjacency:
+    def __init__(self, article_ids, indptr, indices, counts):
+        self.article_ids = article_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+
+    @classmethod
+    def from_pairs(cls, id_1, id_2, counts) -> "CopurchaseAdjacency":
+        """Baut die Adjazenz aus Paaren; doppelte Paare (z. B. aus mehreren CSV-Teilen) werden summiert."""
+        id_1 = np.asarray(id_1, dtype=np.int64)
+        id_2 = np.asarray(id_2, dtype=np.int64)
+        counts = np.asarray(counts, dtype=np.int64)
+
+        article_ids, codes = np.unique(np.concatenate([id_1, id_2]), return_inverse=True)
+        n = len(id_1)
+        rows = np.concatenate([codes[:n], codes[n:]])
+        cols = np.concatenate([codes[n:], codes[:n]])
+        values = np.concatenate([counts, counts])
+        not_self = rows != cols
+        rows, cols, values = rows[not_self], cols[not_self], values[not_self]
+
+        # Deduplizieren über gepackte Schlüssel (row << 32 | col)
+        keys = (rows.astype(np.uint64) << np.uint64(32)) | cols.astype(np.uint64)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        values = np.bincount(inverse, weights=values, minlength=len(keys)).astype(np.int64)
+        rows = (keys >> np.uint64(32)).astype(np.int64)
+        cols = (keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+
+        # Pro Zeile nach count absteigend; die Schlüssel sind schon nach (row, col)
+        # sortiert, ein stabiler Sort hält bei Gleichstand die Partner-Reihenfolge
+        order = np.argsort(_row_count_key(rows, values), kind="stable")
+        indptr = np.zeros(len(article_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(article_ids)), out=indptr[1:])
+        return cls(article_ids, indptr, cols[order].astype(np.int32), values[order].astype(np.uint32))
+
+    @classmethod
+    def from_frame(cls, df_cop: pd.DataFrame) -> "CopurchaseAdjacency":
+        return cls.from_pairs(df_cop["article_id_1"], df_cop["article_id_2"], df_cop["count"])
+
+    @property
+    def n_articles(self) -> int:
+        return len(self.article_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.article_ids.nbytes + self.indptr.nbytes + self.indices.nbytes + self.counts.nbytes
+
+    def codes_of(self, article_ids) -> np.ndarray:
+        """Dichte Indizes zu article_ids; -1 für Artikel ohne Paare."""
+        article_ids = np.asarray(article_ids, dtype=np.int64)
+        if self.n_articles == 0:
+            return np.full(len(article_ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.article_ids, article_ids), self.n_articles - 1)
+        return np.where(self.article_ids[pos] == article_ids, pos, -1)
+
+    def neighbors(self, article_id: int):
+        """(partner_ids, counts) eines Artikels, nach count absteigend."""
+        code = int(self.codes_of([article_id])[0])
+        if code < 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+        lo, hi = self.indptr[code], self.indptr[code + 1]
+        return self.article_ids[self.indices[lo:hi]], self.counts[lo:hi]
+
+    def neighbor_sums(self, article_ids):
+        """Summierte Counts über die Partner mehrerer Artikel: (partner_ids, counts), nach count absteigend."""
+        codes = self.codes_of(article_ids)
+        codes = np.unique(codes[codes >= 0])
+        if len(codes) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        slices = [np.arange(self.indptr[c], self.indptr[c + 1]) for c in codes]
+        positions = np.concatenate(slices)
+        sums = np.bincount(self.indices[positions], weights=self.counts[positions], minlength=self.n_articles)
+        partners = np.flatnonzero(sums)
+        order = np.lexsort((partners, -sums[partners]))
+        partners = partners[order]
+        return self.article_ids[partners], sums[partners].astype(np.int64)
+
+
+def _candidates_frame(base_article_id: int, partner_ids, counts, df_articles: pd.DataFrame) -> pd.DataFrame:
+    if len(partner_ids) == 0:
+        return pd.DataFrame()
+    df_agg = pd.DataFrame({"partner_id": partner_ids, "copurchase_count": counts.astype(np.int64)})
+    df_merged = df_agg.merge(df_articles, left_on="partner_id", right_on="article_id", how="left")
+
+    if "macro_category" not in df_merged.columns:
+        df_merged["macro_category"] = df_merged["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
+
+    df_merged = df_merged[df_merged["partner_id"] != base_article_id]
+    df_merged = df_merged[~df_merged["macro_category"].isna()]
+    return df_merged
+
+
+def get_copurchase_candidates(base_article_id: int, df_articles: pd.DataFrame,
+                              adjacency: CopurchaseAdjacency) -> pd.DataFrame:
+    """
+    Drop-in für den bisherigen Pandas-Pfad der Apps: alle Co-Purchase-Partner
+    von base_article_id mit partner_id, copurchase_count und den gemergten
+    Artikeldaten (inkl. macro_category), nach copurchase_count absteigend.
+    """
+    partner_ids, counts = adjacency.neighbors(base_article_id)
+    return _candidates_frame(base_article_id, partner_ids, counts, df_articles)
+
+
+def get_copurchases_from_similar(similar_article_ids, base_article_id: int, df_articles: pd.DataFrame,
+                                 adjacency: CopurchaseAdjacency) -> pd.DataFrame:
+    """Wie get_copurchase_candidates, aber über die Partner mehrerer ähnlicher Artikel summiert."""
+    if not similar_article_ids:
+        return pd.DataFrame()
+    partner_ids, counts = adjacency.neighbor_sums(similar_article_ids)
+    return _candidates_frame(base_article_id, partner_ids, counts, df_articles)
+
+
+# ---------------------------------------------------------
+# Komprimiertes CSR-Format (copurchase_csr.npz)
+#
+# Ersatz für die fünf CSV-Teile, klein genug fürs Repo:
+#   article_ids          int64, sortiert
+#   degrees              uint32, Partner pro Artikel
+#   id_widths/id_data    Partner-Indizes pro Artikel aufsteigend sortiert und
+#                        delta-kodiert (erster Wert absolut), bit-gepackt
+#   count_widths/count_data  Counts in derselben Reihenfolge, bit-gepackt
+# Bit-Packing in Blöcken zu PACK_BLOCK Werten; jeder Block hat eine eigene
+# Bitbreite (= Bitlänge seines Maximums). Ein einzelner Artikel lässt sich
+# dekodieren, indem nur die Blöcke seines Zeilenbereichs entpackt werden.
+# Reines NumPy, keine zusätzliche Kompressionsbibliothek nötig.
+# ---------------------------------------------------------
+PACK_BLOCK = 128
+PACK_CHUNK_BLOCKS = 8192    # Blöcke pro Pack-/Entpack-Schritt (begrenzt den Zwischenspeicher)
+
+
+def _block_offsets(widths: np.ndarray, block: int) -> np.ndarray:
+    """Byte-Offsets der Blöcke im Payload (Länge len(widths) + 1)."""
+    offsets = np.zeros(len(widths) + 1, dtype=np.int64)
+    np.cumsum(widths.astype(np.int64) * (block // 8), out=offsets[1:])
+    return offsets
+
+
+def pack_blocks(values: np.ndarray, block: int = PACK_BLOCK):
+    """Bit-Packing nicht-negativer Ganzzahlen (< 2**32) -> (widths uint8, data uint8)."""
+    values = np.asarray(values, dtype=np.uint32)
+    n_blocks = -(-len(values) // block)
+    padded = np.zeros(n_blocks * block, dtype=np.uint32)
+    padded[:len(values)] = values
+    padded = padded.reshape(n_blocks, block)
+
+    # Bitlänge des Blockmaximums (frexp liefert für m > 0 genau die Bitlänge, für 0 -> 0)
+    widths = np.frexp(padded.max(axis=1, initial=0).astype(np.float64))[1].astype(np.uint8)
+    offsets = _block_offsets(widths, block)
+    data = np.zeros(offsets[-1] + 8, dtype=np.uint8)   # 8 Null-Bytes am Ende: unpack_blocks darf darüber hinaus lesen
+
+    for w in np.unique(widths[widths > 0]).tolist():
+        shifts = np.arange(w, dtype=np.uint32)
+        blocks_w = np.flatnonzero(widths == w)
+        for lo in range(0, len(blocks_w), PACK_CHUNK_BLOCKS):
+            ids = blocks_w[lo:lo + PACK_CHUNK_BLOCKS]
+            bits = ((padded[ids][:, :, None] >> shifts) & 1).astype(np.uint8)
+            packed = np.packbits(bits.reshape(len(ids), -1), axis=1, bitorder="little")
+            data[offsets[ids][:, None] + np.arange(packed.shape[1])] = packed
+    return widths, data
+
+
+def unpack_blocks(widths: np.ndarray, data: np.ndarray, offsets: np.ndarray,
+                  blocks: np.ndarray = None, block: int = PACK_BLOCK) -> np.ndarray:
+    """Entpackt die gegebenen Blöcke (Standard: alle) -> uint32, len(blocks) * block Werte."""
+    if blocks is None:
+        blocks = np.arange(len(widths))
+    out = np.zeros((len(blocks), block), dtype=np.uint32)
+    block_widths = widths[blocks]
+
+    for w in np.unique(block_widths[block_widths > 0]).tolist():
+        rows_w = np.flatnonzero(block_widths == w)
+        # Wert j liegt ab Bit j * w des Blocks: die (höchstens 5) Bytes ab
+        # dort einsammeln, zusammensetzen, verschieben und maskieren
+        bit_pos = np.arange(block, dtype=np.int64) * w
+        byte_pos, shift = bit_pos // 8, (bit_pos % 8).astype(np.uint64)
+        mask = np.uint64((1 << w) - 1)
+        for lo in range(0, len(rows_w), PACK_CHUNK_BLOCKS):
+            rows = rows_w[lo:lo + PACK_CHUNK_BLOCKS]
+            pos = offsets[blocks[rows]][:, None] + byte_pos
+            values = np.zeros(pos.shape, dtype=np.uint64)
+            for k in range((w + 7) // 8 + 1):
+                values |= data[pos + k].astype(np.uint64) << np.uint64(8 * k)
+            out[rows] = (values >> shift) & mask
+    return out.reshape(-1)
+
+
+def write_compressed_adjacency(adjacency: CopurchaseAdjacency, path) -> int:
+    """Schreibt die Adjazenz als copurchase_csr.npz; gibt die Dateigröße in Bytes zurück."""
+    degrees = np.diff(adjacency.indptr)
+    rows = np.repeat(np.arange(adjacency.n_articles), degrees)
+
+    # Pro Zeile nach Partner-Index aufsteigend -> kleine Deltas
+    order = np.argsort((rows.astype(np.int64) << 32) | adjacency.indices.astype(np.int64))
+    ids = adjacency.indices[order].astype(np.int64)
+    counts = adjacency.counts[order]
+
+    deltas = np.diff(ids, prepend=0)
+    starts = adjacency.indptr[:-1][degrees > 0]
+    deltas[starts] = ids[starts]
+
+    id_widths, id_data = pack_blocks(deltas)
+    count_widths, count_data = pack_blocks(counts)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez(
+            f,
+            article_ids=adjacency.article_ids,
+            degrees=degrees.astype(np.uint32),
+            id_widths=id_widths,
+            id_data=id_data,
+            count_widths=count_widths,
+            count_data=count_data,
+            block=np.int64(PACK_BLOCK),
+        )
+    return path.stat().st_size
+
+
+class CompressedCopurchase:
+    """
+    Lesezugriff auf copurchase_csr.npz.
+
+        comp = CompressedCopurchase("data_processed/copurchase_csr.npz")
+        comp.neighbors(108775015)     # nur die Blöcke dieses Artikels entpacken
+        comp.to_adjacency()           # alles -> CopurchaseAdjacency
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with np.load(self.path) as data:
+            self.article_ids = data["article_ids"]
+            self.degrees = data["degrees"]
+            self.id_widths = data["id_widths"]
+            self.id_data = data["id_data"]
+            self.count_widths = data["count_widths"]
+            self.count_data = data["count_data"]
+            self.block = int(data["block"])
+        self.indptr = np.zeros(len(self.degrees) + 1, dtype=np.int64)
+        np.cumsum(self.degrees, out=self.indptr[1:])
+        self.id_offsets = _block_offsets(self.id_widths, self.block)
+        self.count_offsets = _block_offsets(self.count_widths, self.block)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.article_ids, self.degrees, self.id_widths,
+                                      self.id_data, self.count_widths, self.count_data))
+
+    def neighbors(self, article_id: int):
+        """(partner_ids, counts) eines Artikels, nach count absteigend (wie CopurchaseAdjacency.neighbors)."""
+        pos = np.searchsorted(self.article_ids, article_id)
+        if pos >= len(self.article_ids) or self.article_ids[pos] != article_id:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+        lo, hi = self.indptr[pos], self.indptr[pos + 1]
+        if lo == hi:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint32)
+
+        blocks = np.arange(lo // self.block, (hi - 1) // self.block + 1)
+        skip = lo - blocks[0] * self.block
+        deltas = unpack_blocks(self.id_widths, self.id_data, self.id_offsets, blocks, self.block)[skip:skip + hi - lo]
+        counts = unpack_blocks(self.count_widths, self.count_data, self.count_offsets, blocks, self.block)[skip:skip + hi - lo]
+
+        ids = np.cumsum(deltas.astype(np.int64))
+        order = np.lexsort((ids, -counts.astype(np.int64)))
+        return self.article_ids[ids[order]], counts[order]
+
+    def to_adjacency(self) -> CopurchaseAdjacency:
+        n_entries = int(self.indptr[-1])
+        deltas = unpack_blocks(self.id_widths, self.id_data, self.id_offsets, block=self.block)[:n_entries]
+        counts = unpack_blocks(self.count_widths, self.count_data, self.count_offsets, block=self.block)[:n_entries]
+
+        # Kumulierte Summe, an jedem Zeilenanfang zurückgesetzt
+        cumulative = np.cumsum(deltas.astype(np.int64))
+        has_partners = self.degrees > 0
+        starts = self.indptr[:-1][has_partners]
+        base = cumulative[starts] - deltas[starts]
+        ids = cumulative - np.repeat(base, self.degrees[has_partners])
+
+        # Pro Zeile nach count absteigend; ids sind je Zeile aufsteigend, stabiler Sort behält das bei
+        rows = np.repeat(np.arange(len(self.degrees)), self.degrees)
+        order = np.argsort(_row_count_key(rows, counts), kind="stable")
+        return CopurchaseAdjacency(self.article_ids, self.indptr, ids[order].astype(np.int32), counts[order])
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 
+from article_features import pick_popular, popularity_order, segment_rankings
+from image_store import available_article_ids
+
 BASE_DIR = Path(__file__).parent
 DATA_PROCESSED = BASE_DIR / "data_processed"
 IMAGES_DIR = BASE_DIR / "images_sample"
@@ -24,6 +27,18 @@ def load_articles():
     return df
 
 
+@st.cache_resource
+def load_fallback_rankings():
+    """
+    Produktgruppe -> Zeilenpositionen in load_articles(), meistverkauft
+    zuerst (Verkaufsstatistik aus articles_top.csv); None -> alle Artikel.
+    """
+    articles = load_articles()
+    rankings = segment_rankings(articles, ["product_group_name"])
+    rankings[None] = popularity_order(articles)
+    return rankings
+
+
 @st.cache_data
 def load_copurchase():
     path = DATA_PROCESSED / "copurchase_top.csv"
@@ -33,11 +48,20 @@ def load_copurchase():
     return df
 
 
+@st.cache_data
+def load_image_ids():
+    """article_ids mit Bild laut images_sample/manifest.csv (None ohne Manifest)."""
+    return available_article_ids(IMAGES_DIR)
+
+
 def get_image_path(article_id: int) -> Path | None:
     aid = str(article_id).zfill(10)
     subdir = aid[:3]
     path = IMAGES_DIR / subdir / f"{aid}.jpg"
-    return path if path.exists() else None
+    image_ids = load_image_ids()
+    if image_ids is None:
+        return path if path.exists() else None
+    return path if int(article_id) in image_ids else None
 
 
 def get_recommendations(
@@ -94,20 +118,21 @@ def get_recommendations(
 def get_fallback_recommendations(
     selected: pd.Series,
     articles: pd.DataFrame,
+    rankings: dict,
     top_n: int = 6,
 ) -> pd.DataFrame:
-    """Fallback: ähnliche Artikel aus derselben Produktgruppe, ohne Co-Purchase."""
-    base = articles[articles["article_id"] != selected["article_id"]].copy()
-
-    # Gleiche Produktgruppe bevorzugen
-    if "product_group_name" in articles.columns:
-        same_group = base[base["product_group_name"] == selected.get("product_group_name")]
-        if len(same_group) >= 1:
-            base = same_group
-
-    # Zur Sicherheit mischen und begrenzen
-    if len(base) > top_n:
-        base = base.sample(n=top_n, random_state=42)
+    """Fallback: meistverkaufte Artikel aus derselben Produktgruppe, ohne Co-Purchase."""
+    article_ids = articles["article_id"].to_numpy()
+    exclude = [selected["article_id"]]
+
+    # Gleiche Produktgruppe bevorzugen, sonst über alle Artikel
+    positions = []
+    same_group = rankings.get(selected.get("product_group_name"))
+    if same_group is not None:
+        positions = pick_popular(same_group, article_ids, top_n, exclude)
+    if len(positions) == 0:
+        positions = pick_popular(rankings[None], article_ids, top_n, exclude)
+    base = articles.iloc[positions]
 
     # Einheitliches Schema: so tun, als käme das Feld 'partner_id'
     base = base.copy()
@@ -173,7 +198,7 @@ def main():
             "Für diesen Artikel wurden im Sample keine Co-Purchase-Vorschläge gefunden.\n"
             "Es werden stattdessen ähnliche Artikel angezeigt."
         )
-        recs = get_fallback_recommendations(selected, articles, top_n=6)
+        recs = get_fallback_recommendations(selected, articles, load_fallback_rankings(), top_n=6)
 
     cols = st.columns(3)
 
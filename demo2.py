@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 
+from article_features import add_popularity, pick_popular, segment_rankings
+from image_store import available_article_ids
+
 # ---------------------------------------------------------
 # Pfade
 # ---------------------------------------------------------
@@ -9,6 +12,7 @@ DATA_PROCESSED = Path("data_processed")
 IMAGES_ROOT = Path("images_sample")
 
 ARTICLES_FILE = DATA_PROCESSED / "articles_filtered.csv"
+POPULARITY_FILE = DATA_PROCESSED / "article_popularity.csv"   # scripts/build_article_popularity.py
 # Neuer Pfad-Ordner
 COPURCHASE_PARTS_DIR = DATA_PROCESSED / "copurchase_parts_5"
 
@@ -90,8 +94,15 @@ def load_articles() -> pd.DataFrame:
     df["article_id"] = df["article_id"].astype(int)
     df["article_id_str"] = df["article_id"].astype(str).str.zfill(10)
     df["macro_category"] = df["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
+    if POPULARITY_FILE.exists():
+        df = add_popularity(df, pd.read_csv(POPULARITY_FILE))
     return df
 
+@st.cache_resource
+def load_fallback_rankings() -> dict:
+    """Makrokategorie -> Zeilenpositionen in load_articles(), meistverkauft zuerst."""
+    return segment_rankings(load_articles(), ["macro_category"])
+
 @st.cache_data
 def load_copurchase():
     """Lädt automatisch alle Teil-Dateien in data_processed/copurchase_parts_5/."""
@@ -119,11 +130,20 @@ def load_copurchase():
 # ---------------------------------------------------------
 # Hilfsfunktionen
 # ---------------------------------------------------------
+@st.cache_data
+def load_image_ids():
+    """article_ids mit Bild laut images_sample/manifest.csv (None ohne Manifest)."""
+    return available_article_ids(IMAGES_ROOT)
+
+
 def get_image_path(article_id_str: str) -> Path | None:
     folder = article_id_str[:3]
     filename = f"{article_id_str}.jpg"
     path = IMAGES_ROOT / folder / filename
-    if path.exists():
+    image_ids = load_image_ids()
+    if image_ids is None:
+        return path if path.exists() else None
+    if int(article_id_str) in image_ids:
         return path
     return None
 
@@ -200,13 +220,14 @@ def get_outfit_recommendations(
     base_article_id: int,
     df_articles: pd.DataFrame,
     df_cop: pd.DataFrame,
+    rankings: dict,
     n_per_category: int = 3,
 ) -> dict[str, pd.DataFrame]:
     """
     - Makrokategorie des Basisteils bestimmen
     - Co-Purchase-Kandidaten holen
     - pro Ziel-Makrokategorie Top-N auswählen
-    - Fallback: zufällige Artikel aus dieser Makrokategorie
+    - Fallback: meistverkaufte Artikel aus dieser Makrokategorie
     """
     base_row = get_base_article_row(df_articles, base_article_id)
     if base_row is None:
@@ -224,18 +245,15 @@ def get_outfit_recommendations(
 
         if len(cat_top) < n_per_category:
             needed = n_per_category - len(cat_top)
-            fallback_pool = df_articles[
-                (df_articles["macro_category"] == macro)
-                & (df_articles["article_id"] != base_article_id)
-                & (~df_articles["article_id"].isin(cat_top["article_id"]))
-            ]
-
-            if not fallback_pool.empty and needed > 0:
-                fallback_sample = fallback_pool.sample(
-                    n=min(needed, len(fallback_pool)),
-                    random_state=42
-                )
-                fallback_sample = fallback_sample.copy()
+            positions = pick_popular(
+                rankings.get(macro, []),
+                df_articles["article_id"].to_numpy(),
+                needed,
+                exclude=[base_article_id] + cat_top["article_id"].tolist(),
+            )
+
+            if len(positions) > 0 and needed > 0:
+                fallback_sample = df_articles.iloc[positions].copy()
                 fallback_sample["copurchase_count"] = 0
                 cat_top = pd.concat([cat_top, fallback_sample], ignore_index=True)
 
@@ -314,6 +332,7 @@ def main():
             base_article_id=selected_article_id,
             df_articles=df_articles,
             df_cop=df_cop,
+            rankings=load_fallback_rankings(),
             n_per_category=3,
         )
 
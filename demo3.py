@@ -3,6 +3,8 @@ import pandas as pd
 from pathlib import Path
 from typing import Dict
 
+from image_store import available_article_ids
+
 # ---------------------------------------------------------
 # Streamlit Grundkonfiguration
 # ---------------------------------------------------------
@@ -130,11 +132,20 @@ def load_articles():
 # ---------------------------------------------------------
 # Hilfsfunktionen
 # ---------------------------------------------------------
+@st.cache_data
+def load_image_ids():
+    """article_ids mit Bild laut images_sample/manifest.csv (None ohne Manifest)."""
+    return available_article_ids(IMAGES_ROOT)
+
+
 def get_image_path(article_id_str):
     folder = article_id_str[:3]
     filename = "%s.jpg" % article_id_str
     path = IMAGES_ROOT / folder / filename
-    if path.exists():
+    image_ids = load_image_ids()
+    if image_ids is None:
+        return path if path.exists() else None
+    if int(article_id_str) in image_ids:
         return path
     return None
 
@@ -4,6 +4,15 @@ from pathlib import Path
 from typing import Dict
 import time
 
+from article_features import (
+    add_popularity,
+    get_functional_type,
+    get_style_category_v2,
+    load_article_artifact,
+    segment_rankings,
+)
+from copurchase_store import CompressedCopurchase, CopurchaseAdjacency, get_copurchase_candidates, get_copurchases_from_similar
+
 # ---------------------------------------------------------
 # 1. KONFIGURATION & CSS
 # ---------------------------------------------------------
@@ -116,6 +125,9 @@ IMAGES_BASE_URL = "https://pub-65f13bc76a9245c6b68256fb466fe755.r2.dev"
 
 ARTICLES_FILE = DATA_PROCESSED / "articles_filtered.csv"
 COPURCHASE_PARTS_DIR = DATA_PROCESSED / "copurchase_parts_5"
+COPURCHASE_CSR_FILE = DATA_PROCESSED / "copurchase_csr.npz"   # scripts/build_copurchase_compressed.py
+ARTICLE_STORE_DIR = DATA_PROCESSED / "articles_store"   # scripts/build_article_features.py
+POPULARITY_FILE = DATA_PROCESSED / "article_popularity.csv"   # scripts/build_article_popularity.py
 
 # ---------------------------------------------------------
 # 4. MAPPINGS (MACRO-KATEGORIEN, GENDER, STIL)
@@ -325,77 +337,11 @@ def get_color_family_ui(name: str) -> str:
 # ---------------------------------------------------------
 # 6. DETAILLIERTE STIL- & FUNKTIONSLOGIK
 # ---------------------------------------------------------
-STYLE_KEYWORDS = {
-    'SPORT': {'sport':3, 'running':3, 'gym':3, 'seamless':2, 'dry':2, 'leggings':1, 'bra':1},
-    'ELEGANT': {'blazer':3, 'suit':3, 'tailored':3, 'satin':2, 'silk':2, 'blouse':2, 'pump':3, 'loafer':3},
-    'STREETWEAR': {'hoodie':3, 'sweatshirt':3, 'oversized':2, 'relaxed':1, 'cargo':2, 'sneakers':2, 'cap':2, 'bucket':2},
-    'SUMMER': {'linen':3, 'bikini':3, 'swim':3, 'shorts':2, 'sandal':3, 'straw':3, 'hat':1},
-    'CASUAL': {'denim':2, 'jeans':2, 't-shirt':2, 'basic':2, 'jersey':1, 'cardigan':1, 'knit':1}
-}
-
-def get_style_category_v2(row):
-    text = " ".join([
-        str(row.get('product_type_name','') or ''),
-        str(row.get('prod_name','') or ''),
-        str(row.get('detail_desc','') or ''),
-        str(row.get('index_name','') or ''),
-    ]).lower()
-
-    scores = {k: 0.0 for k in STYLE_KEYWORDS}
-    for style, tokens in STYLE_KEYWORDS.items():
-        for token, weight in tokens.items():
-            if token in text:
-                scores[style] += weight
-
-    best_style = max(scores, key=scores.get)
-    if scores[best_style] == 0:
-        return 'CASUAL'
-    return best_style
-
-def get_functional_type(row):
-    p_type = str(row.get('product_type_name', '')).lower()
-    desc = str(row.get('detail_desc', '')).lower()
-
-    if p_type in ['coat']:
-        return 'HEAVY_OUTER'
-    if p_type == 'jacket':
-        if any(x in desc for x in ['padded', 'down', 'wool', 'warm', 'lined', 'puffer', 'heavy', 'faux fur', 'shearling']):
-            return 'HEAVY_OUTER'
-
-    if p_type in ['beanie', 'hat/beanie', 'scarf', 'gloves']:
-        return 'WINTER_ACC'
-    if p_type in ['boots', 'bootie']:
-        return 'WINTER_SHOES'
-    if p_type in ['sweater', 'cardigan']:
-        if any(x in desc for x in ['wool', 'cashmere', 'knit', 'heavy', 'warm', 'mohair']):
-            return 'WINTER_TOP'
-
-    if p_type in ['sandals', 'flip flop', 'heeled sandals', 'mules']:
-        return 'SUMMER_SHOES'
-    if p_type in ['straw hat', 'cap', 'bucket hat', 'visor']:
-        return 'SUMMER_ACC'
-    if p_type in ['shorts', 'vest top', 'crop top', 'bikini', 'swimsuit']:
-        return 'SUMMER_WEAR'
-    if p_type == 'skirt':
-        if 'linen' in desc or 'short' in desc or 'mini' in desc:
-            return 'SUMMER_WEAR'
-    if p_type == 'dress':
-        if any(x in desc for x in ['linen', 'sleeveless', 'straps', 'viscose', 'beach']):
-            return 'SUMMER_WEAR'
-
-    if 'linen' in desc:
-        return 'SUMMER_WEAR'
-
-    if 'leggings' in p_type or 'tights' in p_type:
-        return 'LEGGINGS'
-    if p_type in ['blazer', 'suit']:
-        return 'FORMAL_LAYER'
-
-    return 'STANDARD'
-
+# Stil-Kategorie (get_style_category_v2) und Funktionstyp (get_functional_type):
+# article_features.py, vorberechnet in data_processed/articles_store/
 def compute_functional_penalty(base_row, cand_row):
-    type_a = get_functional_type(base_row)
-    type_b = get_functional_type(cand_row)
+    type_a = base_row.get('functional_type') or get_functional_type(base_row)
+    type_b = cand_row.get('functional_type') or get_functional_type(cand_row)
 
     if type_a == 'STANDARD' or type_b == 'STANDARD':
         return 0.0
@@ -558,8 +504,15 @@ def compute_color_score(base_row, candidate_row) -> float:
 # ---------------------------------------------------------
 # 8. DATENLADEN
 # ---------------------------------------------------------
-@st.cache_data
-def load_copurchase():
+@st.cache_resource
+def load_copurchase() -> CopurchaseAdjacency:
+    """
+    CSR-Adjazenz (siehe copurchase_store.py): bevorzugt aus der komprimierten
+    copurchase_csr.npz, sonst aus den Split-Dateien gebaut.
+    """
+    if COPURCHASE_CSR_FILE.exists():
+        return CompressedCopurchase(COPURCHASE_CSR_FILE).to_adjacency()
+
     parts_dir = COPURCHASE_PARTS_DIR
     part_files = sorted(parts_dir.glob("copurchase_part_*.csv"))
     if not part_files:
@@ -567,15 +520,13 @@ def load_copurchase():
 
     dfs = []
     for f in part_files:
-        df = pd.read_csv(f)
+        df = pd.read_csv(f, usecols=["article_id_1", "article_id_2", "count"])
         dfs.append(df)
 
     df_all = pd.concat(dfs, ignore_index=True)
-    df_all["article_id_1"] = df_all["article_id_1"].astype(int)
-    df_all["article_id_2"] = df_all["article_id_2"].astype(int)
-    return df_all
+    return CopurchaseAdjacency.from_frame(df_all)
 
-@st.cache_data
+@st.cache_resource   # ein DataFrame für alle Sessions, wird nicht verändert
 def load_articles():
     df = pd.read_csv(ARTICLES_FILE)
 
@@ -590,10 +541,25 @@ def load_articles():
     df["colour_group_name"] = df["colour_group_name"].fillna("Unbekannt")
     df["colour_family"] = df["colour_group_name"].apply(get_color_family_ui)
 
-    df["style_category"] = df.apply(get_style_category_v2, axis=1)
+    # Stil-Kategorie + Funktionstyp vorberechnet übernehmen statt zeilenweise zu rechnen
+    if (ARTICLE_STORE_DIR / "meta.json").exists():
+        features = load_article_artifact(ARTICLE_STORE_DIR)[["article_id", "style_category", "functional_type"]]
+        features = features.astype({"style_category": str, "functional_type": str})
+        df = df.merge(features, on="article_id", how="left")
+    if "style_category" not in df.columns or df["style_category"].isna().any():
+        df["style_category"] = df.apply(get_style_category_v2, axis=1)
+        df["functional_type"] = df.apply(get_functional_type, axis=1)
+
+    if POPULARITY_FILE.exists():
+        df = add_popularity(df, pd.read_csv(POPULARITY_FILE))
 
     return df
 
+@st.cache_resource
+def load_fallback_rankings() -> dict:
+    """Makrokategorie -> Zeilenpositionen in load_articles(), meistverkauft zuerst."""
+    return segment_rankings(load_articles(), ["macro_category"])
+
 # ---------------------------------------------------------
 # 9. HILFSFUNKTIONEN ALLGEMEIN
 # ---------------------------------------------------------
@@ -625,40 +591,6 @@ def get_target_macros_for_base(base_macro):
 # ---------------------------------------------------------
 # 10. CANDIDATE-GENERIERUNG & HYBRID-SCORING
 # ---------------------------------------------------------
-def get_copurchase_candidates(base_article_id, df_articles, df_cop):
-    mask = (df_cop["article_id_1"] == base_article_id) | (df_cop["article_id_2"] == base_article_id)
-    df_pairs = df_cop[mask].copy()
-    if df_pairs.empty:
-        return pd.DataFrame()
-
-    def _partner(row):
-        return row["article_id_2"] if row["article_id_1"] == base_article_id else row["article_id_1"]
-
-    df_pairs["partner_id"] = df_pairs.apply(_partner, axis=1)
-
-    df_agg = (
-        df_pairs.groupby("partner_id")["count"]
-        .sum()
-        .reset_index()
-        .rename(columns={"count": "copurchase_count"})
-    )
-
-    df_merged = df_agg.merge(
-        df_articles,
-        left_on="partner_id",
-        right_on="article_id",
-        how="left",
-    )
-
-    if "macro_category" not in df_merged.columns:
-        df_merged["macro_category"] = df_merged["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
-
-    df_merged = df_merged[df_merged["partner_id"] != base_article_id]
-    df_merged = df_merged[~df_merged["macro_category"].isna()]
-    df_merged = df_merged.sort_values("copurchase_count", ascending=False)
-
-    return df_merged
-
 def compute_hybrid_score(base_row, cand_row):
     c_score = compute_color_score(base_row, cand_row)
     base_style = base_row.get('style_category', get_style_category_v2(base_row))
@@ -720,46 +652,7 @@ def get_similar_articles(base_row, df_articles, max_neighbors: int = 30):
     pool = pool.sort_values("similarity_score", ascending=False).head(max_neighbors)
     return pool["article_id"].astype(int).tolist()
 
-def get_copurchases_from_similar(similar_article_ids, base_article_id, df_articles, df_cop):
-    if not similar_article_ids:
-        return pd.DataFrame()
-
-    df_sim = df_cop[
-        df_cop["article_id_1"].isin(similar_article_ids)
-        | df_cop["article_id_2"].isin(similar_article_ids)
-    ].copy()
-    if df_sim.empty:
-        return pd.DataFrame()
-
-    def _partner_from_sim(row):
-        return row["article_id_2"] if row["article_id_1"] in similar_article_ids else row["article_id_1"]
-
-    df_sim["partner_id"] = df_sim.apply(_partner_from_sim, axis=1)
-
-    df_agg = (
-        df_sim.groupby("partner_id")["count"]
-        .sum()
-        .reset_index()
-        .rename(columns={"count": "copurchase_count"})
-    )
-
-    df_merged = df_agg.merge(
-        df_articles,
-        left_on="partner_id",
-        right_on="article_id",
-        how="left",
-    )
-
-    if "macro_category" not in df_merged.columns:
-        df_merged["macro_category"] = df_merged["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
-
-    df_merged = df_merged[df_merged["partner_id"] != base_article_id]
-    df_merged = df_merged[~df_merged["macro_category"].isna()]
-    df_merged = df_merged.sort_values("copurchase_count", ascending=False)
-
-    return df_merged
-
-def get_outfit_recommendations(base_article_id, df_articles, df_cop, n_per_category=3):
+def get_outfit_recommendations(base_article_id, df_articles, cop_adj, rankings, n_per_category=3):
     if "macro_category" not in df_articles.columns:
         df_articles = df_articles.copy()
         df_articles["macro_category"] = df_articles["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
@@ -775,14 +668,14 @@ def get_outfit_recommendations(base_article_id, df_articles, df_cop, n_per_categ
     base_macro = base_row.get("macro_category", None)
     target_macros = get_target_macros_for_base(base_macro)
 
-    candidates_direct = get_copurchase_candidates(base_article_id, df_articles, df_cop)
+    candidates_direct = get_copurchase_candidates(base_article_id, df_articles, cop_adj)
     if candidates_direct is not None and not candidates_direct.empty:
         candidates_direct["source_type"] = "direct"
     else:
         candidates_direct = pd.DataFrame()
 
     similar_ids = get_similar_articles(base_row, df_articles, max_neighbors=20)
-    candidates_similar = get_copurchases_from_similar(similar_ids, base_article_id, df_articles, df_cop)
+    candidates_similar = get_copurchases_from_similar(similar_ids, base_article_id, df_articles, cop_adj)
     if candidates_similar is not None and not candidates_similar.empty:
         candidates_similar["source_type"] = "similar"
     else:
@@ -827,10 +720,9 @@ def get_outfit_recommendations(base_article_id, df_articles, df_cop, n_per_categ
         if len(pool) < 10:
             needed = 10 - len(pool)
 
-            fallback_source = df_articles[
-                (df_articles["macro_category"] == macro)
-                & (df_articles["article_id"] != base_article_id)
-            ]
+            # Kandidaten der Makrokategorie, meistverkauft zuerst
+            fallback_source = df_articles.iloc[rankings.get(macro, [])]
+            fallback_source = fallback_source[fallback_source["article_id"] != base_article_id]
 
             if base_index:
                 fallback_source = fallback_source[fallback_source['index_name'].str.lower() == base_index]
@@ -847,11 +739,8 @@ def get_outfit_recommendations(base_article_id, df_articles, df_cop, n_per_categ
 
                 fallback_source['is_safe'] = fallback_source['colour_group_name'].str.lower().isin(safe_colors).astype(int)
 
-                top_candidates = fallback_source.sort_values('is_safe', ascending=False).head(50)
-                sample = top_candidates.sample(
-                    n=min(len(top_candidates), needed * 5),
-                    random_state=42
-                ).copy()
+                # sichere Farben zuerst, innerhalb davon nach Popularität
+                sample = fallback_source.sort_values('is_safe', ascending=False, kind='stable').head(needed * 5).copy()
                 sample["copurchase_count"] = 0
 
                 sample = rerank_hybrid(base_row, sample)
@@ -1046,7 +935,7 @@ def render_select_view(df_articles: pd.DataFrame):
 # ---------------------------------------------------------
 # 12. UI – OUTFIT VIEW
 # ---------------------------------------------------------
-def render_outfit_view(df_articles: pd.DataFrame, df_cop: pd.DataFrame, base_article_id: int):
+def render_outfit_view(df_articles: pd.DataFrame, cop_adj: CopurchaseAdjacency, base_article_id: int):
     scroll_to_top()
     base_row = get_base_article_row(df_articles, base_article_id)
     if base_row is None:
@@ -1089,7 +978,7 @@ def render_outfit_view(df_articles: pd.DataFrame, df_cop: pd.DataFrame, base_art
         )
 
         base_style = base_row.get('style_category', 'Unbekannt')
-        base_func = get_functional_type(base_row)
+        base_func = base_row.get('functional_type') or get_functional_type(base_row)
         st.info(f"Erkannter Stil: **{base_style}**\n\nFunktions-Typ: **{base_func}**")
 
         st.markdown("---")
@@ -1116,7 +1005,8 @@ def render_outfit_view(df_articles: pd.DataFrame, df_cop: pd.DataFrame, base_art
         recommendations = get_outfit_recommendations(
             base_article_id=base_article_id,
             df_articles=df_articles,
-            df_cop=df_cop,
+            cop_adj=cop_adj,
+            rankings=load_fallback_rankings(),
             n_per_category=3,
         )
 
@@ -1354,7 +1244,7 @@ def main():
         st.stop()
 
     try:
-        df_cop = load_copurchase()
+        cop_adj = load_copurchase()
     except FileNotFoundError:
         st.error("Split-Dateien nicht gefunden. Prüfe Ordner: data_processed/copurchase_parts_5/")
         st.stop()
@@ -1374,7 +1264,7 @@ def main():
         if base_article_id is None:
             st.session_state["view"] = "select"
             st.rerun()
-        render_outfit_view(df_articles, df_cop, base_article_id)
+        render_outfit_view(df_articles, cop_adj, base_article_id)
     elif st.session_state["view"] == "summary":
         render_summary_view(df_articles)
 
@@ -1,13 +1,26 @@
 import streamlit as st
-import streamlit.components.v1 as components
 import pandas as pd
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import time
-import math
-import requests
-from PIL import Image
-import colorsys
-from collections import Counter
+# requests, PIL und streamlit.components werden erst in den Funktionen
+# importiert, die sie brauchen (Wetter, Bild-Upload, Scrollen): die
+# Intro-Seite soll ohne sie erscheinen (scripts/benchmark_startup.py)
+
+from article_features import (
+    COLOR_COLUMNS,
+    COLOR_PALETTES,
+    MACRO_DISPLAY_ORDER,
+    build_article_features,
+    get_dominant_color_name,
+    load_article_artifact,
+    segment_rankings,
+)
+from copurchase_store import CopurchasePartitions, load_topk
+from image_store import THUMBNAIL_SIZES, ImagePack, image_relpath, thumbnail_relpath
+from outfit_engine import OutfitEngine, OutfitStore
 
 # ---------------------------------------------------------
 # 1. KONFIGURATION & CSS
@@ -21,8 +34,8 @@ st.set_page_config(
 # DEINE FARBE (Marineblau)
 PRIMARY_COLOR = "#004080" 
 
-st.markdown(f"""
-<style>
+# CSS in Blöcken: die Intro-Seite bekommt nur, was sie braucht (inject_css in main)
+INTRO_CSS = f"""
     /* --- INTRO PAGE (FIX) --- */
     /* Wir nutzen kein 'fixed' mehr, damit der Button nicht verschwindet */
     
@@ -66,7 +79,9 @@ st.markdown(f"""
         /* Credits näher an den Button holen */
         margin-top: 16px;
     }}
+"""
 
+BUTTON_CSS = f"""
     /* --- BUTTONS (MARINEBLAU) --- */
     
     /* Primary (Ausgewählt / Wichtig) */
@@ -95,6 +110,14 @@ st.markdown(f"""
         border: 1px solid #555 !important;
     }}
 
+    /* --- ALLGEMEINE BUTTON GRÖSSE --- */
+    div[data-testid="stButton"] button {{
+        height: 50px !important;
+        width: 100% !important;
+    }}
+"""
+
+APP_CSS = f"""
     /* --- BILDER (BÜNDIG & RAHMEN) --- */
     div[data-testid="stImage"] img {{
         height: 280px !important;
@@ -104,30 +127,65 @@ st.markdown(f"""
         padding: 5px;
         border: 1px solid #333; /* Dunklerer Rahmen für Darkmode */
     }}
-    
-    /* --- ALLGEMEINE BUTTON GRÖSSE --- */
-    div[data-testid="stButton"] button {{
-        height: 50px !important;
-        width: 100% !important;
-    }}
 
     /* Spinner Farbe */
     .stSpinner > div {{
         border-top-color: {PRIMARY_COLOR} !important;
     }}
-</style>
-""", unsafe_allow_html=True)
+"""
+
+
+def inject_css(*blocks):
+    st.markdown(f"<style>{''.join(blocks)}</style>", unsafe_allow_html=True)
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_PROCESSED = BASE_DIR / "data_processed"
-IMAGES_BASE_URL = "https://pub-65f13bc76a9245c6b68256fb466fe755.r2.dev"
+# Bild-Host; leer (IMAGES_BASE_URL= streamlit run demo9.py) = offline aus images_packed/
+IMAGES_BASE_URL = os.environ.get("IMAGES_BASE_URL", "https://pub-65f13bc76a9245c6b68256fb466fe755.r2.dev")
+# Thumbnails aus scripts/build_thumbnails.py (Größen siehe image_store.py). Standardmäßig
+# aus: erst setzen, wenn images_thumbs/ hochgeladen ist, z. B.
+#   THUMBNAILS_BASE_URL=https://<bucket>/thumbs streamlit run demo9.py
+# Leer = überall die Originale von IMAGES_BASE_URL.
+THUMBNAILS_BASE_URL = os.environ.get("THUMBNAILS_BASE_URL", "")
+# Gepackte Thumbnails aus scripts/pack_images.py
+IMAGES_PACKED_DIR = BASE_DIR / "images_packed"
+IMAGES_LOCAL_DIR = BASE_DIR / "images_sample"
 ARTICLES_FILE = DATA_PROCESSED / "articles_filtered.csv"
-COPURCHASE_PARTS_DIR = DATA_PROCESSED / "copurchase_parts_5"
+# Gemessene Bildfarbe pro Artikel (scripts/build_image_colors.py)
+ARTICLE_COLORS_FILE = DATA_PROCESSED / "article_colors.csv"
+# Vorberechnete Artikel-Merkmale (scripts/build_article_features.py)
+ARTICLE_STORE_DIR = DATA_PROCESSED / "articles_store"
+# Verkaufsstatistik pro Artikel (scripts/build_article_popularity.py)
+POPULARITY_FILE = DATA_PROCESSED / "article_popularity.csv"
+# Nach Artikel partitionierter Speicher (scripts/build_copurchase_partitions.py)
+COPURCHASE_STORE_DIR = DATA_PROCESSED / "copurchase_store"
+# Top-K-Partner pro Artikel und Ziel-Makro (scripts/build_copurchase_topk.py)
+COPURCHASE_TOPK_FILE = DATA_PROCESSED / "copurchase_topk.csv"
+# Dieselben Top-K-Listen als Binär-Speicher (memmap, von allen Sitzungen geteilt)
+COPURCHASE_TOPK_STORE_DIR = DATA_PROCESSED / "copurchase_topk_store"
+COPURCHASE_TOP_K = 20
+# Nicht-Co-Purchase-Kandidaten pro Makro bzw. Auswahl für "Überrasch mich"
+# (jeweils die meistverkauften Artikel des Segments)
+FALLBACK_POOL_SIZE = 200
+SURPRISE_TOP_N = 50
+# Empfehlungen pro Ziel-Makro im Karussell
+OUTFIT_TOP_N = 10
+# Vorberechnete Empfehlungen (scripts/build_outfit_recommendations.py)
+OUTFIT_STORE_DIR = DATA_PROCESSED / "outfit_store"
+# Zeitfenster der Co-Purchase-Counts (Spalten in copurchase_topk.csv)
+COPURCHASE_WINDOW_LABELS = {
+    "count": "Alle Zeiten",
+    "count_3m": "Letzte 3 Monate",
+    "count_4w": "Letzte 4 Wochen",
+    "score_decay": "Aktuell (gewichtet)",
+}
 
 # ---------------------------------------------------------
 # 2. HELPER: SCROLL TO TOP
 # ---------------------------------------------------------
 def scroll_to_top():
+    import streamlit.components.v1 as components
+
     js = f"""
     <script>
         function forceScroll() {{
@@ -147,6 +205,8 @@ def scroll_to_top():
 # 3. EXTERNE LOGIK (WETTER & BILD)
 # ---------------------------------------------------------
 def get_weather(city):
+    import requests
+
     try:
         geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={city}&count=1&language=de&format=json"
         geo_res = requests.get(geo_url).json()
@@ -165,241 +225,50 @@ def get_weather(city):
     except:
         return None
 
-def get_dominant_color_name(image):
-    img = image.convert("RGB").resize((50, 50))
-    w, h = img.size
-    img = img.crop((w*0.2, h*0.2, w*0.8, h*0.8))
-    colors = {
-        "black": (0, 0, 0), "white": (255, 255, 255), "grey": (128, 128, 128),
-        "red": (255, 0, 0), "blue": (0, 0, 255), "navy": (0, 0, 128), "green": (0, 128, 0),
-        "yellow": (255, 255, 0), "beige": (245, 245, 220), "brown": (165, 42, 42),
-        "pink": (255, 192, 203), "orange": (255, 165, 0), "purple": (128, 0, 128),
-        "turquoise": (64, 224, 208)
-    }
-    scored_colors = []
-    for pixel in img.getdata():
-        r, g, b = pixel
-        h_val, s_val, v_val = colorsys.rgb_to_hsv(r/255, g/255, b/255)
-        best_match = "other"
-        min_dist = float("inf")
-        for name, (cr, cg, cb) in colors.items():
-            dist = math.sqrt((r-cr)**2 + (g-cg)**2 + (b-cb)**2)
-            if dist < min_dist:
-                min_dist = dist
-                best_match = name
-        weight = 1
-        if s_val > 0.1 and v_val > 0.2 and v_val < 0.9: 
-            if best_match not in ["white", "grey", "black", "beige"]: weight = 3
-        scored_colors.extend([best_match] * weight)
-    counts = Counter(scored_colors)
-    if "other" in counts: del counts["other"]
-    if not counts: return "grey"
-    return counts.most_common(1)[0][0]
-
 # ---------------------------------------------------------
 # 4. MAPPINGS & KEYWORDS
 # ---------------------------------------------------------
-PRODUCT_TYPE_TO_MACRO = {
-    "Hoodie": "TOP", "Sweater": "TOP", "Top": "TOP", "T-shirt": "TOP", "Shirt": "TOP",
-    "Polo shirt": "TOP", "Blouse": "TOP", "Cardigan": "TOP", "Vest top": "TOP",
-    "Sweatshirt": "TOP", "Long sleeve top": "TOP", "Longsleeve": "TOP",
-    "Trousers": "BOTTOM", "Jeans": "BOTTOM", "Shorts": "BOTTOM", "Skirt": "BOTTOM", "Leggings/Tights": "BOTTOM",
-    "Jacket": "OUTERWEAR", "Coat": "OUTERWEAR", "Blazer": "OUTERWEAR",
-    "Sneakers": "SHOES", "Boots": "SHOES", "Bootie": "SHOES", "Ballerinas": "SHOES",
-    "Moccasins": "SHOES", "Pumps": "SHOES", "Heels": "SHOES", "Heeled sandals": "SHOES",
-    "Sandals": "SHOES", "Flat shoe": "SHOES", "Flat shoes": "SHOES", "Flip flop": "SHOES", "Other shoe": "SHOES",
-    "Cap": "ACCESSORY", "Beanie": "ACCESSORY", "Headband": "ACCESSORY", "Hat/beanie": "ACCESSORY",
-    "Hat/brim": "ACCESSORY", "Straw hat": "ACCESSORY", "Felt hat": "ACCESSORY", "Bucket hat": "ACCESSORY", "Bag": "ACCESSORY",
-}
 
 MACRO_LABEL_DE = {
     "TOP": "Oberteil", "BOTTOM": "Unterteil", "OUTERWEAR": "Jacke/Mantel",
     "SHOES": "Schuhe", "ACCESSORY": "Accessoires", "ONE_PIECE": "Kleid/Overall"
 }
-MACRO_DISPLAY_ORDER = ["ACCESSORY", "TOP", "OUTERWEAR", "BOTTOM", "SHOES"]
-
-COLOR_PALETTES = {
-    "beige": ["dark green", "dark blue", "denim blue", "white", "black", "brown", "khaki", "red"],
-    "black": ["white", "beige", "grey", "light grey", "silver", "gold", "red", "light blue", "pink", "khaki"],
-    "white": ["black", "blue", "dark blue", "beige", "grey", "silver", "denim blue", "khaki", "pink", "red"],
-    "off white": ["black", "blue", "dark blue", "beige", "brown", "khaki", "grey"],
-    "grey": ["white", "black", "light pink", "pink", "blue", "denim blue", "dark blue", "red", "purple"],
-    "dark grey": ["white", "black", "light pink", "yellow", "light blue", "grey"],
-    "blue": ["white", "beige", "grey", "black", "yellow", "orange", "silver"],
-    "dark blue": ["white", "beige", "grey", "yellow", "gold", "red", "denim blue", "black"], 
-    "light blue": ["dark blue", "white", "beige", "pink", "silver", "grey"],
-    "red": ["black", "white", "dark blue", "denim blue", "beige", "grey"],
-    "dark red": ["black", "beige", "grey", "white", "dark blue"],
-    "pink": ["grey", "white", "dark blue", "denim blue", "black", "silver"],
-    "green": ["beige", "white", "black", "navy", "denim blue", "yellow"],
-    "dark green": ["beige", "gold", "brown", "white", "black", "grey"],
-    "khaki": ["white", "black", "orange", "red", "denim blue"],
-    "yellow": ["blue", "grey", "white", "black", "navy", "denim blue"],
-    "orange": ["blue", "white", "black", "grey", "khaki"],
-    "brown": ["beige", "white", "blue", "denim blue", "green", "dark green", "black"],
-    "gold": ["black", "white", "dark green", "dark red", "dark blue"],
-    "silver": ["black", "white", "blue", "grey", "pink"],
-}
-
-
-
-# Farb-Familien für die UI (vereinfacht aus demo8)
-COLOR_FAMILY_MAP_UI = {
-    # Beige / Braun
-    "beige": "Beige/Brown",
-    "dark beige": "Beige/Brown",
-    "light beige": "Beige/Brown",
-    "greyish beige": "Beige/Brown",
-    "yellowish brown": "Beige/Brown",
-    "brown": "Beige/Brown",
-    "dark brown": "Beige/Brown",
-    "light brown": "Beige/Brown",
-    "khaki": "Beige/Brown",
-
-    # Schwarz / Weiß / Grau
-    "black": "Black",
-    "white": "White",
-    "off white": "White",
-    "grey": "Grey",
-    "gray": "Grey",
-    "dark grey": "Grey",
-    "light grey": "Grey",
-
-    # Blau
-    "blue": "Blue",
-    "dark blue": "Blue",
-    "light blue": "Blue",
-    "navy": "Blue",
-    "denim blue": "Blue",
-
-    # Rot / Pink
-    "red": "Red",
-    "dark red": "Red",
-    "light red": "Red",
-    "other red": "Red",
-    "pink": "Pink",
-    "dark pink": "Pink",
-    "light pink": "Pink",
-    "other pink": "Pink",
-
-    # Grün
-    "green": "Green",
-    "dark green": "Green",
-    "light green": "Green",
-    "other green": "Green",
-    "lime": "Green",
-    "olive": "Green",
-
-    # Gelb
-    "yellow": "Yellow",
-    "dark yellow": "Yellow",
-    "light yellow": "Yellow",
-    "other yellow": "Yellow",
-
-    # Orange
-    "orange": "Orange",
-    "dark orange": "Orange",
-    "light orange": "Orange",
-    "other orange": "Orange",
-
-    # Lila
-    "purple": "Purple",
-    "dark purple": "Purple",
-    "light purple": "Purple",
-    "lilac": "Purple",
-
-    # Metallic / Spezial
-    "gold": "Metallic",
-    "silver": "Metallic",
-    "metallic": "Metallic",
-
-    # Bunt / Sonstiges
-    "multi": "Multicolour",
-    "multicolour": "Multicolour",
-    "multi coloured": "Multicolour",
-    "other": "Other/Unknown",
-    "unknown": "Other/Unknown",
-}
-
-def get_color_family_ui(name: str) -> str:
-    """
-    Liefert die 'schönen' Farbfamilien wie in demo8 für die UI.
-    Input kann z.B. 'dark blue' oder 'beige' sein.
-    """
-    name = (name or "").strip().lower()
-    if not name:
-        return "Other/Unknown"
-    if name in COLOR_FAMILY_MAP_UI:
-        return COLOR_FAMILY_MAP_UI[name]
-    # Fallback: Einfach lesbar machen
-    return name.title()
-
-
-
-BUSINESS_TYPES = ['Blazer', 'Shirt', 'Blouse', 'Trousers', 'Skirt', 'Coat', 'Pumps', 'Heels', 'Loafers', 'Boots', 'Polo shirt']
-ANTI_BUSINESS_KEYWORDS = ['jogger', 'sweat', 'runner', 'loose', 'relaxed', 'cargo', 'denim', 'jeans']
-SPORT_KEYWORDS = ['sport', 'running', 'training', 'gym', 'racer', 'seamless', 'leggings', 'bra', 'technical', 'yoga']
-PARTY_KEYWORDS = ['sequin', 'glitter', 'sparkle', 'metallic', 'satin', 'velvet', 'tuxedo', 'suit', 'dressy', 'party', 'rhinestone']
-LOUNGE_KEYWORDS = ['pyjama', 'robe', 'sleep', 'night', 'fleece', 'soft', 'home', 'slipper', 'jogger', 'hoodie']
-
-def get_color_family(name: str) -> str:
-    name = (name or "").lower().strip()
-    if not name or name == "nan": return "other"
-    for k in COLOR_PALETTES.keys():
-        if k in name: return k
-    return name
+# Farbpaletten, Gender-/Stil-Regeln und Jacken-Erkennung: article_features.py
 
 # ---------------------------------------------------------
 # 5. CORE LOGIK
 # ---------------------------------------------------------
-def get_image_url(article_id_str: str) -> str:
-    return f"{IMAGES_BASE_URL}/{article_id_str[:3]}/{article_id_str}.jpg"
-
-def assign_gender(idx_name):
-    idx = str(idx_name)
-    if 'Menswear' in idx: return 'Herren'
-    if 'Baby' in idx or 'Children' in idx: return 'Kinder'
-    return 'Damen' 
-
-
-def fix_outerwear_mislabels(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    
-    # 1) Konkrete bekannte Fehlklassifikation korrigieren
-    jacket_ids = [176209023]  # Mr Harrington w/hood
-    df.loc[df["article_id"].isin(jacket_ids), "macro_category"] = "OUTERWEAR"
-    df.loc[df["article_id"].isin(jacket_ids), "product_type_name"] = "Jacket"
-
-    # 2) Generische Regel: Texte enthalten "jacket"/"coat"/"parka" etc.
-    jacket_keywords = ["jacket", "coat", "parka", "anorak", "puffer"]
-    mask_text = (
-        df["detail_desc"].str.lower().fillna("").str.contains("|".join(jacket_keywords))
-        | df["prod_name"].str.lower().fillna("").str.contains("|".join(jacket_keywords))
-    )
-    # Nur Oberkörper-Gruppen umlabeln, die bisher kein OUTERWEAR sind
-    mask_group = df["product_group_name"].str.contains("Garment Upper body", na=False)
-    mask = mask_text & mask_group & (df["macro_category"] != "OUTERWEAR")
-
-    df.loc[mask, "macro_category"] = "OUTERWEAR"
-    # product_type_name kannst du optional lassen oder pauschal auf "Jacket" setzen
-    # df.loc[mask, "product_type_name"] = "Jacket"
-
-    return df
-
-
+def get_image_url(article_id_str: str, size: str = None) -> str:
+    """URL des Originals oder mit size (grid/carousel/medium) des passenden Thumbnails, falls konfiguriert."""
+    if THUMBNAILS_BASE_URL and size in THUMBNAIL_SIZES:
+        return f"{THUMBNAILS_BASE_URL}/{thumbnail_relpath(article_id_str, size)}"
+    return f"{IMAGES_BASE_URL}/{image_relpath(article_id_str)}"
+
+@st.cache_resource
+def load_image_pack(size: str):
+    pack_dir = IMAGES_PACKED_DIR / size
+    if not (pack_dir / "index.npy").exists():
+        return None
+    return ImagePack(pack_dir)
 
-def get_functional_type(row):
-    idx = str(row['index_name'])
-    pt = str(row['product_type_name'])
-    name = str(row['prod_name']).lower()
-    if 'Baby' in idx or 'Children' in idx: return 'Kids'
-    if 'Sport' in idx or pt in ('Sneakers', 'Leggings/Tights') or any(k in name for k in SPORT_KEYWORDS): return 'Sport'
-    if any(k in name for k in LOUNGE_KEYWORDS): return 'Lounge'
-    if any(k in name for k in PARTY_KEYWORDS) or ('gold' in str(row['colour_group_name']).lower()): return 'Party'
-    if pt in BUSINESS_TYPES:
-        if 'Divided' in idx or any(k in name for k in ANTI_BUSINESS_KEYWORDS): return 'Casual'
-        return 'Business'
-    return 'Casual'
+def get_image(article_id_str: str, size: str = "medium"):
+    """
+    Bildquelle für st.image: URL, wenn ein Bild-Host konfiguriert ist,
+    sonst die Bytes aus images_packed/ (mmap), dann das lokale Original,
+    zuletzt ein leerer Platzhalter.
+    """
+    if IMAGES_BASE_URL:
+        return get_image_url(article_id_str, size)
+
+    pack = load_image_pack(size)
+    data = pack.get(int(article_id_str)) if pack is not None else None
+    if data is not None:
+        return data
+    local_path = IMAGES_LOCAL_DIR / image_relpath(article_id_str)
+    if local_path.exists():
+        return str(local_path)
+    from PIL import Image
+    return Image.new("RGB", THUMBNAIL_SIZES.get(size, (200, 300)), "white")
 
 # ---------------------------------------------------------
 # 6. STATE MANAGEMENT
@@ -416,6 +285,7 @@ def init_session_state():
         "blocked_ids": [],
         "weather_data": None,
         "use_weather_logic": False, 
+        "copurchase_window": "count",
         "uploaded_base_item": None,
         "uploaded_image_object": None
     }
@@ -450,274 +320,141 @@ def finish_intro():
 
 # ---------------------------------------------------------
 # 7. DATEN LADEN
+#
+# Artikel und Co-Purchase-Daten werden im Hintergrund geladen, sobald
+# die Intro-Seite das erste Mal gerendert wird (start_loading, einmal
+# pro Server-Prozess). load_data()/load_copurchase() warten nur, wenn
+# der jeweilige Teil noch nicht fertig ist: die Startseite braucht nur
+# die Artikel, die Co-Purchase-Daten erst render_outfit_view.
 # ---------------------------------------------------------
-@st.cache_data
-def load_data():
+def read_data():
+    """
+    Artikel mit allen Merkmalen (macro_category, gender, colour_family,
+    colour_family_ui, style, is_outerwear). Liegt der vorberechnete
+    Artikel-Speicher vor, werden seine Spalten per mmap eingeblendet;
+    sonst wird wie früher aus articles_filtered.csv gerechnet.
+    """
+    if (ARTICLE_STORE_DIR / "meta.json").exists():
+        return load_article_artifact(ARTICLE_STORE_DIR)
+
     df = pd.read_csv(ARTICLES_FILE)
-    df["article_id"] = df["article_id"].astype(int)
-    df["article_id_str"] = df["article_id"].astype(str).str.zfill(10)
+    df_colors = None
+    if ARTICLE_COLORS_FILE.exists():
+        df_colors = pd.read_csv(ARTICLE_COLORS_FILE, usecols=lambda c: c in COLOR_COLUMNS)
+    df_popularity = pd.read_csv(POPULARITY_FILE) if POPULARITY_FILE.exists() else None
+    return build_article_features(df, df_colors, df_popularity)
 
-    # 1) Grund-Mapping
-    df["macro_category"] = df["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
 
-    # 2) 🔹 Fehlklassifizierte Outerwear (Jacken/Mäntel) korrigieren
-    df = fix_outerwear_mislabels(df)
+def read_copurchase():
+    """
+    Top-K-Partnerlisten (article_id -> target_macro, rank, partner_id, count).
+    Bevorzugt der Top-K-Binär-Speicher: nur der Index wird geladen, die
+    Partitionen liegen per memmap im Page-Cache und werden von allen
+    Sitzungen und Server-Prozessen geteilt. Danach die CSV, zuletzt der
+    volle partitionierte Speicher.
+    """
+    if (COPURCHASE_TOPK_STORE_DIR / "index.npy").exists():
+        return CopurchasePartitions(COPURCHASE_TOPK_STORE_DIR)
+    if COPURCHASE_TOPK_FILE.exists():
+        return load_topk(COPURCHASE_TOPK_FILE)
+    return CopurchasePartitions(COPURCHASE_STORE_DIR)
 
-    # 3) Restliche Features berechnen
-    df["gender"] = df["index_name"].apply(assign_gender)
-    df["colour_family"] = df["colour_group_name"].apply(get_color_family)
-    df["colour_family_ui"] = df["colour_family"].apply(get_color_family_ui)
-    df["style"] = df.apply(get_functional_type, axis=1)
 
-    return df
+@st.cache_resource(show_spinner=False)
+def start_loading():
+    """
+    Startet read_data und read_copurchase in Hintergrund-Threads und gibt
+    die Futures zurück. cache_resource: alle Sessions teilen sich
+    denselben Ladevorgang und dieselben Objekte (keine Kopie pro Rerun) –
+    die Daten werden nirgends verändert.
+    """
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="demo9-load")
+    futures = {"data": pool.submit(read_data), "copurchase": pool.submit(read_copurchase)}
+    pool.shutdown(wait=False)
+    return futures
 
 
-@st.cache_data
-def load_copurchase():
-    parts_dir = COPURCHASE_PARTS_DIR
-    part_files = sorted(parts_dir.glob("copurchase_part_*.csv"))
-    dfs = [pd.read_csv(f) for f in part_files]
-    df_all = pd.concat(dfs, ignore_index=True)
-    df_all["article_id_1"] = df_all["article_id_1"].astype(int)
-    df_all["article_id_2"] = df_all["article_id_2"].astype(int)
-    return df_all
+def wait_for(name: str):
+    """Ergebnis eines Ladevorgangs; bei Fehler wird beim nächsten Aufruf neu geladen."""
+    try:
+        return start_loading()[name].result()
+    except Exception:
+        start_loading.clear()
+        raise
 
-def get_base_article_row(df_articles, article_id):
-    if st.session_state["uploaded_base_item"] is not None:
-        if int(article_id) == 999999:
-            return st.session_state["uploaded_base_item"]
-    rows = df_articles[df_articles["article_id"] == article_id]
-    if rows.empty: return None
-    return rows.iloc[0]
 
+def is_loaded(name: str) -> bool:
+    return start_loading()[name].done()
 
 
-# sehr robuste Erkennung für Jacken/Mäntel
-def is_outerwear_like(row):
-    macro = str(row.get("macro_category", "") or "")
-    if macro == "OUTERWEAR":
-        return True
+def load_data():
+    return wait_for("data")
 
-    pt = str(row.get("product_type_name", "") or "").lower()
-    name = str(row.get("prod_name", "") or "").lower()
 
-    keywords = [
-        "jacket", "coat", "parka", "anorak", "blazer",
-        "outerwear", "puffer", "down jacket", "windbreaker"
-    ]
+def load_copurchase():
+    return wait_for("copurchase")
 
-    if any(k in pt for k in keywords):
-        return True
-    if any(k in name for k in keywords):
-        return True
 
-    return False
+@st.cache_resource
+def load_rankings():
+    """(gender, macro_category) -> Zeilenpositionen in load_data(), meistverkauft zuerst."""
+    return segment_rankings(load_data(), ["gender", "macro_category"])
 
 
+@st.cache_resource
+def load_engine():
+    """
+    OutfitEngine über die geladenen Daten (von allen Sitzungen geteilt).
+    Vorberechnete Empfehlungen nutzt sie nur, wenn sie zu diesen Artikeln
+    und Parametern gehören, sonst wird online gerechnet.
+    """
+    store = OutfitStore(OUTFIT_STORE_DIR) if (OUTFIT_STORE_DIR / "meta.json").exists() else None
+    return OutfitEngine(load_data(), load_copurchase(), load_rankings(), store,
+                        top_n=OUTFIT_TOP_N, pool_size=FALLBACK_POOL_SIZE, copurchase_top_k=COPURCHASE_TOP_K)
 
+def get_base_article_row(df_articles, article_id):
+    if st.session_state["uploaded_base_item"] is not None:
+        if int(article_id) == 999999:
+            return st.session_state["uploaded_base_item"]
+    rows = df_articles[df_articles["article_id"] == article_id]
+    if rows.empty: return None
+    return rows.iloc[0]
 
 
 
 # ---------------------------------------------------------
 # 8. RECOMMENDATION ENGINE
+# Scoring und Kandidaten: outfit_engine.py (OutfitEngine). Katalogartikel
+# kommen aus dem vorberechneten Speicher, online gerechnet wird
+# nur für hochgeladene Fotos und wenn ein blockierter Artikel unter den
+# vorberechneten Empfehlungen ist.
 # ---------------------------------------------------------
-def calculate_complex_score(base, cand):
-    score = 0.0
-    log = []
-    
-    # 1. STIL
-    if base['style'] == cand['style']:
-        score += 4.0
-        log.append("✅ Stil: Perfekt (+4)")
-    elif (base['style'] == 'Casual' and cand['style'] == 'Sport'):
-        score += 2.0
-        log.append("🆗 Stil: Okay (+2)")
-    elif (base['style'] == 'Business' and cand['style'] == 'Sport'):
-        score -= 10.0
-        log.append("❌ No-Go: Business + Sport (-10)")
-    else:
-        score -= 2.0
-        log.append("⚠️ Stil-Mix (-2)")
+def get_weather_condition():
+    """Wetterlage für den Score; None, wenn das Wetter nicht berücksichtigt wird."""
+    weather = st.session_state.get("weather_data")
+    if weather and st.session_state.get("use_weather_logic", False):
+        return weather["condition"]
+    return None
 
-    # 2. FARBE
-    b_col = base['colour_family']
-    c_col = cand['colour_family']
-    palette = COLOR_PALETTES.get(b_col, [])
-    
-    if b_col == c_col:
-        score += 3.0
-        log.append("🎨 Monochrom (+3)")
-    elif c_col in palette:
-        score += 4.0
-        log.append(f"🎨 Harmonisch (+4)")
-    elif b_col in ["black", "white", "grey"]:
-        score += 2.0
-        log.append("🛡️ Neutral (+2)")
-    else:
-        score -= 1.0
-        log.append("🎨 Riskant (-1)")
 
-    # 3. WETTER
-    weather = st.session_state.get("weather_data")
-    use_w = st.session_state.get("use_weather_logic", False)
-    if weather and use_w:
-        pt = cand['product_type_name']
-        if weather["condition"] in ["Cold", "Rain", "Snow"]:
-            if pt in ["Jacket", "Coat", "Hoodie", "Sweater", "Boots"]:
-                score += 3.0
-                log.append("🌤️ Wetter: Warm (+3)")
-            if pt in ["Shorts", "Sandals", "Vest top"]:
-                score -= 5.0
-                log.append("🥶 Wetter: Zu kalt (-5)")
-        elif weather["condition"] == "Hot":
-            if pt in ["Shorts", "Sandals", "Vest top", "T-shirt", "Skirt"]:
-                score += 3.0
-                log.append("☀️ Wetter: Luftig (+3)")
-            if pt in ["Coat", "Sweater", "Hoodie"]:
-                score -= 5.0
-                log.append("🥵 Wetter: Zu heiß (-5)")
-
-    # 4. BONUS
-    if cand.get('is_copurchase', False):
-        score += 2.0
-        log.append("🔥 Popularity Bonus (+2)")
-
-    final_percent = int(max(0, min(100, score * 10 + 20)))
-    return final_percent, "\n".join(log)
-
-
-def get_smart_recommendations(base_id, df, df_cop, n=20, selected_macros=None):
+def get_smart_recommendations(base_id, df, selected_macros=None, window=None):
     base_row = get_base_article_row(df, base_id)
     if base_row is None:
         return {}
 
-    base_macro = base_row["macro_category"]
-    base_gender = base_row["gender"]
-
-    # Basisteil jacken-/mantelartig?
-    base_is_outerwear_like = is_outerwear_like(base_row)
-
-    # -------------------------
-    # Co-Purchase-Kandidaten
-    # -------------------------
-    candidates = pd.DataFrame()
-    if base_id != 999999:
-        mask = (df_cop["article_id_1"] == base_id) | (df_cop["article_id_2"] == base_id)
-        df_pairs = df_cop[mask].copy()
-        if not df_pairs.empty:
-            df_pairs["partner_id"] = df_pairs.apply(
-                lambda r: r["article_id_2"] if r["article_id_1"] == base_id else r["article_id_1"],
-                axis=1,
-            )
-            candidates = df_pairs.merge(df, left_on="partner_id", right_on="article_id")
-
-    outfit = {}
-
-    # -------------------------
-    # Ziel-Makros bestimmen
-    # -------------------------
-    def build_target_macros(selected_macros_local):
-        result = []
-        for m in MACRO_DISPLAY_ORDER:
-            # UI-Auswahl respektieren, falls gesetzt
-            if selected_macros_local is not None and m not in selected_macros_local:
-                continue
-            # niemals Makrokategorie des Basisteils doppeln
-            if m == base_macro:
-                continue
-            # wenn Basisteil Jacke/Mantel → keine OUTERWEAR-Makros mehr
-            if base_is_outerwear_like and m == "OUTERWEAR":
-                continue
-            result.append(m)
-        return result
-
-    target_macros = build_target_macros(selected_macros)
-
-    # Fallback, falls alles rausgefiltert wurde
-    if not target_macros:
-        target_macros = build_target_macros(None)
-
-    # -------------------------
-    # Empfehlungen pro Makro
-    # -------------------------
-        # -------------------------
-    # Empfehlungen pro Makro
-    # -------------------------
-    for target in target_macros:
-        pool = df[
-            (df["macro_category"] == target)
-            & (df["gender"] == base_gender)
-            & (df["article_id"] != base_id)
-        ]
-
-        # Basis-Filter auf dem "normalen" Pool
-        if base_is_outerwear_like:
-            pool = pool[~pool.apply(is_outerwear_like, axis=1)]
-
-        cp_matches = pd.DataFrame()
-        if not candidates.empty:
-            cp_matches = candidates[candidates["macro_category"] == target].copy()
-            cp_matches["is_copurchase"] = True
-
-        pool_sample = pool.head(200).copy()
-        pool_sample["is_copurchase"] = False
-
-        combined = pd.concat([cp_matches, pool_sample]).drop_duplicates(subset="article_id")
-
-        # 🔴 WICHTIG: Jetzt auch Co-Purchase-Jacken rauswerfen
-        if base_is_outerwear_like:
-            combined = combined[~combined.apply(is_outerwear_like, axis=1)]
-
-        combined = combined[~combined["article_id"].isin(st.session_state["blocked_ids"])]
-
-        if combined.empty:
-            continue
-
-        results = []
-        for _, row in combined.iterrows():
-            sc, tt = calculate_complex_score(base_row, row)
-            row["match_score"] = sc
-            row["tooltip"] = tt
-            results.append(row)
-
-        if not results:
-            continue
-
-        final_df = pd.DataFrame(results)
-        top_picks = (
-            final_df.sort_values("match_score", ascending=False)
-            .head(10)
-            .reset_index(drop=True)
-        )
-
-        if not top_picks.empty:
-            outfit[target] = top_picks
-
-
-        if combined.empty:
-            continue
-
-        results = []
-        for _, row in combined.iterrows():
-            sc, tt = calculate_complex_score(base_row, row)
-            row["match_score"] = sc
-            row["tooltip"] = tt
-            results.append(row)
-
-        if not results:
-            continue
+    # Zeitfenster der Co-Purchase-Counts (count, count_3m, count_4w, score_decay)
+    if window is None:
+        window = st.session_state.get("copurchase_window", "count")
 
-        final_df = pd.DataFrame(results)
-        top_picks = (
-            final_df.sort_values("match_score", ascending=False)
-            .head(10)
-            .reset_index(drop=True)
-        )
-
-        if not top_picks.empty:
-            outfit[target] = top_picks
-
-    return outfit
+    # Hochgeladene Fotos haben keine Co-Purchase-Partner
+    return load_engine().recommend(
+        base_row,
+        selected_macros=selected_macros,
+        window=window,
+        weather_condition=get_weather_condition(),
+        blocked_ids=st.session_state["blocked_ids"],
+        use_copurchase=base_id != 999999,
+    )
 
 # ---------------------------------------------------------
 # 9. UI: INTRO PAGE
@@ -762,10 +499,11 @@ def render_landing_page(df):
 
     disabled_surprise = st.session_state.sel_gender is None
     if c4.button("🎲 Überrasch mich!", disabled=disabled_surprise, type="secondary", use_container_width=True):
-        subset = df[(df["gender"] == st.session_state.sel_gender) & (df["macro_category"] == "TOP")]
-        if not subset.empty:
-            rnd = subset.sample(1).iloc[0]
-            set_base_article(rnd.article_id)
+        # zufällig aus den meistverkauften Oberteilen der Abteilung
+        ranked = load_rankings().get((st.session_state.sel_gender, "TOP"))
+        if ranked is not None and len(ranked) > 0:
+            pos = random.choice(ranked[:SURPRISE_TOP_N].tolist())
+            set_base_article(df["article_id"].iat[pos])
             st.rerun()
 
     if st.session_state.sel_gender is None:
@@ -793,10 +531,23 @@ def render_landing_page(df):
             else:
                 st.toast("Stadt nicht gefunden 🚫", icon="⚠️")
         
+    # ----------------- CO-PURCHASE-ZEITRAUM -----------------
+    with st.expander("🕒 Zeitraum für \"oft zusammen gekauft\"", expanded=False):
+        windows = list(COPURCHASE_WINDOW_LABELS)
+        current = st.session_state.get("copurchase_window", "count")
+        st.session_state["copurchase_window"] = st.radio(
+            "Welche Käufe zählen?",
+            windows,
+            index=windows.index(current) if current in windows else 0,
+            format_func=COPURCHASE_WINDOW_LABELS.get,
+            horizontal=True,
+        )
+
     # ----------------- MATCH MY CLOSET -----------------
     with st.expander("📸 Match my Closet", expanded=False):
         uploaded_file = st.file_uploader("Lade ein Foto deines Teils hoch", type=["jpg", "png"])
         if uploaded_file:
+            from PIL import Image
             img = Image.open(uploaded_file)
             col_name = get_dominant_color_name(img)
             st.image(img, width=100, caption=f"Erkannte Farbe: {col_name.title()}")
@@ -827,6 +578,7 @@ def render_landing_page(df):
                     "style": style_manual,
                     "gender": st.session_state.sel_gender,
                     "index_name": "Upload",
+                    "is_outerwear": internal_macro == "OUTERWEAR",
                 })
                 st.session_state["uploaded_base_item"] = fake_row
                 st.session_state["uploaded_image_object"] = img
@@ -967,7 +719,7 @@ def render_landing_page(df):
     cols = st.columns(6)
     for i, row in enumerate(df_show.itertuples()):
         with cols[i % 6]:
-            st.image(get_image_url(row.article_id_str), use_container_width=True)
+            st.image(get_image(row.article_id_str, "grid"), use_container_width=True)
             clean_name = row.prod_name.strip()
             if len(clean_name) > 16:
                 clean_name = clean_name[:14] + ".."
@@ -996,7 +748,7 @@ def render_landing_page(df):
 # ---------------------------------------------------------
 # 11. UI: OUTFIT PAGE
 # ---------------------------------------------------------
-def render_outfit_view(df, df_cop, base_id):
+def render_outfit_view(df, base_id):
     scroll_to_top()
     if st.button("⬅️ Zurück zur Auswahl"):
         st.session_state["view"] = "select"
@@ -1010,13 +762,7 @@ def render_outfit_view(df, df_cop, base_id):
     # Outfit-Kategorien aus der Landing-Page übernehmen (falls gesetzt)
     selected_macros = st.session_state.get("outfit_macros")
 
-    recommendations = get_smart_recommendations(
-        base_id,
-        df,
-        df_cop,
-        n=10,
-        selected_macros=selected_macros,
-    )
+    recommendations = get_smart_recommendations(base_id, df, selected_macros=selected_macros)
 
 
     col_left, col_right = st.columns([1.4, 2.6])
@@ -1028,7 +774,7 @@ def render_outfit_view(df, df_cop, base_id):
              if st.session_state.get("uploaded_image_object"):
                  st.image(st.session_state["uploaded_image_object"], use_container_width=True)
         else:
-            st.image(get_image_url(base_row["article_id_str"]), use_container_width=True)
+            st.image(get_image(base_row["article_id_str"], "medium"), use_container_width=True)
         
         st.markdown(f"**{base_row['prod_name']}**")
         st.caption(f"Stil: {base_row['style']} | Farbe: {base_row['colour_group_name']}")
@@ -1065,7 +811,7 @@ def render_outfit_view(df, df_cop, base_id):
                     st.markdown('</div>', unsafe_allow_html=True)
                     
                 with c_i:
-                    st.image(get_image_url(item["article_id_str"]), use_container_width=True)
+                    st.image(get_image(item["article_id_str"], "carousel"), use_container_width=True)
                     st.caption(f"{item['prod_name']}")
                     
                     sc = int(item["match_score"])
@@ -1156,7 +902,7 @@ def render_final_page(df):
                     if is_base and art_id == 999999 and st.session_state.get("uploaded_image_object"):
                         st.image(st.session_state["uploaded_image_object"], use_container_width=True)
                     else:
-                        st.image(get_image_url(row["article_id_str"]), use_container_width=True)
+                        st.image(get_image(row["article_id_str"], "medium"), use_container_width=True)
 
                 with col_txt:
                     label = MACRO_LABEL_DE.get(macro, macro)
@@ -1177,25 +923,38 @@ def render_final_page(df):
 # ---------------------------------------------------------
 # 13. MAIN ROUTING
 # ---------------------------------------------------------
+def wait_with_spinner(name: str, message: str):
+    """Wie wait_for, zeigt aber einen Spinner, solange der Ladevorgang noch läuft."""
+    try:
+        if is_loaded(name):
+            return wait_for(name)
+        with st.spinner(message):
+            return wait_for(name)
+    except Exception as e:
+        st.error(f"Fehler: {e}"); st.stop()
+
+
 def main():
     init_session_state()
     
     if not st.session_state["intro_done"]:
+        inject_css(INTRO_CSS, BUTTON_CSS)
         render_intro_page()
+        # Erst nach dem Rendern starten, damit die Intro-Seite nicht auf
+        # den Lade-Thread wartet; er läuft weiter, während sie angezeigt wird
+        start_loading()
     else:
-        try:
-            with st.spinner("Lade Daten..."):
-                df = load_data()
-                df_cop = load_copurchase()
-        except Exception as e:
-            st.error(f"Fehler: {e}"); st.stop()
+        inject_css(BUTTON_CSS, APP_CSS)
+        df = wait_with_spinner("data", "Lade Daten...")
 
         if st.session_state["view"] == "select":
             render_landing_page(df)
         elif st.session_state["view"] == "outfit":
             if st.session_state["base_article_id"] is None:
                 st.session_state["view"] = "select"; st.rerun()
-            render_outfit_view(df, df_cop, st.session_state["base_article_id"])
+            # load_engine braucht die Co-Purchase-Daten, hier mit Spinner warten
+            wait_with_spinner("copurchase", "Lade Co-Purchase-Daten...")
+            render_outfit_view(df, st.session_state["base_article_id"])
         elif st.session_state["view"] == "final":
             render_final_page(df)
 
@@ -0,0 +1,154 @@
+import json
+import mmap
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Lokale Bilder für die Apps: Manifest, Thumbnails, gepackte Blobs
+#
+# Bild-Manifest für lokale Bildordner (images_sample/):
+# scripts/copy_images_sample.py schreibt pro Artikel eine Zeile in
+# <bildordner>/manifest.csv:
+#   article_id, size, mtime_ns, checksum, missing
+# missing = True heißt: im Quellordner gibt es kein Bild zu diesem
+# Artikel. Die Apps lesen das Manifest einmal und sparen sich damit den
+# Path.exists()-Aufruf pro angezeigtem Bild.
+# ---------------------------------------------------------
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = ["article_id", "size", "mtime_ns", "checksum", "missing"]
+
+# ---------------------------------------------------------
+# Thumbnails (scripts/build_thumbnails.py)
+#
+# Pro Ansicht eine feste Größe (Bounding-Box in Pixeln, Seitenverhältnis
+# bleibt erhalten). Alle Bilder in demo9 werden per CSS auf 280 px Höhe
+# gesetzt; die Boxen sind auf die jeweilige Spaltenbreite ausgelegt.
+#   grid      Startseite, 6 Spalten
+#   carousel  Outfit-Karussell (◀ Bild ▶)
+#   medium    Basisteil und Outfit-Zusammenfassung
+# Layout: <thumbs>/<size>/010/0101234567.webp
+# ---------------------------------------------------------
+THUMBNAIL_SIZES = {
+    "grid": (200, 300),
+    "carousel": (280, 420),
+    "medium": (480, 720),
+}
+THUMBNAIL_FORMAT = "webp"       # "webp" oder "jpg"
+THUMBNAIL_QUALITY = 80
+
+
+def image_relpath(article_id_str: str) -> str:
+    """Relativer Pfad im H&M-Layout: 010/0101234567.jpg"""
+    return f"{article_id_str[:3]}/{article_id_str}.jpg"
+
+
+def thumbnail_relpath(article_id_str: str, size: str) -> str:
+    """Relativer Pfad eines Thumbnails: grid/010/0101234567.webp"""
+    return f"{size}/{article_id_str[:3]}/{article_id_str}.{THUMBNAIL_FORMAT}"
+
+
+def load_manifest(images_root) -> pd.DataFrame:
+    """Manifest als DataFrame (indiziert nach article_id); leer, wenn keins existiert."""
+    path = Path(images_root) / MANIFEST_NAME
+    if not path.exists():
+        return pd.DataFrame(columns=MANIFEST_COLUMNS).set_index("article_id")
+    df = pd.read_csv(
+        path,
+        dtype={"article_id": "int64", "size": "int64", "mtime_ns": "int64",
+               "checksum": "string", "missing": "bool"},
+    )
+    return df.set_index("article_id")
+
+
+def available_article_ids(images_root) -> set | None:
+    """article_ids mit Bild laut Manifest; None, wenn es (noch) kein Manifest gibt."""
+    manifest = load_manifest(images_root)
+    if manifest.empty:
+        return None
+    return set(manifest.index[~manifest["missing"]].tolist())
+
+
+# ---------------------------------------------------------
+# Gepackte Bilder (scripts/pack_images.py)
+#
+# Statt zehntausender kleiner Dateien pro Thumbnail-Größe wenige Blobs:
+#   <pack>/<size>/blob_000.bin ...   Bild-Bytes hintereinander
+#   <pack>/<size>/index.npy          article_id -> (blob, offset, length),
+#                                    sortiert nach article_id
+#   <pack>/<size>/meta.json          Anzahl Bilder/Blobs, Format
+# Jeder Blob bleibt unter max_blob_mb (Repo-Limit). Die App liest die
+# Bytes direkt aus dem per mmap geöffneten Blob (st.image(bytes)).
+# ---------------------------------------------------------
+PACK_INDEX_DTYPE = np.dtype([
+    ("article_id", "<i8"),
+    ("blob", "<u2"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+])
+
+
+def write_image_pack(article_ids, paths, pack_dir, max_blob_mb: float = 40.0, image_format: str = None) -> dict:
+    """Packt die Dateien paths (gleiche Reihenfolge wie article_ids) in Blobs; gibt die Meta-Daten zurück."""
+    pack_dir = Path(pack_dir)
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    for old in pack_dir.glob("blob_*.bin"):
+        old.unlink()
+
+    order = np.argsort(np.asarray(article_ids, dtype=np.int64), kind="stable")
+    index = np.zeros(len(order), dtype=PACK_INDEX_DTYPE)
+    max_bytes = int(max_blob_mb * 2**20)
+    blob, offset = 0, 0
+    f = open(pack_dir / f"blob_{blob:03d}.bin", "wb")
+    try:
+        for i, j in enumerate(order):
+            data = Path(paths[j]).read_bytes()
+            if offset > 0 and offset + len(data) > max_bytes:
+                f.close()
+                blob, offset = blob + 1, 0
+                f = open(pack_dir / f"blob_{blob:03d}.bin", "wb")
+            f.write(data)
+            index[i] = (article_ids[j], blob, offset, len(data))
+            offset += len(data)
+    finally:
+        f.close()
+
+    np.save(pack_dir / "index.npy", index)
+    meta = {"n_images": int(len(index)), "n_blobs": blob + 1, "format": image_format}
+    with open(pack_dir / "meta.json", "w", encoding="utf-8") as f_meta:
+        json.dump(meta, f_meta, indent=2)
+    return meta
+
+
+class ImagePack:
+    """
+    Lesezugriff auf einen gepackten Bildordner; Blobs werden erst beim
+    ersten Zugriff per mmap geöffnet.
+
+        pack = ImagePack("images_packed/grid")
+        pack.get(108775015)     # Bild-Bytes oder None
+    """
+
+    def __init__(self, pack_dir):
+        self.pack_dir = Path(pack_dir)
+        self.index = np.load(self.pack_dir / "index.npy")
+        self._blobs = {}
+
+    def __contains__(self, article_id: int) -> bool:
+        pos = np.searchsorted(self.index["article_id"], article_id)
+        return pos < len(self.index) and self.index["article_id"][pos] == article_id
+
+    def _blob(self, blob: int) -> mmap.mmap:
+        if blob not in self._blobs:
+            with open(self.pack_dir / f"blob_{blob:03d}.bin", "rb") as f:
+                self._blobs[blob] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._blobs[blob]
+
+    def get(self, article_id: int) -> bytes | None:
+        pos = np.searchsorted(self.index["article_id"], article_id)
+        if pos >= len(self.index) or self.index["article_id"][pos] != article_id:
+            return None
+        entry = self.index[pos]
+        offset, length = int(entry["offset"]), int(entry["length"])
+        return self._blob(int(entry["blob"]))[offset:offset + length]
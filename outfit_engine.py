@@ -0,0 +1,653 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from article_features import COLOR_PALETTES, MACRO_DISPLAY_ORDER, load_article_artifact, segment_rankings
+from copurchase_store import PARTITION_DTYPE, CopurchasePartitions, get_topk_partners, load_topk
+
+# ---------------------------------------------------------
+# Outfit-Empfehlungen ohne Streamlit (demo9, scripts/build_outfit_recommendations.py,
+# scripts/serve_outfits.py)
+#
+# Pro Basisartikel und Ziel-Makrokategorie:
+#   Kandidaten = Co-Purchase-Partner (Top-K im gewählten Zeitfenster)
+#                + die POOL_SIZE meistverkauften Artikel des Segments
+#                  (gleiches Gender, Ziel-Makro)
+#   Score      = calculate_complex_score (Stil, Farbe, Wetter, Co-Purchase)
+#   Ergebnis   = die TOP_N Kandidaten mit dem höchsten Score
+# Alle Eingaben kommen als Argumente (keine Session), damit dieselbe
+# Logik in der App und im Batch-Job läuft.
+# ---------------------------------------------------------
+TOP_N = 10
+POOL_SIZE = 200
+COPURCHASE_TOP_K = 20
+
+# Spalten, die calculate_complex_score liest
+SCORE_COLUMNS = ["style", "colour_family", "product_type_name", "is_copurchase"]
+
+COPURCHASE_BONUS = 2.0
+
+# Wetterlagen mit gleicher Wirkung auf den Score
+COLD_CONDITIONS = ["Cold", "Rain", "Snow"]
+WEATHER_VARIANTS = {"none": None, "cold": "Cold", "hot": "Hot"}
+
+
+def weather_variant(condition: str = None) -> str:
+    """Wetterlage (get_weather in demo9, None = Wetter aus) -> Schlüssel in WEATHER_VARIANTS."""
+    if condition in COLD_CONDITIONS:
+        return "cold"
+    if condition == "Hot":
+        return "hot"
+    return "none"
+
+
+def style_points(base_style, cand_style):
+    """Punkte und Tooltip-Zeile für die Stil-Kombination."""
+    if base_style == cand_style:
+        return 4.0, "✅ Stil: Perfekt (+4)"
+    if base_style == 'Casual' and cand_style == 'Sport':
+        return 2.0, "🆗 Stil: Okay (+2)"
+    if base_style == 'Business' and cand_style == 'Sport':
+        return -10.0, "❌ No-Go: Business + Sport (-10)"
+    return -2.0, "⚠️ Stil-Mix (-2)"
+
+
+def colour_points(base_colour, cand_colour):
+    """Punkte und Tooltip-Zeile für die Farbkombination (COLOR_PALETTES)."""
+    if base_colour == cand_colour:
+        return 3.0, "🎨 Monochrom (+3)"
+    if cand_colour in COLOR_PALETTES.get(base_colour, []):
+        return 4.0, "🎨 Harmonisch (+4)"
+    if base_colour in ["black", "white", "grey"]:
+        return 2.0, "🛡️ Neutral (+2)"
+    return -1.0, "🎨 Riskant (-1)"
+
+
+def weather_points(weather_condition, product_type):
+    """Punkte und Tooltip-Zeilen für den Produkttyp bei dieser Wetterlage (None = Wetter aus)."""
+    score = 0.0
+    log = []
+    if weather_condition in COLD_CONDITIONS:
+        if product_type in ["Jacket", "Coat", "Hoodie", "Sweater", "Boots"]:
+            score += 3.0
+            log.append("🌤️ Wetter: Warm (+3)")
+        if product_type in ["Shorts", "Sandals", "Vest top"]:
+            score -= 5.0
+            log.append("🥶 Wetter: Zu kalt (-5)")
+    elif weather_condition == "Hot":
+        if product_type in ["Shorts", "Sandals", "Vest top", "T-shirt", "Skirt"]:
+            score += 3.0
+            log.append("☀️ Wetter: Luftig (+3)")
+        if product_type in ["Coat", "Sweater", "Hoodie"]:
+            score -= 5.0
+            log.append("🥵 Wetter: Zu heiß (-5)")
+    return score, log
+
+
+def match_percent(score):
+    """Punktsumme -> Anzeige-Score 0-100 (Skalar oder Array)."""
+    return np.clip(np.asarray(score) * 10 + 20, 0, 100).astype(int)
+
+
+def calculate_complex_score(base, cand, weather_condition: str = None):
+    # 1. STIL
+    style, style_log = style_points(base['style'], cand['style'])
+
+    # 2. FARBE
+    colour, colour_log = colour_points(base['colour_family'], cand['colour_family'])
+
+    # 3. WETTER
+    weather, weather_log = 0.0, []
+    if weather_condition:
+        weather, weather_log = weather_points(weather_condition, cand['product_type_name'])
+
+    score = style + colour + weather
+    log = [style_log, colour_log] + weather_log
+
+    # 4. BONUS
+    if cand.get('is_copurchase', False):
+        score += COPURCHASE_BONUS
+        log.append("🔥 Popularity Bonus (+2)")
+
+    return int(match_percent(score)), "\n".join(log)
+
+
+def build_target_macros(base_macro: str, base_is_outerwear: bool, selected_macros=None) -> list:
+    """
+    Ziel-Makros in Anzeige-Reihenfolge: nie die Makro des Basisteils,
+    keine OUTERWEAR zu einer Jacke. selected_macros (UI-Auswahl) schränkt
+    weiter ein; bleibt dabei nichts übrig, gelten alle.
+    """
+    def _targets(selected):
+        return [
+            m for m in MACRO_DISPLAY_ORDER
+            if (selected is None or m in selected)
+            and m != base_macro
+            and not (base_is_outerwear and m == "OUTERWEAR")
+        ]
+
+    return _targets(selected_macros) or _targets(None)
+
+
+def candidate_pools(base_row, df: pd.DataFrame, copurchase, rankings: dict, target_macros: list,
+                    window: str = "count", blocked_ids=(), pool_size: int = POOL_SIZE,
+                    copurchase_top_k: int = COPURCHASE_TOP_K) -> dict:
+    """
+    Kandidaten pro Ziel-Makro (noch ohne Score), Co-Purchase-Partner
+    zuerst (is_copurchase). copurchase: Top-K-Tabelle bzw.
+    CopurchasePartitions oder None (z. B. für hochgeladene Fotos).
+    rankings: segment_rankings(df, ["gender", "macro_category"]).
+    """
+    base_id = base_row["article_id"]
+    base_is_outerwear_like = bool(base_row["is_outerwear"])
+
+    candidates = pd.DataFrame()
+    if copurchase is not None:
+        # Vorberechnete Top-K-Partner pro Ziel-Makro, kein Scan über alle Paare
+        df_pairs = get_topk_partners(copurchase, base_id, window=window, k=copurchase_top_k)
+        if not df_pairs.empty:
+            candidates = df_pairs.drop(columns="target_macro").merge(
+                df, left_on="partner_id", right_on="article_id"
+            )
+
+    pools = {}
+    article_ids = df["article_id"].to_numpy()
+    is_outerwear = df["is_outerwear"].to_numpy()
+    for target in target_macros:
+        # Pool: meistverkaufte Artikel des Segments (vorsortiert, siehe segment_rankings)
+        ranked = rankings.get((base_row["gender"], target), np.empty(0, dtype=np.int64))
+        keep = article_ids[ranked] != base_id
+
+        # Basis-Filter auf dem "normalen" Pool
+        if base_is_outerwear_like:
+            keep &= ~is_outerwear[ranked]
+
+        cp_matches = pd.DataFrame()
+        if not candidates.empty:
+            cp_matches = candidates[candidates["macro_category"] == target].copy()
+            cp_matches["is_copurchase"] = True
+
+        pool_sample = df.iloc[ranked[keep][:pool_size]].copy()
+        pool_sample["is_copurchase"] = False
+
+        combined = pd.concat([cp_matches, pool_sample]).drop_duplicates(subset="article_id")
+
+        # 🔴 WICHTIG: Jetzt auch Co-Purchase-Jacken rauswerfen
+        if base_is_outerwear_like:
+            combined = combined[~combined["is_outerwear"].astype(bool)]
+
+        combined = combined[~combined["article_id"].isin(list(blocked_ids))]
+
+        if not combined.empty:
+            pools[target] = combined
+    return pools
+
+
+def score_candidates(base_row, candidates: pd.DataFrame, weather_condition: str = None,
+                     top_n: int = TOP_N, sort: bool = True) -> pd.DataFrame:
+    """
+    Kandidaten mit match_score und tooltip; mit sort die top_n besten
+    (stabil sortiert: bei Gleichstand gilt die Reihenfolge der Kandidaten).
+    """
+    base = {c: base_row[c] for c in ["style", "colour_family"]}
+    records = candidates[[c for c in SCORE_COLUMNS if c in candidates.columns]].to_dict("records")
+    scored = [calculate_complex_score(base, cand, weather_condition) for cand in records]
+    result = candidates.assign(match_score=[s for s, _ in scored], tooltip=[t for _, t in scored])
+    if sort:
+        result = result.sort_values("match_score", ascending=False, kind="stable").head(top_n)
+    return result.reset_index(drop=True)
+
+
+def recommend(base_row, df: pd.DataFrame, copurchase, rankings: dict, selected_macros=None,
+              window: str = "count", weather_condition: str = None, blocked_ids=(),
+              top_n: int = TOP_N, pool_size: int = POOL_SIZE,
+              copurchase_top_k: int = COPURCHASE_TOP_K) -> dict:
+    """Ziel-Makro -> DataFrame der top_n Empfehlungen (Artikel-Spalten + match_score, tooltip)."""
+    target_macros = build_target_macros(base_row["macro_category"], bool(base_row["is_outerwear"]), selected_macros)
+    pools = candidate_pools(base_row, df, copurchase, rankings, target_macros, window,
+                            blocked_ids, pool_size, copurchase_top_k)
+    return {target: score_candidates(base_row, combined, weather_condition, top_n)
+            for target, combined in pools.items()}
+
+
+# ---------------------------------------------------------
+# Batch: viele Basisartikel in einem Durchgang (recommend_batch)
+#
+# Gleiche Regeln wie recommend(), aber ohne DataFrame pro Kandidat:
+#   - Score-Teile als Tabellen über die Kategorien (Stil x Stil,
+#     Farbe x Farbe, Wetter x Produkttyp), gebaut aus denselben
+#     *_points-Funktionen; ein Score ist damit eine Summe von Lookups.
+#   - Der Segment-Pool hängt nur von (Gender, Jacke ja/nein, Ziel-Makro)
+#     ab und wird für alle Basisartikel der Gruppe gemeinsam bewertet
+#     (Basis x Pool per Broadcasting).
+#   - Co-Purchase-Partner aller Basisartikel werden als Zeilen-Slices
+#     aus der Top-K-Tabelle bzw. dem Partitions-Speicher gesammelt.
+# Ergebnis pro Basis und Ziel-Makro (Reihenfolge MACRO_DISPLAY_ORDER)
+# die top_n Zeilenpositionen in df, Scores und Co-Purchase-Flags.
+# ---------------------------------------------------------
+def _codes(values: pd.Series):
+    """Codes über die Werte einer Spalte; fehlende Werte bekommen einen eigenen Code (NaN)."""
+    codes, uniques = pd.factorize(values.astype(object))
+    uniques = list(uniques) + [np.nan]
+    codes = np.where(codes < 0, len(uniques) - 1, codes)
+    return codes, uniques
+
+
+def score_tables(df: pd.DataFrame, weather_condition: str = None) -> dict:
+    """Kategorie-Codes pro Artikel und Punkte-Tabellen für recommend_batch."""
+    style, styles = _codes(df["style"])
+    colour, colours = _codes(df["colour_family"])
+    product_type, product_types = _codes(df["product_type_name"])
+    return {
+        "style": style,
+        "colour": colour,
+        "product_type": product_type,
+        "style_points": np.array([[style_points(b, c)[0] for c in styles] for b in styles]),
+        "colour_points": np.array([[colour_points(b, c)[0] for c in colours] for b in colours]),
+        "weather_points": np.array([weather_points(weather_condition, pt)[0] for pt in product_types]),
+    }
+
+
+def _pair_scores(tables: dict, base_pos: np.ndarray, cand_pos: np.ndarray, copurchase) -> np.ndarray:
+    """match_percent für Basis x Kandidat (gleiche Form wie cand_pos; base_pos passend broadcastbar)."""
+    score = (tables["style_points"][tables["style"][base_pos], tables["style"][cand_pos]]
+             + tables["colour_points"][tables["colour"][base_pos], tables["colour"][cand_pos]]
+             + tables["weather_points"][tables["product_type"][cand_pos]]
+             + np.where(copurchase, COPURCHASE_BONUS, 0.0))
+    return match_percent(score)
+
+
+def _slices(lo: np.ndarray, hi: np.ndarray):
+    """(Nummer des Slices, Zeile) für alle Zeilen der Slices lo[i]:hi[i]."""
+    lengths = hi - lo
+    owner = np.repeat(np.arange(len(lo)), lengths)
+    rows = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(lo, lengths)
+    return owner, rows
+
+
+def copurchase_entries(copurchase, base_ids: np.ndarray, window: str = "count",
+                       copurchase_top_k: int = COPURCHASE_TOP_K) -> dict:
+    """
+    Co-Purchase-Partner aller Basisartikel wie get_topk_partners(k=copurchase_top_k):
+    base (Index in base_ids), partner_id, value (Spalte window), nach
+    base, value absteigend, partner_id sortiert.
+    """
+    empty = {"base": np.zeros(0, dtype=np.int64), "partner_id": np.zeros(0, dtype=np.int64),
+             "value": np.zeros(0)}
+    if copurchase is None or len(base_ids) == 0:
+        return empty
+
+    macro_index = pd.Index(MACRO_DISPLAY_ORDER)
+    if isinstance(copurchase, CopurchasePartitions):
+        if window not in copurchase.meta["columns"]:
+            window = "count"
+        parts = [copurchase.partner_rows(a) for a in base_ids]
+        lengths = np.array([len(p) for p in parts])
+        rows = np.concatenate(parts) if parts else np.zeros(0, dtype=PARTITION_DTYPE)
+        base = np.repeat(np.arange(len(base_ids)), lengths)
+        lut = np.append(macro_index.get_indexer(copurchase.meta["macros"]), -1)
+        macro = lut[np.minimum(rows["target_macro"].astype(np.int64), len(lut) - 1)]
+        partner_id = rows["partner_id"].astype(np.int64)
+        value = rows[window].astype(np.float64)
+    else:
+        if window not in copurchase.columns:
+            window = "count"
+        index = copurchase.index.to_numpy()
+        base, rows = _slices(np.searchsorted(index, base_ids, "left"), np.searchsorted(index, base_ids, "right"))
+        sub = copurchase.iloc[rows]
+        macro = macro_index.get_indexer(sub["target_macro"].astype(object))
+        partner_id = sub["partner_id"].to_numpy(dtype=np.int64)
+        value = sub[window].to_numpy(dtype=np.float64)
+
+    keep = macro >= 0
+    if window != "count":
+        keep &= value > 0
+    base, macro, partner_id, value = base[keep], macro[keep], partner_id[keep], value[keep]
+
+    # Höchstens copurchase_top_k pro (Basis, Ziel-Makro der Tabelle)
+    order = np.lexsort((partner_id, -value, macro, base))
+    group = base[order] * len(MACRO_DISPLAY_ORDER) + macro[order]
+    starts = np.r_[0, np.flatnonzero(group[1:] != group[:-1]) + 1]
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    order = order[rank < copurchase_top_k]
+
+    order = order[np.lexsort((partner_id[order], -value[order], base[order]))]
+    return {"base": base[order], "partner_id": partner_id[order], "value": value[order]}
+
+
+def recommend_batch(article_ids, df: pd.DataFrame, copurchase, rankings: dict, selected_macros=None,
+                    window: str = "count", weather_condition: str = None, blocked_ids=(),
+                    top_n: int = TOP_N, pool_size: int = POOL_SIZE,
+                    copurchase_top_k: int = COPURCHASE_TOP_K, tables: dict = None) -> dict:
+    """
+    Wie recommend() für viele Katalogartikel auf einmal. Rückgabe (n =
+    len(article_ids), m = len(MACRO_DISPLAY_ORDER)):
+      positions   (n, m, top_n) int32  Zeilenposition in df, -1 = leer
+      scores      (n, m, top_n) int16  match_score, -1 = leer
+      copurchase  (n, m, top_n) bool   Kandidat aus Co-Purchase
+      found       (n,) bool            Basisartikel in df gefunden
+    tables: score_tables(df, weather_condition), falls schon berechnet.
+    """
+    base_ids = np.asarray(article_ids, dtype=np.int64)
+    n, m = len(base_ids), len(MACRO_DISPLAY_ORDER)
+    positions = np.full((n, m, top_n), -1, dtype=np.int32)
+    scores = np.full((n, m, top_n), -1, dtype=np.int16)
+    is_cp = np.zeros((n, m, top_n), dtype=bool)
+
+    if tables is None:
+        tables = score_tables(df, weather_condition)
+    ids = df["article_id"].to_numpy(dtype=np.int64)
+    article_index = pd.Index(ids)
+    is_outerwear = df["is_outerwear"].to_numpy(dtype=bool)
+    blocked = np.isin(ids, np.asarray(list(blocked_ids), dtype=np.int64))
+    macro = pd.Index(MACRO_DISPLAY_ORDER).get_indexer(df["macro_category"].astype(object))
+
+    base_pos = article_index.get_indexer(base_ids)
+    found = base_pos >= 0
+    base_outerwear = np.where(found, is_outerwear[base_pos], False)
+    base_macro = np.where(found, macro[base_pos], -1)
+
+    # Ziel-Makros pro Basis (build_target_macros, vektorisiert)
+    allowed = (np.arange(m)[None, :] != base_macro[:, None])
+    allowed &= ~(base_outerwear[:, None] & (np.arange(m)[None, :] == MACRO_DISPLAY_ORDER.index("OUTERWEAR")))
+    targets = allowed.copy()
+    if selected_macros is not None:
+        targets &= np.isin(MACRO_DISPLAY_ORDER, list(selected_macros))[None, :]
+        targets = np.where(targets.any(axis=1)[:, None], targets, allowed)
+    targets &= found[:, None]
+
+    # Co-Purchase-Kandidaten: (Basis, Ziel-Makro laut df) -> Positionen, Reihenfolge wie get_topk_partners
+    cp = copurchase_entries(copurchase, base_ids, window, copurchase_top_k)
+    cp_pos = article_index.get_indexer(cp["partner_id"])
+    keep = cp_pos >= 0
+    cp_base, cp_pos = cp["base"][keep], cp_pos[keep]
+    cp_macro = macro[cp_pos]
+    keep = (cp_macro >= 0) & ~blocked[cp_pos] & ~(base_outerwear[cp_base] & is_outerwear[cp_pos])
+    cp_base, cp_pos, cp_macro = cp_base[keep], cp_pos[keep], cp_macro[keep]
+
+    genders = df["gender"].astype(object).to_numpy()[np.where(found, base_pos, 0)]
+    groups = pd.DataFrame({"gender": genders, "outerwear": base_outerwear})[found] \
+        .groupby(["gender", "outerwear"], sort=False, dropna=False).indices
+    found_rows = np.flatnonzero(found)
+    column_of = np.full(len(df), -1, dtype=np.int64)
+
+    for (gender, outerwear), members in groups.items():
+        members = found_rows[members]
+        for t, target in enumerate(MACRO_DISPLAY_ORDER):
+            rows = members[targets[members, t]]
+            if len(rows) == 0:
+                continue
+
+            # Pool: meistverkaufte Artikel des Segments, für die ganze Gruppe gleich
+            # (der Basisartikel selbst liegt nie darin: Ziel-Makro != eigene Makro)
+            ranked = np.asarray(rankings.get((gender, target), np.empty(0, dtype=np.int64)), dtype=np.int64)
+            if outerwear:
+                ranked = ranked[~is_outerwear[ranked]]
+            pool = ranked[:pool_size]
+
+            # Co-Purchase-Matrix (Basis x Rang) für diese Basen und dieses Ziel
+            row_of = np.full(n, -1, dtype=np.int64)
+            row_of[rows] = np.arange(len(rows))
+            sel = (cp_macro == t) & (row_of[cp_base] >= 0)
+            sub_row, sub_pos = row_of[cp_base[sel]], cp_pos[sel]
+            starts = np.r_[0, np.flatnonzero(sub_row[1:] != sub_row[:-1]) + 1] if len(sub_row) else np.zeros(0, dtype=np.int64)
+            rank = np.arange(len(sub_row)) - np.repeat(starts, np.diff(np.r_[starts, len(sub_row)]))
+            width = int(rank.max()) + 1 if len(rank) else 0
+            cand = np.full((len(rows), width + len(pool)), -1, dtype=np.int64)
+            cand[sub_row, rank] = sub_pos
+            cand[:, width:] = pool[None, :]
+            valid = cand >= 0
+            valid[:, width:] &= ~blocked[pool][None, :]
+
+            # Pool-Einträge, die schon als Co-Purchase-Partner dabei sind, fallen weg
+            column_of[pool] = np.arange(len(pool))
+            dup = column_of[sub_pos]
+            valid[sub_row[dup >= 0], width + dup[dup >= 0]] = False
+            column_of[pool] = -1
+
+            copurchase_col = np.arange(width + len(pool))[None, :] < width
+            score = _pair_scores(tables, base_pos[rows][:, None], np.maximum(cand, 0), copurchase_col)
+            key = np.where(valid, -score, 1000)
+            best = np.argsort(key, axis=1, kind="stable")[:, :top_n]
+            take = np.take_along_axis(valid, best, axis=1)
+            k = best.shape[1]
+            positions[rows, t, :k] = np.where(take, np.take_along_axis(cand, best, axis=1), -1)
+            scores[rows, t, :k] = np.where(take, np.take_along_axis(score, best, axis=1), -1)
+            is_cp[rows, t, :k] = take & (best < width)
+
+    return {"positions": positions, "scores": scores, "copurchase": is_cp, "found": found}
+
+
+# ---------------------------------------------------------
+# Vorberechnete Empfehlungen (scripts/build_outfit_recommendations.py)
+#
+# Layout (Ordner, z. B. data_processed/outfit_store/):
+#   meta.json                     Parameter (top_n, pool_size, ...), Zeitfenster,
+#                                 Wetter-Varianten, Reihenfolge der Makros
+#   article_ids.npy               Artikel in der Zeilen-Reihenfolge des
+#                                 Artikel-Speichers, aus dem gerechnet wurde
+#   picks_<fenster>_<wetter>.npy  (n_artikel, n_makros, top_n) PICK_DTYPE:
+#                                 Zeilenposition der Empfehlung (-1 = leer)
+#                                 und ob sie aus Co-Purchase stammt
+# Die Empfehlungen hängen nur vom Basisartikel, dem Zeitfenster und der
+# Wetterlage ab; die Makro-Auswahl in der UI wählt nur Zeilen aus.
+# ---------------------------------------------------------
+PICK_DTYPE = np.dtype([("pick", "<i4"), ("copurchase", "?")])
+
+
+def empty_picks(n_articles: int, top_n: int = TOP_N) -> np.ndarray:
+    picks = np.zeros((n_articles, len(MACRO_DISPLAY_ORDER), top_n), dtype=PICK_DTYPE)
+    picks["pick"] = -1
+    return picks
+
+
+def picks_name(window: str, variant: str) -> str:
+    return f"picks_{window}_{variant}.npy"
+
+
+def write_outfit_store(article_ids, picks: dict, store_dir, params: dict):
+    """picks: {(fenster, wetter): Array (n_artikel, n_makros, top_n) PICK_DTYPE}."""
+    store_dir = Path(store_dir)
+    tmp_dir = store_dir.with_name(store_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    np.save(tmp_dir / "article_ids.npy", np.asarray(article_ids, dtype=np.int64))
+    for (window, variant), values in picks.items():
+        np.save(tmp_dir / picks_name(window, variant), values)
+    meta = {
+        "n_articles": int(len(article_ids)),
+        "macros": MACRO_DISPLAY_ORDER,
+        "windows": sorted({window for window, _ in picks}),
+        "weather": sorted({variant for _, variant in picks}),
+        "params": params,
+    }
+    with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    old_dir = store_dir.with_name(store_dir.name + ".old")
+    if store_dir.exists():
+        store_dir.rename(old_dir)
+    tmp_dir.rename(store_dir)
+    if old_dir.exists():
+        shutil.rmtree(old_dir)
+    return meta
+
+
+class OutfitStore:
+    """
+    Lesezugriff auf die vorberechneten Empfehlungen; die picks-Dateien
+    werden erst beim ersten Zugriff per memmap geöffnet.
+
+        store = OutfitStore("data_processed/outfit_store")
+        store.matches(df, params)            # passt zu diesem Artikel-DataFrame?
+        store.recommendations(base_row, df)  # wie recommend(), oder None
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        with open(self.store_dir / "meta.json", "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.article_ids = np.load(self.store_dir / "article_ids.npy")
+        self._order = np.argsort(self.article_ids, kind="stable")
+        self._picks = {}
+
+    def matches(self, df: pd.DataFrame, params: dict) -> bool:
+        """Gleiche Artikel in gleicher Reihenfolge und gleiche Parameter wie beim Vorberechnen?"""
+        return self.meta["params"] == params and np.array_equal(self.article_ids, df["article_id"].to_numpy())
+
+    def _variant(self, window: str, variant: str) -> np.ndarray:
+        key = (window, variant)
+        if key not in self._picks:
+            self._picks[key] = np.load(self.store_dir / picks_name(window, variant), mmap_mode="r")
+        return self._picks[key]
+
+    def picks(self, article_id: int, window: str = "count", weather_condition: str = None):
+        """(n_makros, top_n) PICK_DTYPE eines Artikels; None, wenn nicht vorberechnet."""
+        variant = weather_variant(weather_condition)
+        if window not in self.meta["windows"] or variant not in self.meta["weather"]:
+            return None
+        i = np.searchsorted(self.article_ids, article_id, sorter=self._order)
+        if i >= len(self._order) or self.article_ids[self._order[i]] != article_id:
+            return None
+        return np.asarray(self._variant(window, variant)[self._order[i]])
+
+    def recommendations(self, base_row, df: pd.DataFrame, selected_macros=None, window: str = "count",
+                        weather_condition: str = None, blocked_ids=()):
+        """
+        Wie recommend() für einen Katalogartikel, aber nachgeschlagen.
+        None, wenn nicht vorberechnet oder eine blockierte ID unter den
+        Empfehlungen ist (dann muss neu gerechnet werden).
+        """
+        picks = self.picks(base_row["article_id"], window, weather_condition)
+        if picks is None:
+            return None
+        blocked = list(blocked_ids)
+        if blocked and np.isin(self.article_ids[picks["pick"][picks["pick"] >= 0]], blocked).any():
+            return None
+
+        macros = self.meta["macros"]
+        rows = {}
+        for target in build_target_macros(base_row["macro_category"], bool(base_row["is_outerwear"]), selected_macros):
+            row = picks[macros.index(target)]
+            row = row[row["pick"] >= 0]
+            if len(row):
+                rows[target] = row
+        if not rows:
+            return {}
+
+        # Alle Ziel-Makros in einem Zugriff auf df; Reihenfolge ist
+        # gespeichert, Score und Tooltip nur für die Anzeige
+        row = np.concatenate(list(rows.values()))
+        candidates = df.iloc[row["pick"]].assign(is_copurchase=row["copurchase"])
+        scored = score_candidates(base_row, candidates, weather_condition, sort=False)
+        bounds = np.cumsum([0] + [len(r) for r in rows.values()])
+        return {target: scored.iloc[lo:hi].reset_index(drop=True)
+                for target, lo, hi in zip(rows, bounds[:-1], bounds[1:])}
+
+
+# ---------------------------------------------------------
+# Engine: alle geladenen Daten hinter einer Schnittstelle
+#
+# Hält Artikel, Co-Purchase-Daten, Segment-Rankings und (falls passend)
+# den vorberechneten Speicher. Alles wird nur gelesen; eine Instanz kann
+# von beliebig vielen Sitzungen bzw. Threads gleichzeitig benutzt werden.
+#
+#   engine = OutfitEngine.from_dir("data_processed")
+#   outfit = engine.outfit(108775015, selected_macros=["TOP"], blocked_ids=[...])
+#   outfit_payload(outfit)     # JSON-fähig
+# ---------------------------------------------------------
+class OutfitEngine:
+    def __init__(self, df: pd.DataFrame, copurchase=None, rankings: dict = None, store: OutfitStore = None,
+                 top_n: int = TOP_N, pool_size: int = POOL_SIZE, copurchase_top_k: int = COPURCHASE_TOP_K):
+        self.df = df
+        self.copurchase = copurchase
+        self.rankings = rankings if rankings is not None else segment_rankings(df, ["gender", "macro_category"])
+        self.params = {"top_n": top_n, "pool_size": pool_size, "copurchase_top_k": copurchase_top_k}
+        # Speicher nur, wenn er zu diesen Artikeln und Parametern gehört
+        self.store = store if store is not None and store.matches(df, self.params) else None
+        self.article_ids = df["article_id"].to_numpy()
+        self._order = np.argsort(self.article_ids, kind="stable")
+
+    @classmethod
+    def from_dir(cls, data_dir, **params):
+        """
+        Lädt aus data_processed/: articles_store (Pflicht), Co-Purchase
+        aus copurchase_topk_store bzw. copurchase_topk.csv und
+        outfit_store, soweit vorhanden.
+        """
+        data_dir = Path(data_dir)
+        df = load_article_artifact(data_dir / "articles_store")
+        copurchase = None
+        if (data_dir / "copurchase_topk_store" / "index.npy").exists():
+            copurchase = CopurchasePartitions(data_dir / "copurchase_topk_store")
+        elif (data_dir / "copurchase_topk.csv").exists():
+            copurchase = load_topk(data_dir / "copurchase_topk.csv")
+        store = None
+        if (data_dir / "outfit_store" / "meta.json").exists():
+            store = OutfitStore(data_dir / "outfit_store")
+        return cls(df, copurchase, store=store, **params)
+
+    def base_row(self, article_id: int):
+        """Zeile eines Katalogartikels oder None."""
+        i = np.searchsorted(self.article_ids, article_id, sorter=self._order)
+        if i >= len(self._order) or self.article_ids[self._order[i]] != article_id:
+            return None
+        return self.df.iloc[self._order[i]]
+
+    def recommend(self, base_row, selected_macros=None, window: str = "count", weather_condition: str = None,
+                  blocked_ids=(), gender: str = None, use_copurchase: bool = True) -> dict:
+        """
+        Wie recommend() für eine beliebige Basis-Zeile (auch hochgeladene
+        Fotos: use_copurchase=False). gender ersetzt das Gender der Basis
+        für die Segment-Pools; dann wird immer online gerechnet.
+        """
+        if gender is not None and gender != base_row["gender"]:
+            base_row = base_row.copy()
+            base_row["gender"] = gender
+        elif self.store is not None and use_copurchase:
+            outfit = self.store.recommendations(base_row, self.df, selected_macros, window,
+                                                weather_condition, blocked_ids)
+            if outfit is not None:
+                return outfit
+        return recommend(
+            base_row, self.df, self.copurchase if use_copurchase else None, self.rankings,
+            selected_macros=selected_macros,
+            window=window,
+            weather_condition=weather_condition,
+            blocked_ids=blocked_ids,
+            **self.params,
+        )
+
+    def outfit(self, article_id: int, **request):
+        """recommend() für einen Katalogartikel; None, wenn es ihn nicht gibt."""
+        base_row = self.base_row(article_id)
+        if base_row is None:
+            return None
+        return self.recommend(base_row, **request)
+
+
+PAYLOAD_COLUMNS = ["article_id", "prod_name", "product_type_name", "colour_family", "style", "match_score",
+                   "is_copurchase"]
+
+
+def outfit_payload(outfit: dict) -> dict:
+    """Ziel-Makro -> Liste von Dicts (PAYLOAD_COLUMNS, Tooltip-Zeilen als Liste) für JSON."""
+    payload = {}
+    for target, recs in outfit.items():
+        items = []
+        for rec in recs[PAYLOAD_COLUMNS + ["tooltip"]].to_dict("records"):
+            item = {c: rec[c] for c in PAYLOAD_COLUMNS}
+            item["article_id"] = int(item["article_id"])
+            item["match_score"] = int(item["match_score"])
+            item["is_copurchase"] = bool(item["is_copurchase"])
+            for c in ["prod_name", "product_type_name", "colour_family", "style"]:
+                item[c] = None if pd.isna(item[c]) else str(item[c])
+            item["reasons"] = rec["tooltip"].split("\n") if rec["tooltip"] else []
+            items.append(item)
+        payload[target] = items
+    return payload
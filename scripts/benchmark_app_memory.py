@@ -0,0 +1,167 @@
+import argparse
+import multiprocessing as mp
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store)
+
+from article_features import load_article_artifact
+from copurchase_store import CopurchasePartitions, load_topk
+
+# ---------------------------------------------------------
+# Benchmark: Speicher pro Sitzung und pro Server-Prozess (demo9)
+#
+# Vorher: load_data() und load_copurchase() mit st.cache_data. Der Cache
+# hält die Daten gepickelt und gibt jedem Aufruf eine eigene Kopie
+# (Pickle-Roundtrip) -> jede gleichzeitig laufende Sitzung trägt die
+# volle Größe als privaten Heap.
+# Nachher: st.cache_resource über read-only memmaps (articles_store/,
+# copurchase_topk_store/). Alle Sitzungen bekommen dasselbe Objekt,
+# mehrere Server-Prozesse teilen sich die Seiten im Page-Cache.
+#
+#   python scripts/build_article_features.py
+#   python scripts/build_copurchase_topk.py
+#   python scripts/benchmark_app_memory.py --sessions 8 --processes 2
+#
+# Gemessen wird über /proc (nur Linux): VmRSS für die Sitzungen im
+# selben Prozess, smaps_rollup (Rss/Pss/Anonymous) für die Prozesse.
+# Pss verteilt geteilte Seiten anteilig auf die Prozesse, die sie nutzen.
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+ARTICLE_STORE_DIR = DATA_PROCESSED / "articles_store"
+COPURCHASE_TOPK_FILE = DATA_PROCESSED / "copurchase_topk.csv"
+COPURCHASE_TOPK_STORE_DIR = DATA_PROCESSED / "copurchase_topk_store"
+
+N_SESSIONS = 8
+N_PROCESSES = 2
+SMAPS_FIELDS = ["Rss", "Pss", "Shared_Clean", "Private_Clean", "Anonymous"]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def smaps_mb() -> dict:
+    values = {}
+    with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as f:
+        for line in f:
+            name, _, rest = line.partition(":")
+            if name in SMAPS_FIELDS:
+                values[name] = int(rest.split()[0]) / 1024
+    return values
+
+
+def load_app_data(shared: bool):
+    """(Artikel, Co-Purchase) wie demo9 vorher (DataFrames im RAM) bzw. nachher (memmaps)."""
+    if shared:
+        return load_article_artifact(ARTICLE_STORE_DIR), CopurchasePartitions(COPURCHASE_TOPK_STORE_DIR)
+    return load_article_artifact(ARTICLE_STORE_DIR, mmap_mode=None), load_topk(COPURCHASE_TOPK_FILE)
+
+
+def touch(data) -> int:
+    """Liest alle Werte einmal (wie eine Sitzung, die den ganzen Katalog filtert) -> Seiten liegen im RAM."""
+    df_articles, copurchase = data
+    total = 0
+    for col in df_articles.columns:
+        values = df_articles[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            total += int(values.cat.codes.to_numpy().sum())
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            total += int(np.nan_to_num(values.to_numpy(dtype=np.float64)).sum())
+        else:
+            total += len(values)
+    if isinstance(copurchase, CopurchasePartitions):
+        for p in range(copurchase.meta["n_partitions"]):
+            total += int(copurchase._partition(p)["count"].sum())
+    else:
+        total += int(copurchase["count"].sum())
+    return total
+
+
+def sessions_rss(shared: bool, n_sessions: int) -> float:
+    """Zusätzlicher RSS für n_sessions gleichzeitig offene Sitzungen, in MB pro Sitzung."""
+    data = load_app_data(shared)
+    touch(data)
+    if shared:
+        get_data = lambda: data     # st.cache_resource: immer dasselbe Objekt
+    else:
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        get_data = lambda: pickle.loads(blob)    # st.cache_data: Kopie pro Aufruf
+
+    before = rss_mb()
+    sessions = []
+    for _ in range(n_sessions):
+        session_data = get_data()
+        touch(session_data)
+        sessions.append(session_data)
+    return (rss_mb() - before) / n_sessions
+
+
+def process_worker(shared: bool, barrier, queue):
+    """Ein "Server-Prozess": lädt, liest alles und misst, während alle anderen auch geladen haben."""
+    baseline = smaps_mb()
+    data = load_app_data(shared)
+    touch(data)
+    barrier.wait()
+    after = smaps_mb()
+    queue.put({name: after[name] - baseline.get(name, 0.0) for name in after})
+    barrier.wait()    # erst beenden, wenn alle gemessen haben
+    del data
+
+
+def processes_smaps(shared: bool, n_processes: int) -> list:
+    ctx = mp.get_context("spawn")   # kein fork: sonst wären die Seiten des Elternprozesses schon geteilt
+    barrier, queue = ctx.Barrier(n_processes), ctx.Queue()
+    workers = [ctx.Process(target=process_worker, args=(shared, barrier, queue)) for _ in range(n_processes)]
+    for w in workers:
+        w.start()
+    results = [queue.get() for _ in workers]
+    for w in workers:
+        w.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speicher pro Sitzung/Prozess: cache_data-Kopien vs. geteilte memmaps.")
+    parser.add_argument("--sessions", type=int, default=N_SESSIONS, help="gleichzeitige Sitzungen")
+    parser.add_argument("--processes", type=int, default=N_PROCESSES, help="Server-Prozesse")
+    args = parser.parse_args()
+
+    for path in [ARTICLE_STORE_DIR / "meta.json", COPURCHASE_TOPK_FILE, COPURCHASE_TOPK_STORE_DIR / "index.npy"]:
+        if not path.exists():
+            sys.exit(f"{path} fehlt. Bitte zuerst scripts/build_article_features.py und "
+                     f"scripts/build_copurchase_topk.py ausführen.")
+    if not Path("/proc/self/smaps_rollup").exists():
+        sys.exit("Dieser Benchmark liest /proc/self/smaps_rollup und läuft nur unter Linux.")
+
+    df_articles, topk = load_app_data(shared=False)
+    size_mb = (df_articles.memory_usage(deep=True).sum() + topk.memory_usage(deep=True).sum()) / 2**20
+    print(f"Artikel: {len(df_articles):,} | Top-K-Zeilen: {len(topk):,} | im RAM: {size_mb:.1f} MB")
+    del df_articles, topk
+
+    print(f"\n{args.sessions} Sitzungen in einem Prozess (zusätzlicher RSS pro Sitzung)")
+    for label, shared in [("vorher  (cache_data, Kopie)", False), ("nachher (cache_resource)", True)]:
+        t0 = time.perf_counter()
+        per_session = sessions_rss(shared, args.sessions)
+        print(f"  {label:<28} {per_session:8.1f} MB/Sitzung  ({time.perf_counter() - t0:.1f} s)")
+
+    print(f"\n{args.processes} Server-Prozesse (Zuwachs pro Prozess, Mittelwert)")
+    print(f"  {'':<28} " + " ".join(f"{name:>13}" for name in SMAPS_FIELDS))
+    for label, shared in [("vorher  (DataFrames)", False), ("nachher (memmap)", True)]:
+        results = processes_smaps(shared, args.processes)
+        mean = {name: np.mean([r.get(name, 0.0) for r in results]) for name in SMAPS_FIELDS}
+        print(f"  {label:<28} " + " ".join(f"{mean[name]:10.1f} MB" for name in SMAPS_FIELDS))
+
+
+if __name__ == "__main__":
+    main()
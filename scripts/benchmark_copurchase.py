@@ -0,0 +1,96 @@
+import time
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from build_copurchase_filtered import (
+    PATH_ARTICLES,
+    PATH_STORE,
+    build_article_code_lookup,
+    load_filtered_article_ids,
+    process_transactions_chunk,
+)
+from copurchase_counting import pair_matrix_to_frame
+from transactions_store import TransactionStore
+
+# ---------------------------------------------------------
+# Benchmark: alter Counter-Pfad vs. neue Sparse-Matrix-Zählung
+# Beide Varianten bekommen exakt denselben Input (die ersten
+# BENCH_ROWS Zeilen aus dem Transaktions-Speicher).
+# ---------------------------------------------------------
+BENCH_ROWS = 2_000_000
+
+
+def count_pairs_counter(df_chunk: pd.DataFrame, valid_article_ids: set) -> Counter:
+    """
+    Referenz: bisherige Implementierung mit groupby + combinations + Counter.
+    """
+    pair_counter = Counter()
+    df_chunk = df_chunk[df_chunk["article_id"].isin(valid_article_ids)]
+    if df_chunk.empty:
+        return pair_counter
+
+    grouped = df_chunk.groupby(["customer_code", "t_dat"])["article_id"].unique()
+    for (_, _), articles in grouped.items():
+        if len(articles) < 2:
+            continue
+        for a1, a2 in combinations(sorted(articles), 2):
+            pair_counter[(a1, a2)] += 1
+    return pair_counter
+
+
+def counter_to_frame(pair_counter: Counter) -> pd.DataFrame:
+    rows = [(a1, a2, cnt) for (a1, a2), cnt in pair_counter.items()]
+    df_pairs = pd.DataFrame(rows, columns=["article_id_1", "article_id_2", "count"])
+    return df_pairs.astype(np.int64)
+
+
+def main():
+    valid_article_ids = load_filtered_article_ids(PATH_ARTICLES)
+
+    print(f"Lese die ersten {BENCH_ROWS:,} Transaktionen ...")
+    store = TransactionStore(PATH_STORE)
+    chunk = next(store.iter_chunks(["customer_code", "t_dat", "article_idx"], chunk_rows=BENCH_ROWS))
+    df = pd.DataFrame({
+        "customer_code": chunk["customer_code"],
+        "t_dat": chunk["t_dat"],
+        "article_id": store.article_ids[chunk["article_idx"]],
+    })
+    print(f"Zeilen: {len(df):,}")
+
+    # 1) Alter Pfad
+    t0 = time.perf_counter()
+    counter = count_pairs_counter(df, set(valid_article_ids.tolist()))
+    t_counter = time.perf_counter() - t0
+    df_counter = counter_to_frame(counter)
+
+    # 2) Neuer Pfad
+    t0 = time.perf_counter()
+    article_code_lookup = build_article_code_lookup(store, valid_article_ids)
+    pair_matrix = process_transactions_chunk(chunk, article_code_lookup, len(valid_article_ids))
+    df_sparse = pair_matrix_to_frame(pair_matrix, valid_article_ids)
+    t_sparse = time.perf_counter() - t0
+
+    # 3) Ergebnisse vergleichen (Reihenfolge egal)
+    key = ["article_id_1", "article_id_2"]
+    a = df_counter.sort_values(key).reset_index(drop=True)
+    b = df_sparse[key + ["count"]].sort_values(key).reset_index(drop=True)
+    identical = a.equals(b)
+
+    print("-----------------------------------------------------")
+    print(f"Paare (Counter):      {len(df_counter):,}")
+    print(f"Paare (Sparse):       {len(df_sparse):,}")
+    print(f"Ergebnis identisch:   {identical}")
+    print(f"Laufzeit Counter:     {t_counter:8.2f} s")
+    print(f"Laufzeit Sparse:      {t_sparse:8.2f} s")
+    if t_sparse > 0:
+        print(f"Speedup:              {t_counter / t_sparse:8.1f}x")
+
+    if not identical:
+        raise SystemExit("Fehler: Sparse-Ergebnis weicht vom Counter-Ergebnis ab!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store)
+
+from article_features import PRODUCT_TYPE_TO_MACRO
+from copurchase_store import CopurchaseAdjacency, get_copurchase_candidates
+
+# ---------------------------------------------------------
+# Benchmark: Co-Purchase-Lookup in den Apps
+#
+# Alter Pandas-Pfad (Maske über alle Paare + apply + groupby, wie in
+# demo2-demo8) vs. CSR-Adjazenz aus copurchase_store.py. Beide
+# bekommen dieselben Paare und dieselben Basisartikel; die Ergebnisse
+# (Partner + Counts) werden verglichen.
+#
+#   python scripts/benchmark_copurchase_lookup.py --lookups 200
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+PATH_ARTICLES = DATA_PROCESSED / "articles_filtered.csv"
+PATH_PAIRS_CSV = DATA_PROCESSED / "copurchase_filtered.csv"
+
+N_LOOKUPS = 200
+
+
+def get_copurchase_candidates_pandas(base_article_id, df_articles, df_cop):
+    """Referenz: bisherige Implementierung aus demo8."""
+    mask = (df_cop["article_id_1"] == base_article_id) | (df_cop["article_id_2"] == base_article_id)
+    df_pairs = df_cop[mask].copy()
+    if df_pairs.empty:
+        return pd.DataFrame()
+
+    def _partner(row):
+        return row["article_id_2"] if row["article_id_1"] == base_article_id else row["article_id_1"]
+
+    df_pairs["partner_id"] = df_pairs.apply(_partner, axis=1)
+
+    df_agg = (
+        df_pairs.groupby("partner_id")["count"]
+        .sum()
+        .reset_index()
+        .rename(columns={"count": "copurchase_count"})
+    )
+
+    df_merged = df_agg.merge(
+        df_articles,
+        left_on="partner_id",
+        right_on="article_id",
+        how="left",
+    )
+
+    if "macro_category" not in df_merged.columns:
+        df_merged["macro_category"] = df_merged["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
+
+    df_merged = df_merged[df_merged["partner_id"] != base_article_id]
+    df_merged = df_merged[~df_merged["macro_category"].isna()]
+    df_merged = df_merged.sort_values("copurchase_count", ascending=False)
+
+    return df_merged
+
+
+def as_pairs(df: pd.DataFrame) -> dict:
+    if df.empty:
+        return {}
+    return dict(zip(df["partner_id"].astype(np.int64), df["copurchase_count"].astype(np.int64)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-Purchase-Lookup: Pandas-Pfad vs. CSR-Adjazenz.")
+    parser.add_argument("--lookups", type=int, default=N_LOOKUPS, help="Anzahl Basisartikel")
+    args = parser.parse_args()
+
+    df_articles = pd.read_csv(PATH_ARTICLES)
+    df_articles["article_id"] = df_articles["article_id"].astype(int)
+    df_articles["macro_category"] = df_articles["product_type_name"].map(PRODUCT_TYPE_TO_MACRO)
+
+    df_cop = pd.read_csv(PATH_PAIRS_CSV, usecols=["article_id_1", "article_id_2", "count"])
+    print(f"Paare: {len(df_cop):,}")
+
+    t0 = time.perf_counter()
+    adjacency = CopurchaseAdjacency.from_frame(df_cop)
+    t_build = time.perf_counter() - t0
+    print(f"CSR gebaut in {t_build:.2f} s | Artikel: {adjacency.n_articles:,} | "
+          f"Einträge: {len(adjacency.indices):,}")
+    print(f"Speicher: DataFrame {df_cop.memory_usage(index=False).sum() / 2**20:.1f} MB | "
+          f"CSR {adjacency.nbytes / 2**20:.1f} MB")
+
+    rng = np.random.default_rng(42)
+    base_ids = rng.choice(adjacency.article_ids, size=min(args.lookups, adjacency.n_articles), replace=False)
+
+    t0 = time.perf_counter()
+    results_pandas = [get_copurchase_candidates_pandas(a, df_articles, df_cop) for a in base_ids]
+    t_pandas = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    results_csr = [get_copurchase_candidates(a, df_articles, adjacency) for a in base_ids]
+    t_csr = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for a in base_ids:
+        adjacency.neighbors(a)
+    t_slice = time.perf_counter() - t0
+
+    n_diff = sum(as_pairs(p) != as_pairs(c) for p, c in zip(results_pandas, results_csr))
+    n = len(base_ids)
+    print(f"\n{n} Lookups")
+    print(f"  Pandas (Maske + apply + groupby): {t_pandas:8.3f} s  ({t_pandas / n * 1000:8.2f} ms/Lookup)")
+    print(f"  CSR + Merge (drop-in):            {t_csr:8.3f} s  ({t_csr / n * 1000:8.2f} ms/Lookup)")
+    print(f"  CSR nur Slice:                    {t_slice:8.3f} s  ({t_slice / n * 1000:8.4f} ms/Lookup)")
+    print(f"  Speedup drop-in: {t_pandas / t_csr:.1f}x")
+    print(f"Ergebnisse identisch: {'ja' if n_diff == 0 else f'NEIN ({n_diff} abweichend)'}")
+
+
+if __name__ == "__main__":
+    main()
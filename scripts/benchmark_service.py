@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store, outfit_engine)
+
+from article_features import MACRO_DISPLAY_ORDER, load_article_artifact
+
+# ---------------------------------------------------------
+# Lasttest für scripts/serve_outfits.py (lokal, ohne Netz)
+#
+#   python scripts/benchmark_service.py --requests 2000 --concurrency 16
+#   python scripts/benchmark_service.py --url http://127.0.0.1:8008   # laufenden Server testen
+#
+# Ohne --url wird der Server als Kind-Prozess auf einem freien Port
+# gestartet und am Ende beendet. --concurrency Verbindungen (keep-alive)
+# schicken zusammen --requests Anfragen für zufällige Katalogartikel:
+# ein Teil mit Makro-Auswahl, Wetter oder blockierten Artikeln (die
+# blockierten sind Empfehlungen aus einer Vorab-Anfrage, damit auch der
+# Online-Pfad statt des vorberechneten Speichers läuft).
+# Ausgegeben werden Durchsatz und Latenz-Perzentile; jede Antwort außer
+# 200 zählt als Fehler (Exit-Code 1).
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+ARTICLE_STORE_DIR = DATA_PROCESSED / "articles_store"
+SERVER_SCRIPT = BASE_DIR / "scripts" / "serve_outfits.py"
+
+N_REQUESTS = 1000
+CONCURRENCY = 8
+N_WORKERS = 4
+SHARE_BLOCKED = 0.2
+SERVER_START_TIMEOUT_S = 120
+SEED = 42
+
+
+async def http_get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str):
+    """Eine GET-Anfrage auf einer offenen Verbindung -> (Status, JSON-Body)."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def make_paths(article_ids: np.ndarray, n: int, rng: random.Random) -> list:
+    """Zufällige Anfragen; blocked=... wird später mit echten Empfehlungen gefüllt."""
+    paths = []
+    for _ in range(n):
+        query = []
+        if rng.random() < 0.3:
+            query.append("macros=" + ",".join(rng.sample(MACRO_DISPLAY_ORDER, 2)))
+        if rng.random() < 0.2:
+            query.append("weather=" + rng.choice(["Cold", "Hot"]))
+        paths.append((int(rng.choice(article_ids)), query, rng.random() < SHARE_BLOCKED))
+    return paths
+
+
+async def run_load(host: str, port: int, paths: list, concurrency: int):
+    queue = asyncio.Queue()
+    for item in paths:
+        queue.put_nowait(item)
+    latencies, errors = [], []
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while not queue.empty():
+                article_id, query, block = queue.get_nowait()
+                if block:
+                    # erst die Empfehlungen holen, dann die erste davon blockieren
+                    status, body = await http_get(reader, writer, host, f"/outfit/{article_id}")
+                    picks = [item["article_id"] for items in body.get("outfit", {}).values() for item in items]
+                    if picks:
+                        query = query + [f"blocked={picks[0]}"]
+                path = f"/outfit/{article_id}" + ("?" + "&".join(query) if query else "")
+                t0 = time.perf_counter()
+                status, body = await http_get(reader, writer, host, path)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if status != 200:
+                    errors.append(f"{status} {path}: {body.get('error')}")
+        finally:
+            writer.close()
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return np.array(latencies), errors, time.perf_counter() - t0
+
+
+def start_server(workers: int):
+    """serve_outfits.py auf einem freien Port starten -> (Prozess, Port)."""
+    process = subprocess.Popen([sys.executable, str(SERVER_SCRIPT), "--port", "0", "--workers", str(workers)],
+                               cwd=BASE_DIR, stdout=subprocess.PIPE, text=True)
+    deadline = time.time() + SERVER_START_TIMEOUT_S
+    for line in process.stdout:
+        print(f"  server: {line.rstrip()}")
+        if line.startswith("Bereit:"):
+            return process, int(line.split()[1].rsplit(":", 1)[1])
+        if time.time() > deadline:
+            break
+    process.kill()
+    sys.exit("Server ist nicht gestartet.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für die lokale Outfit-API.")
+    parser.add_argument("--requests", type=int, default=N_REQUESTS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="gleichzeitige Verbindungen")
+    parser.add_argument("--workers", type=int, default=N_WORKERS, help="Threads im gestarteten Server")
+    parser.add_argument("--url", help="laufender Server, z. B. http://127.0.0.1:8008")
+    args = parser.parse_args()
+
+    if not (ARTICLE_STORE_DIR / "meta.json").exists():
+        sys.exit(f"{ARTICLE_STORE_DIR} fehlt. Bitte zuerst scripts/build_article_features.py ausführen.")
+    article_ids = load_article_artifact(ARTICLE_STORE_DIR)["article_id"].to_numpy()
+    paths = make_paths(article_ids, args.requests, random.Random(SEED))
+
+    process = None
+    if args.url:
+        host, port = args.url.split("://")[-1].rstrip("/").rsplit(":", 1)
+        port = int(port)
+    else:
+        host = "127.0.0.1"
+        process, port = start_server(args.workers)
+    try:
+        latencies, errors, total_s = asyncio.run(run_load(host, port, paths, args.concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"\n{len(latencies):,} Anfragen, {args.concurrency} Verbindungen: {len(latencies) / total_s:.0f} Anfragen/s")
+    print(f"  Latenz: p50 {p50:.1f} ms | p95 {p95:.1f} ms | p99 {p99:.1f} ms | max {latencies.max():.1f} ms")
+    if errors:
+        print(f"  Fehler: {len(errors)}")
+        for error in errors[:10]:
+            print(f"    {error}")
+        sys.exit(1)
+    print("  Fehler: 0")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# ---------------------------------------------------------
+# Startzeit von demo9 messen (Kaltstart) und gegen ein Budget prüfen
+#
+#   python scripts/benchmark_startup.py
+#   python scripts/benchmark_startup.py --repeat 5 --budget-intro-ms 1500
+#
+# Jede Messung läuft in einem frischen Python-Prozess (kalte Imports),
+# streamlit selbst ist dort schon geladen wie im laufenden Server:
+#   import   Modul demo9 importieren (Imports + Konstanten, ohne main)
+#   intro    erster Lauf über streamlit.testing (AppTest) bis die
+#            Intro-Seite (render_intro_page) steht
+#   data     Klick auf "Start Experience" (nach --intro-pause-s auf der
+#            Intro-Seite, dort lädt demo9 schon im Hintergrund) bis die
+#            Artikel geladen und die Startseite gerendert ist
+# Zusätzlich wird geprüft, dass die Intro-Seite die schweren Module
+# (LAZY_MODULES) nicht lädt. Der Median über --repeat Läufe wird an
+# data_processed/startup_timings.csv angehängt; liegt eine Phase über
+# ihrem Budget oder fehlt ein Lazy-Import, endet das Skript mit Code 1.
+# ---------------------------------------------------------
+APP_FILE = BASE_DIR / "demo9.py"
+PATH_LOG = BASE_DIR / "data_processed" / "startup_timings.csv"
+
+BUDGET_MS = {"import": 1500, "intro": 2500, "data": 8000}
+LAZY_MODULES = ["requests", "PIL.Image", "streamlit.components.v1"]
+N_REPEAT = 3
+INTRO_PAUSE_S = 1.0     # so lange "liest" der Nutzer die Intro-Seite
+APP_TIMEOUT_S = 120
+
+
+def child_import() -> dict:
+    import streamlit  # noqa: F401  (wie im Server schon geladen)
+
+    sys.path.insert(0, str(BASE_DIR))
+    before = set(sys.modules)
+    t0 = time.perf_counter()
+    import demo9  # noqa: F401
+    import_ms = (time.perf_counter() - t0) * 1000
+    return {"import_ms": import_ms, "loaded": sorted(set(LAZY_MODULES) & (set(sys.modules) - before))}
+
+
+def child_app(intro_pause_s: float) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    before = set(sys.modules)
+    at = AppTest.from_file(str(APP_FILE), default_timeout=APP_TIMEOUT_S)
+    t0 = time.perf_counter()
+    at.run()
+    intro_ms = (time.perf_counter() - t0) * 1000
+    if at.exception:
+        raise RuntimeError(f"Intro-Seite: {at.exception[0].value}")
+    if not any("intro-title" in m.value for m in at.markdown):
+        raise RuntimeError("Intro-Seite wurde nicht gerendert")
+    loaded = sorted(set(LAZY_MODULES) & (set(sys.modules) - before))
+
+    time.sleep(intro_pause_s)
+    t0 = time.perf_counter()
+    at.button[0].click().run()
+    data_ms = (time.perf_counter() - t0) * 1000
+    if at.exception:
+        raise RuntimeError(f"Startseite: {at.exception[0].value}")
+    if not at.session_state["intro_done"]:
+        raise RuntimeError("Klick auf 'Start Experience' hat die Intro-Seite nicht verlassen")
+    return {"intro_ms": intro_ms, "data_ms": data_ms, "loaded": loaded}
+
+
+def run_child(mode: str, intro_pause_s: float) -> dict:
+    """Startet dieses Skript im Kind-Modus und liest das JSON aus der letzten Zeile."""
+    env = dict(os.environ, STREAMLIT_BROWSER_GATHER_USAGE_STATS="false")
+    command = [sys.executable, __file__, "--child", mode, "--intro-pause-s", str(intro_pause_s)]
+    result = subprocess.run(command, cwd=BASE_DIR, env=env,
+                            capture_output=True, text=True, timeout=APP_TIMEOUT_S * 2)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        sys.exit(f"Messung '{mode}' fehlgeschlagen:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def append_log(row: dict):
+    PATH_LOG.parent.mkdir(parents=True, exist_ok=True)
+    new = not PATH_LOG.exists()
+    with open(PATH_LOG, "a", encoding="utf-8") as f:
+        if new:
+            f.write(",".join(row) + "\n")
+        f.write(",".join(str(v) for v in row.values()) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kaltstart von demo9 messen und gegen ein Budget prüfen.")
+    parser.add_argument("--repeat", type=int, default=N_REPEAT, help="Läufe pro Phase (Median)")
+    parser.add_argument("--intro-pause-s", type=float, default=INTRO_PAUSE_S,
+                        help="Wartezeit auf der Intro-Seite vor dem Klick")
+    for phase, budget in BUDGET_MS.items():
+        parser.add_argument(f"--budget-{phase}-ms", type=float, default=budget)
+    parser.add_argument("--no-log", action="store_true", help=f"nicht an {PATH_LOG.name} anhängen")
+    parser.add_argument("--child", choices=["import", "app"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child_import() if args.child == "import" else child_app(args.intro_pause_s)))
+        return
+
+    runs = {"import": [], "intro": [], "data": []}
+    loaded = set()
+    for i in range(args.repeat):
+        imp = run_child("import", args.intro_pause_s)
+        app = run_child("app", args.intro_pause_s)
+        runs["import"].append(imp["import_ms"])
+        runs["intro"].append(app["intro_ms"])
+        runs["data"].append(app["data_ms"])
+        loaded |= set(imp["loaded"]) | set(app["loaded"])
+        print(f"Lauf {i + 1}/{args.repeat}: import {imp['import_ms']:.0f} ms | "
+              f"intro {app['intro_ms']:.0f} ms | data {app['data_ms']:.0f} ms")
+
+    ok = True
+    row = {"timestamp": datetime.now().isoformat(timespec="seconds")}
+    print(f"\nMedian über {args.repeat} Läufe")
+    for phase, values in runs.items():
+        value, budget = median(values), getattr(args, f"budget_{phase}_ms")
+        within = value <= budget
+        ok &= within
+        row[f"{phase}_ms"], row[f"budget_{phase}_ms"] = round(value), round(budget)
+        print(f"  {phase:>6}: {value:8.0f} ms  (Budget {budget:.0f} ms)  {'ok' if within else 'ZU LANGSAM'}")
+
+    if loaded:
+        ok = False
+        print(f"  Intro lädt schwere Module: {', '.join(sorted(loaded))}")
+    else:
+        print(f"  Intro ohne {', '.join(LAZY_MODULES)}: ok")
+
+    row["ok"] = ok
+    if not args.no_log:
+        append_log(row)
+        print(f"Gespeichert unter: {PATH_LOG}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
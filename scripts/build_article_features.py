@@ -0,0 +1,72 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features)
+
+from article_features import COLOR_COLUMNS, build_article_features, load_article_artifact, save_article_artifact
+
+# ---------------------------------------------------------
+# Artikel-Merkmale einmal offline berechnen (siehe article_features.py)
+#
+#   python scripts/build_articles_filtered.py
+#   python scripts/build_image_colors.py        (optional, gemessene Farben)
+#   python scripts/build_article_popularity.py  (optional, Verkaufsstatistik)
+#   python scripts/build_article_features.py
+#
+# Ausgabe: data_processed/articles_store/ (eine .npy pro Spalte + meta.json)
+# demo9 lädt das Artefakt statt articles_filtered.csv und rechnet beim
+# Start nichts mehr zeilenweise; demo8 übernimmt style_category und
+# functional_type daraus.
+# ---------------------------------------------------------
+PATH_ARTICLES = BASE_DIR / "data_processed" / "articles_filtered.csv"
+PATH_COLORS = BASE_DIR / "data_processed" / "article_colors.csv"
+PATH_POPULARITY = BASE_DIR / "data_processed" / "article_popularity.csv"
+PATH_OUT = BASE_DIR / "data_processed" / "articles_store"
+
+# Freitext braucht keine der Apps zur Laufzeit, ist aber die größte Spalte
+DROP_COLUMNS = ["detail_desc"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Artikel-Merkmale als typisiertes Artefakt speichern.")
+    parser.add_argument("--no-colors", action="store_true", help="gemessene Bildfarben nicht einbeziehen")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    print(f"Lese Artikel aus: {PATH_ARTICLES}")
+    df_articles = pd.read_csv(PATH_ARTICLES)
+
+    df_colors = None
+    if PATH_COLORS.exists() and not args.no_colors:
+        df_colors = pd.read_csv(PATH_COLORS, usecols=lambda c: c in COLOR_COLUMNS)
+        print(f"Gemessene Bildfarben: {len(df_colors):,} Artikel")
+
+    df_popularity = None
+    if PATH_POPULARITY.exists():
+        df_popularity = pd.read_csv(PATH_POPULARITY)
+        print(f"Verkaufsstatistik: {len(df_popularity):,} Artikel")
+
+    df = build_article_features(df_articles, df_colors, df_popularity)
+    df = df.drop(columns=[c for c in DROP_COLUMNS if c in df.columns])
+    print(f"Merkmale berechnet in {time.perf_counter() - t0:.1f} s")
+
+    save_article_artifact(df, PATH_OUT)
+
+    t1 = time.perf_counter()
+    check = load_article_artifact(PATH_OUT)
+    t_load = time.perf_counter() - t1
+    for col in ["macro_category", "gender", "style", "style_category", "functional_type"]:
+        counts = check[col].value_counts(dropna=False).head(6)
+        print(f"{col:>16}: {', '.join(f'{name} {n}' for name, n in counts.items())}")
+    print(f"Outerwear-artig: {int(check['is_outerwear'].sum()):,}")
+    print(f"{len(check):,} Artikel, {sum(p.stat().st_size for p in PATH_OUT.iterdir()) / 2**20:.1f} MB, laden: {t_load * 1000:.0f} ms")
+    print(f"Fertig! Gespeichert unter: {PATH_OUT}")
+
+
+if __name__ == "__main__":
+    main()
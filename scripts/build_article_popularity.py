@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from copurchase_counting import SpillingPairCounter, compact_pairs, pack_pairs, unpack_pairs
+from transactions_store import TransactionStore, day_to_date
+
+# ---------------------------------------------------------
+# Popularität + Verkaufsstatistik pro Artikel
+#
+#   python scripts/ingest_transactions.py
+#   python scripts/build_article_popularity.py
+#
+# Ein Durchgang über den Transaktions-Speicher (nur die nötigen Spalten,
+# in Chunks), Ausgabe data_processed/article_popularity.csv:
+#   sales          Verkäufe (Transaktionszeilen) insgesamt
+#   buyers         verschiedene Kunden
+#   sales_4w       Verkäufe in den letzten RECENT_DAYS Tagen
+#                  (Referenz: letzter Verkaufstag im Speicher)
+#   median_price   Median des Verkaufspreises
+# buyers und median_price brauchen eindeutige (Artikel, Kunde)- bzw.
+# (Artikel, Preis)-Schlüssel; die laufen über SpillingPairCounter, der
+# über MEMORY_BUDGET_MB sortierte Runs auf die Platte auslagert.
+#
+# Die Apps sortieren damit ihre Fallbacks und "Überrasch mich"
+# (siehe segment_rankings in article_features.py).
+# ---------------------------------------------------------
+PATH_STORE = "data_processed/transactions_store"   # erzeugt von scripts/ingest_transactions.py
+PATH_OUT = "data_processed/article_popularity.csv"
+
+CHUNK_SIZE = 5_000_000
+RECENT_DAYS = 28
+MEMORY_BUDGET_MB = 1024
+SPILL_DIR = "data_processed/popularity_spill"
+
+
+def weighted_median(groups: np.ndarray, values: np.ndarray, counts: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Gewichteter (unterer) Median pro Gruppe. groups/values müssen
+    gemeinsam sortiert sein (erst Gruppe, dann Wert). Gruppen ohne Werte: NaN.
+    """
+    result = np.full(n_groups, np.nan, dtype=np.float64)
+    if len(groups) == 0:
+        return result
+    cum = np.cumsum(counts)
+    before = cum - counts
+    first = np.r_[True, groups[1:] != groups[:-1]]
+    # Kumulierte Anzahl vor Beginn der eigenen Gruppe (cum ist monoton)
+    group_start = np.maximum.accumulate(np.where(first, before, 0))
+    totals = np.bincount(groups, weights=counts, minlength=n_groups)
+    hit = np.flatnonzero((cum - group_start) * 2 >= totals[groups])
+    hit_groups, pos = np.unique(groups[hit], return_index=True)
+    result[hit_groups] = values[hit[pos]]
+    return result
+
+
+def compute_popularity(path_store: str, recent_days: int = RECENT_DAYS, chunk_rows: int = CHUNK_SIZE,
+                       memory_budget_mb: int = MEMORY_BUDGET_MB, spill_dir: str = SPILL_DIR) -> pd.DataFrame:
+    store = TransactionStore(path_store)
+    n_articles = len(store.article_ids)
+    budget_bytes = int(memory_budget_mb * 2**20)
+    recent_from = store.t_dat_max - recent_days + 1 if store.t_dat_max is not None else 0
+    print(f"Starte Verarbeitung von: {path_store} ({store.n_rows:,} Zeilen, "
+          f"letzte {recent_days} Tage ab {day_to_date(recent_from)})")
+
+    sales = np.zeros(n_articles, dtype=np.int64)
+    sales_recent = np.zeros(n_articles, dtype=np.int64)
+    buyer_counter = SpillingPairCounter(budget_bytes * 3 // 4, Path(spill_dir) / "buyers")
+    price_counter = SpillingPairCounter(budget_bytes // 4, Path(spill_dir) / "prices")
+
+    rows_done = 0
+    try:
+        for chunk in store.iter_chunks(["customer_code", "t_dat", "article_idx", "price"], chunk_rows):
+            article_idx = chunk["article_idx"]
+            sales += np.bincount(article_idx, minlength=n_articles)
+            sales_recent += np.bincount(article_idx[chunk["t_dat"] >= recent_from], minlength=n_articles)
+
+            # Pro Chunk schon verdichten: wiederholte Käufe/Preise fallen sofort weg
+            buyer_keys, _ = compact_pairs(pack_pairs(article_idx, chunk["customer_code"]),
+                                          np.ones(len(article_idx), dtype=np.uint32))
+            buyer_counter.add(buyer_keys, np.ones(len(buyer_keys), dtype=np.uint32))
+            # float32 >= 0: Bitmuster sortiert wie der Wert
+            price_keys, price_counts = compact_pairs(pack_pairs(article_idx, chunk["price"].view(np.uint32)),
+                                                     np.ones(len(article_idx), dtype=np.uint32))
+            price_counter.add(price_keys, price_counts)
+
+            rows_done += len(article_idx)
+            print(f"{rows_done:,}/{store.n_rows:,} Zeilen", end="\r", flush=True)
+        print()
+
+        buyers = np.zeros(n_articles, dtype=np.int64)
+        for keys, _ in buyer_counter.merged_blocks():
+            buyers += np.bincount(unpack_pairs(keys)[0], minlength=n_articles)
+
+        blocks = list(price_counter.merged_blocks())
+    finally:
+        buyer_counter.cleanup()
+        price_counter.cleanup()
+        if Path(spill_dir).exists() and not any(Path(spill_dir).iterdir()):
+            Path(spill_dir).rmdir()
+
+    keys = np.concatenate([k for k, _ in blocks]) if blocks else np.empty(0, dtype=np.uint64)
+    counts = np.concatenate([c for _, c in blocks]) if blocks else np.empty(0, dtype=np.int64)
+    price_article, price_bits = unpack_pairs(keys)
+    prices = price_bits.astype(np.uint32).view(np.float32)
+    median_price = weighted_median(price_article, prices, counts, n_articles)
+
+    df = pd.DataFrame({
+        "article_id": store.article_ids.astype(np.int64),
+        "sales": sales,
+        "buyers": buyers,
+        "sales_4w": sales_recent,
+        "median_price": median_price,
+    })
+    return df[df["sales"] > 0].sort_values("article_id").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verkaufsstatistik pro Artikel aus dem Transaktions-Speicher.")
+    parser.add_argument("--recent-days", type=int, default=RECENT_DAYS)
+    parser.add_argument("--memory-budget-mb", type=int, default=MEMORY_BUDGET_MB)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    df = compute_popularity(PATH_STORE, args.recent_days, memory_budget_mb=args.memory_budget_mb)
+
+    os.makedirs(os.path.dirname(PATH_OUT), exist_ok=True)
+    tmp = PATH_OUT + ".tmp"
+    df.to_csv(tmp, index=False, float_format="%.6f")
+    os.replace(tmp, PATH_OUT)
+
+    top = df.nlargest(5, "sales")
+    print(f"Meistverkauft: {', '.join(f'{a} ({s:,})' for a, s in zip(top['article_id'], top['sales']))}")
+    print(f"{len(df):,} Artikel mit Verkäufen, davon {int((df['sales_4w'] > 0).sum()):,} in den letzten "
+          f"{args.recent_days} Tagen | {time.perf_counter() - t0:.1f} s")
+    print(f"Fertig! Gespeichert unter: {PATH_OUT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from build_copurchase_filtered import (
+    CHUNK_SIZE,
+    DATE_FROM,
+    PATH_ARTICLES,
+    PATH_STORE,
+    build_article_code_lookup,
+    count_copurchase_pairs,
+    load_filtered_article_ids,
+    process_transactions_chunk,
+)
+from copurchase_counting import pack_pairs, pair_matrix_to_arrays
+from pair_sketches import CountMinSketch, SpaceSavingTable, topk_per_article
+from transactions_store import TransactionStore
+
+# ---------------------------------------------------------
+# Näherungsweise Co-Purchase-Top-Partner mit festem Speicher
+#
+# Für schnelle Probeläufe über den ganzen Katalog, z. B. um andere
+# keep_categories in build_articles_filtered.py auszuprobieren:
+#
+#   python scripts/build_articles_filtered.py        (mit neuen Kategorien)
+#   python scripts/build_copurchase_approx.py --compare
+#
+# Pro Chunk werden die Paare exakt gezählt und dann in einen
+# Count-Min-Sketch und eine SpaceSaving-Tabelle pro Artikel gegeben
+# (siehe scripts/pair_sketches.py). Der Speicher bleibt konstant, egal
+# wie viele verschiedene Paare es gibt.
+#
+# Ausgabe (copurchase_approx_topk.csv):
+#   article_id, rank, partner_id, count_est, count_lower
+# mit count_lower <= wahrer Count <= count_est.
+# --compare vergleicht die Top-K mit der exakten Zählung.
+# ---------------------------------------------------------
+PATH_OUT = "data_processed/copurchase_approx_topk.csv"
+
+TOP_K = 20
+SS_CAPACITY = 50         # überwachte Partner pro Artikel (>= TOP_K)
+CMS_WIDTH = 2**20        # Zähler pro Zeile (Zweierpotenz)
+CMS_DEPTH = 4
+
+
+def count_approx_topk(path_articles: str, k: int = TOP_K, capacity: int = SS_CAPACITY,
+                      cms_width: int = CMS_WIDTH, cms_depth: int = CMS_DEPTH):
+    valid_article_ids = load_filtered_article_ids(path_articles)
+    n_articles = len(valid_article_ids)
+
+    store = TransactionStore(PATH_STORE)
+    article_code_lookup = build_article_code_lookup(store, valid_article_ids)
+    total_rows_estimate = store.n_rows_in_range(date_from=DATE_FROM)
+
+    cms = CountMinSketch(cms_width, cms_depth)
+    space_saving = SpaceSavingTable(n_articles, capacity)
+    print(f"Count-Min-Sketch: {cms_depth} x {cms_width:,} ({cms.nbytes / 2**20:.0f} MB), "
+          f"SpaceSaving: {capacity} Partner pro Artikel")
+
+    reader = store.iter_basket_chunks(
+        ["customer_code", "t_dat", "article_idx"],
+        chunk_rows=CHUNK_SIZE,
+        date_from=DATE_FROM,
+    )
+    total_rows_processed = 0
+    for i, chunk in enumerate(reader, start=1):
+        total_rows_processed += len(chunk["article_idx"])
+        coo = process_transactions_chunk(chunk, article_code_lookup, n_articles).tocoo()
+
+        cms.add(pack_pairs(coo.row, coo.col), coo.data)
+        space_saving.update(
+            np.concatenate([coo.row, coo.col]),
+            np.concatenate([coo.col, coo.row]),
+            np.concatenate([coo.data, coo.data]),
+        )
+
+        progress = (total_rows_processed / total_rows_estimate) * 100 if total_rows_estimate else 100.0
+        print(f"Chunk {i} verarbeitet. Progress: {progress:6.2f}%", end="\r", file=sys.stdout, flush=True)
+    print()
+
+    # Kandidaten mit dem Sketch nachschärfen (beides sind obere Schranken)
+    top = space_saving.top(capacity)
+    a = top["article"].to_numpy()
+    p = top["partner"].to_numpy()
+    cms_est = cms.query(pack_pairs(np.minimum(a, p), np.maximum(a, p)))
+
+    df = pd.DataFrame({
+        "article_id": valid_article_ids[a],
+        "partner_id": valid_article_ids[p],
+        "count_est": np.minimum(top["count"].to_numpy(), cms_est),
+        "count_lower": np.maximum(top["count"].to_numpy() - top["error"].to_numpy(), 0),
+    })
+    df = df.sort_values(["article_id", "count_est", "partner_id"], ascending=[True, False, True])
+    df["rank"] = df.groupby("article_id", sort=False).cumcount()
+    df = df[df["rank"] < k][["article_id", "rank", "partner_id", "count_est", "count_lower"]]
+
+    print(f"Speicher Sketch + SpaceSaving: {(cms.nbytes + space_saving.nbytes) / 2**20:.1f} MB")
+    print(f"Fehlerschranke Sketch: count_est <= wahrer Count + {cms.eps * cms.total:,.1f} "
+          f"(eps = {cms.eps:.2e}, mit Wahrscheinlichkeit {1 - cms.delta:.3f})")
+    return df.reset_index(drop=True), valid_article_ids
+
+
+def compare_with_exact(df_approx: pd.DataFrame, valid_article_ids: np.ndarray, k: int):
+    """
+    Vergleicht die genäherten Top-K mit der exakten Zählung.
+    Ein genäherter Partner zählt als Treffer, wenn sein wahrer Count
+    mindestens so hoch ist wie der k-te exakte Count (Gleichstände zählen mit).
+    """
+    print("Exakte Zählung für den Vergleich ...")
+    pair_matrix = count_copurchase_pairs(PATH_STORE, valid_article_ids, CHUNK_SIZE, DATE_FROM)
+    id_1, id_2, counts = pair_matrix_to_arrays(pair_matrix, valid_article_ids)
+    exact = topk_per_article(id_1, id_2, counts, k)
+
+    # Wahre Counts der genäherten Partner
+    true_counts = pd.DataFrame({
+        "article_id": np.concatenate([id_1, id_2]),
+        "partner_id": np.concatenate([id_2, id_1]),
+        "count_true": np.concatenate([counts, counts]),
+    })
+    approx = df_approx.merge(true_counts, on=["article_id", "partner_id"], how="left")
+    approx["count_true"] = approx["count_true"].fillna(0).astype(np.int64)
+
+    kth = exact.groupby("article_id")["count"].min().rename("kth_count")
+    n_exact = exact.groupby("article_id").size().rename("n_exact")
+    approx = approx.merge(kth, left_on="article_id", right_index=True, how="inner")
+    approx["hit"] = (approx["count_true"] >= approx["kth_count"]) & (approx["count_true"] > 0)
+
+    exact_keys = set(zip(exact["article_id"], exact["partner_id"]))
+    approx["exact_member"] = [key in exact_keys for key in zip(approx["article_id"], approx["partner_id"])]
+
+    per_article = pd.DataFrame({
+        "hits": approx.groupby("article_id")["hit"].sum(),
+        "overlap": approx.groupby("article_id")["exact_member"].sum(),
+    }).join(n_exact, how="right").fillna(0)
+    precision = per_article["hits"] / per_article["n_exact"].clip(upper=k)
+    overlap = per_article["overlap"] / per_article["n_exact"].clip(upper=k)
+
+    in_bounds = (approx["count_lower"] <= approx["count_true"]) & (approx["count_true"] <= approx["count_est"])
+    abs_err = (approx["count_est"] - approx["count_true"]).abs()
+
+    print(f"\nVergleich Top-{k} (genähert vs. exakt), {len(per_article):,} Artikel mit Partnern")
+    print(f"  Precision@{k} (Gleichstände zählen mit): {precision.mean():.3f}")
+    print(f"  Overlap@{k} (exakte Menge):              {overlap.mean():.3f}")
+    print(f"  Artikel mit perfekter Top-{k}:            {(precision >= 1).mean():.1%}")
+    print(f"  Mittlerer Fehler count_est:              {abs_err.mean():.2f}")
+    print(f"  Wahrer Count innerhalb der Schranken:    {in_bounds.mean():.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-Purchase-Top-Partner näherungsweise mit festem Speicher.")
+    parser.add_argument("--articles", default=PATH_ARTICLES, help="gefilterte Artikelliste")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--capacity", type=int, default=SS_CAPACITY)
+    parser.add_argument("--cms-width", type=int, default=CMS_WIDTH)
+    parser.add_argument("--cms-depth", type=int, default=CMS_DEPTH)
+    parser.add_argument("--compare", action="store_true", help="mit exakter Zählung vergleichen")
+    args = parser.parse_args()
+    if args.capacity < args.k:
+        sys.exit("--capacity muss mindestens --k sein")
+
+    t0 = time.perf_counter()
+    df_approx, valid_article_ids = count_approx_topk(
+        args.articles, args.k, args.capacity, args.cms_width, args.cms_depth
+    )
+    print(f"Laufzeit: {time.perf_counter() - t0:.1f} s")
+
+    os.makedirs(os.path.dirname(PATH_OUT), exist_ok=True)
+    df_approx.to_csv(PATH_OUT, index=False)
+    print(f"Fertig! Genäherte Top-{args.k}-Partner gespeichert unter: {PATH_OUT}")
+
+    if args.compare:
+        compare_with_exact(df_approx, valid_article_ids, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store)
+
+from copurchase_store import CompressedCopurchase, CopurchaseAdjacency, write_compressed_adjacency
+
+# ---------------------------------------------------------
+# copurchase_filtered.csv -> komprimierte CSR-Datei (copurchase_csr.npz)
+# (Format siehe copurchase_store.py: delta-kodierte Partner-Indizes und
+# Counts, blockweise bit-gepackt, nur NumPy)
+#
+# Ersetzt für demo8 die fünf CSV-Teile in copurchase_parts_5/, die nur
+# wegen der Dateigröße existieren. --compare misst Größe und Ladezeit
+# gegen diese Teile und prüft, dass beide dieselbe Adjazenz liefern.
+#
+#   python scripts/build_copurchase_compressed.py --compare
+#
+# Messung auf synthetischen Daten (nicht H&M): 3,0 Mio. Paare über
+# 80.000 Artikel, Counts Zipf-verteilt (a = 1.8):
+#   copurchase_parts_5 (CSV):      63,3 MB | read_csv 1,1 s + CSR bauen 2,1 s
+#   copurchase_csr.npz:            17,1 MB | Dekodieren zur CSR 0,6 s
+#   Ein Artikel on demand:         ca. 0,1 ms
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+PATH_PAIRS_CSV = DATA_PROCESSED / "copurchase_filtered.csv"
+PARTS_DIR = DATA_PROCESSED / "copurchase_parts_5"
+PATH_OUT = DATA_PROCESSED / "copurchase_csr.npz"
+
+N_SINGLE_LOOKUPS = 1000
+
+
+def compare_with_parts(path_npz: Path):
+    part_files = sorted(PARTS_DIR.glob("copurchase_part_*.csv"))
+    if not part_files:
+        print(f"Keine Split-Dateien in {PARTS_DIR}, Vergleich übersprungen.")
+        return
+
+    t0 = time.perf_counter()
+    df_parts = pd.concat([pd.read_csv(f, usecols=["article_id_1", "article_id_2", "count"]) for f in part_files],
+                         ignore_index=True)
+    t_csv = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    adjacency_csv = CopurchaseAdjacency.from_frame(df_parts)
+    t_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    compressed = CompressedCopurchase(path_npz)
+    adjacency_npz = compressed.to_adjacency()
+    t_decode = time.perf_counter() - t0
+
+    rng = np.random.default_rng(42)
+    sample = rng.choice(compressed.article_ids, size=min(N_SINGLE_LOOKUPS, len(compressed.article_ids)), replace=False)
+    t0 = time.perf_counter()
+    for article_id in sample:
+        compressed.neighbors(article_id)
+    t_single = (time.perf_counter() - t0) / max(len(sample), 1)
+
+    same = all(
+        np.array_equal(getattr(adjacency_csv, name), getattr(adjacency_npz, name))
+        for name in ("article_ids", "indptr", "indices", "counts")
+    )
+    size_parts = sum(f.stat().st_size for f in part_files)
+    size_npz = path_npz.stat().st_size
+
+    print(f"\nVergleich mit {PARTS_DIR.name} ({len(part_files)} Dateien)")
+    print(f"  CSV-Teile:   {size_parts / 2**20:8.1f} MB | read_csv {t_csv:6.2f} s + CSR bauen {t_build:6.2f} s")
+    print(f"  npz:         {size_npz / 2**20:8.1f} MB | Dekodieren {t_decode:6.2f} s "
+          f"({size_parts / max(size_npz, 1):.1f}x kleiner)")
+    print(f"  Ein Artikel: {t_single * 1000:.3f} ms")
+    print(f"  Identische Adjazenz: {'ja' if same else 'NEIN'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-Purchase-Paare als komprimierte CSR-Datei ablegen.")
+    parser.add_argument("--compare", action="store_true", help=f"mit {PARTS_DIR.name} vergleichen")
+    args = parser.parse_args()
+
+    print(f"Lade Paare aus {PATH_PAIRS_CSV} ...")
+    df = pd.read_csv(PATH_PAIRS_CSV, usecols=["article_id_1", "article_id_2", "count"])
+    adjacency = CopurchaseAdjacency.from_frame(df)
+    print(f"Paare: {len(df):,} | Artikel: {adjacency.n_articles:,}")
+
+    size = write_compressed_adjacency(adjacency, PATH_OUT)
+    print(f"Größe: {size / 2**20:.1f} MB (CSR im Speicher: {adjacency.nbytes / 2**20:.1f} MB)")
+    print(f"Fertig! Komprimierte Co-Purchase-Datei gespeichert unter: {PATH_OUT}")
+
+    if args.compare:
+        compare_with_parts(PATH_OUT)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,208 @@
+import numpy as np
 import pandas as pd
-from collections import Counter
-from itertools import combinations
+import scipy.sparse as sp
 import os
 import sys
 
+from copurchase_counting import (
+    SpillingPairCounter,
+    basket_keys,
+    count_pairs_sparse,
+    count_pairs_weighted,
+    encode_articles,
+    pack_pairs,
+    pair_arrays_to_frame,
+    pair_matrices_to_columns,
+    unpack_pairs,
+)
+from transactions_store import TransactionStore, day_to_date
+
 # ---------------------------------------------------------
 # Pfade an dein Projekt anpassen (falls nötig)
 # ---------------------------------------------------------
 PATH_ARTICLES = "data_processed/articles_filtered.csv"
-PATH_TRANSACTIONS = "data_raw/transactions_train.csv"
+PATH_STORE = "data_processed/transactions_store"   # erzeugt von scripts/ingest_transactions.py
 PATH_OUT = "data_processed/copurchase_filtered.csv"
 
 # Optional: nur Paare mit mindestens MIN_COUNT speichern
 MIN_COUNT = 2
 
-# Chunk-Größe für das Einlesen der Transaktionen
+# Chunk-Größe für das Einlesen der Transaktionen.
+# Nur eine Stellschraube für Speicher/Durchsatz: Warenkörbe an Chunk-Grenzen
+# werden komplett in den nächsten Chunk übernommen, das Ergebnis bleibt gleich.
 CHUNK_SIZE = 1_000_000
 
-
-def load_filtered_article_ids(path_articles: str) -> set:
+# Optional: Zeitraum einschränken (z. B. "2019-06-01"), None = alle Transaktionen.
+# Der Filter wird auf die Row-Groups des Speichers heruntergedrückt.
+DATE_FROM = None
+
+# Zusätzliche Spalten mit Zeitfenstern, im selben Durchgang gezählt:
+#   count_4w / count_3m   Warenkörbe der letzten 28 bzw. 91 Tage
+#   score_decay           alle Warenkörbe, exponentiell nach Alter gewichtet
+# Referenztag ist der letzte Verkaufstag im Speicher; count bleibt "alle Zeiten".
+WINDOW_DAYS = {"count_4w": 28, "count_3m": 91}
+DECAY_HALF_LIFE_DAYS = 30
+
+# Optional: Speicherbudget in MB (z. B. 2048). None = alle Paare im RAM zählen.
+# Mit Budget werden Zwischenergebnisse als sortierte Runs nach SPILL_DIR
+# ausgelagert und am Ende per k-Wege-Merge zusammengeführt; die
+# Chunk-Größe wird dann automatisch an das Budget angepasst (CHUNK_SIZE gilt nicht).
+# In diesem Modus wird nur count (alle Zeiten) gezählt, keine Zeitfenster.
+MEMORY_BUDGET_MB = None
+SPILL_DIR = "data_processed/copurchase_spill"
+
+# Grobe Schätzwerte für die adaptive Chunk-Größe: Speicher pro
+# Transaktionszeile bzw. pro Paar eines Chunks während X^T X
+CHUNK_ROW_BYTES = 64
+CHUNK_PAIR_BYTES = 64
+MIN_CHUNK_ROWS = 10_000
+MAX_CHUNK_ROWS = 20_000_000
+
+
+def load_filtered_article_ids(path_articles: str) -> np.ndarray:
     """
-    Lädt articles_filtered.csv und gibt ein Set aller article_id zurück.
+    Lädt articles_filtered.csv und gibt alle article_id als sortiertes
+    Array zurück (Position im Array = dichter Artikel-Code).
     """
     print(f"Lese gefilterte Artikel aus: {path_articles}")
     df_articles = pd.read_csv(path_articles, usecols=["article_id"])
-    df_articles["article_id"] = df_articles["article_id"].astype(int)
-    article_ids = set(df_articles["article_id"].unique())
+    article_ids = np.unique(df_articles["article_id"].astype(np.int64).to_numpy())
     print(f"Anzahl distinct gefilterte article_id: {len(article_ids)}")
     return article_ids
 
 
-def count_rows_csv(path_csv: str) -> int:
+def build_article_code_lookup(store: TransactionStore, valid_article_ids: np.ndarray) -> np.ndarray:
     """
-    Zählt die Zeilen einer CSV-Datei (ohne Header), um eine grobe
-    Gesamtzeilenanzahl für die Fortschrittsanzeige zu haben.
+    Lookup-Array article_idx (Speicher) -> dichter Code in valid_article_ids.
+    Artikel außerhalb des Filters bekommen -1.
     """
-    print(f"Zähle Zeilen in {path_csv} für Fortschrittsanzeige ...")
-    with open(path_csv, "r", encoding="utf-8") as f:
-        # -1 wegen Header
-        total = sum(1 for _ in f) - 1
-    print(f"Geschätzte Gesamtzeilen (ohne Header): {total}")
-    return max(total, 0)
+    lookup = np.full(len(store.article_ids), -1, dtype=np.int32)
+    codes, mask = encode_articles(store.article_ids, valid_article_ids)
+    lookup[mask] = codes
+    return lookup
 
 
-def process_transactions_chunk(df_chunk: pd.DataFrame, valid_article_ids: set, pair_counter: Counter):
+def process_transactions_chunk(chunk: dict, article_code_lookup: np.ndarray,
+                               n_articles: int) -> sp.csr_matrix:
     """
-    Verarbeitet einen Chunk von transactions_train:
-    - Filter auf Artikel im Set valid_article_ids
-    - Gruppiert nach (customer_id, t_dat) = Warenkorb
-    - Zählt alle Artikelpaare pro Warenkorb in pair_counter
+    Verarbeitet einen Chunk aus dem Transaktions-Speicher:
+    - Filter auf gefilterte Artikel (article_code_lookup >= 0)
+    - Warenkorb = (customer_code, t_dat) als Integer-Schlüssel
+    - Zählt alle Artikelpaare pro Warenkorb vektorisiert über X^T X
+    Gibt die Paar-Matrix des Chunks zurück (oberes Dreieck).
     """
-    # Nur relevante Artikel behalten
-    df_chunk = df_chunk[df_chunk["article_id"].isin(valid_article_ids)]
-    if df_chunk.empty:
-        return
-
-    # Sicherstellen, dass article_id int ist
-    df_chunk["article_id"] = df_chunk["article_id"].astype(int)
+    article_codes = article_code_lookup[chunk["article_idx"]]
+    mask = article_codes >= 0
 
     # Warenkörbe definieren
     # Annahme: gleicher Kunde + gleiches Datum = ein Warenkorb
-    grouped = df_chunk.groupby(["customer_id", "t_dat"])["article_id"].unique()
+    baskets = basket_keys(chunk["customer_code"][mask], chunk["t_dat"][mask])
+
+    return count_pairs_sparse(baskets, article_codes[mask], n_articles)
+
+
+def window_row_weights(t_dat: np.ndarray, ref_day: int, since_day: int = None) -> dict:
+    """
+    Gewichte pro Transaktionszeile für count_pairs_weighted:
+    count (alle Zeiten), die Fenster aus WINDOW_DAYS und score_decay
+    (Halbwertszeit DECAY_HALF_LIFE_DAYS, Alter relativ zu ref_day).
+    Mit since_day zählen count und score_decay nur Tage > since_day
+    (Deltas für den inkrementellen Build); die Fenster bleiben vollständig.
+    """
+    age = (ref_day - t_dat.astype(np.int32)).astype(np.float64)
+    new_rows = None if since_day is None else (t_dat > since_day)
+
+    weights = {"count": None if new_rows is None else new_rows.astype(np.int32)}
+    for name, days in WINDOW_DAYS.items():
+        weights[name] = (age < days).astype(np.int32)
+    decay = np.power(0.5, age / DECAY_HALF_LIFE_DAYS)
+    weights["score_decay"] = decay if new_rows is None else decay * new_rows
+    return weights
+
+
+def count_copurchase_windows(path_store: str, valid_article_ids: np.ndarray,
+                             chunk_size: int = 1_000_000, date_from=None,
+                             ref_day: int = None, since_day: int = None) -> dict:
+    """
+    Ein Durchgang über die Transaktionen, der count, die Zeitfenster und
+    score_decay gleichzeitig zählt (siehe window_row_weights).
+    Gibt {spalte: Paar-Matrix} zurück (ohne MIN_COUNT-Filter).
+    """
+    n_articles = len(valid_article_ids)
+    store = TransactionStore(path_store)
+    article_code_lookup = build_article_code_lookup(store, valid_article_ids)
+    if ref_day is None:
+        ref_day = store.t_dat_max
+
+    print(f"Starte Verarbeitung von: {path_store} (Zeitfenster bis {day_to_date(ref_day)})")
+    total_rows_estimate = store.n_rows_in_range(date_from=date_from)
+    reader = store.iter_basket_chunks(
+        ["customer_code", "t_dat", "article_idx"],
+        chunk_rows=chunk_size,
+        date_from=date_from,
+    )
 
-    for (_, _), articles in grouped.items():
-        # Nur interessante Körbe: mind. 2 verschiedene Artikel
-        if len(articles) < 2:
-            continue
+    matrices = None
+    total_rows_processed = 0
+    for i, chunk in enumerate(reader, start=1):
+        total_rows_processed += len(chunk["article_idx"])
+
+        article_codes = article_code_lookup[chunk["article_idx"]]
+        mask = article_codes >= 0
+        t_dat = chunk["t_dat"][mask]
+        baskets = basket_keys(chunk["customer_code"][mask], t_dat)
+        chunk_matrices = count_pairs_weighted(
+            baskets, article_codes[mask], n_articles, window_row_weights(t_dat, ref_day, since_day)
+        )
+        if matrices is None:
+            matrices = chunk_matrices
+        else:
+            matrices = {name: matrices[name] + m for name, m in chunk_matrices.items()}
+
+        progress = (total_rows_processed / total_rows_estimate) * 100 if total_rows_estimate else 100.0
+        print(
+            f"Chunk {i} verarbeitet. Progress: {progress:6.2f}% "
+            f"({total_rows_processed:,} / {total_rows_estimate:,} rows)",
+            end="\r", file=sys.stdout, flush=True,
+        )
+    print()
 
-        # Alle Kombinationen von 2 Artikeln
-        for a1, a2 in combinations(sorted(articles), 2):
-            pair_counter[(a1, a2)] += 1
+    if matrices is None:
+        weights = window_row_weights(np.empty(0, dtype=np.int16), ref_day, since_day)
+        matrices = count_pairs_weighted(np.empty(0, np.int64), np.empty(0, np.int32), n_articles, weights)
+    return matrices
 
 
-def build_copurchase_matrix(path_transactions: str, valid_article_ids: set,
-                            chunk_size: int = 1_000_000) -> pd.DataFrame:
+def count_copurchase_pairs(path_store: str, valid_article_ids: np.ndarray,
+                           chunk_size: int = 1_000_000, date_from=None) -> sp.csr_matrix:
     """
-    Lädt transactions_train.csv in Chunks ein,
-    baut eine Co-Purchase-Matrix (als Liste von Paaren mit Count) auf
-    und gibt sie als DataFrame zurück.
+    Liest die benötigten Spalten aus dem Transaktions-Speicher in Chunks
+    und summiert die dünnbesetzten Chunk-Matrizen zur Paar-Matrix auf
+    (ohne MIN_COUNT-Filter).
     """
-    pair_counter = Counter()
+    n_articles = len(valid_article_ids)
+    pair_matrix = sp.csr_matrix((n_articles, n_articles), dtype=np.int32)
 
-    usecols = ["t_dat", "customer_id", "article_id"]
-    print(f"Starte Verarbeitung von: {path_transactions}")
+    print(f"Starte Verarbeitung von: {path_store}")
+    store = TransactionStore(path_store)
+    article_code_lookup = build_article_code_lookup(store, valid_article_ids)
 
-    # Gesamtzeilen für Fortschrittsanzeige ermitteln
-    total_rows_estimate = count_rows_csv(path_transactions)
+    # Gesamtzeilen für Fortschrittsanzeige (nur Row-Groups im Zeitraum)
+    total_rows_estimate = store.n_rows_in_range(date_from=date_from)
 
-    reader = pd.read_csv(
-        path_transactions,
-        usecols=usecols,
-        chunksize=chunk_size
+    reader = store.iter_basket_chunks(
+        ["customer_code", "t_dat", "article_idx"],
+        chunk_rows=chunk_size,
+        date_from=date_from,
     )
 
     total_rows_processed = 0
 
     for i, chunk in enumerate(reader, start=1):
-        rows_in_chunk = len(chunk)
+        rows_in_chunk = len(chunk["article_idx"])
         total_rows_processed += rows_in_chunk
 
-        process_transactions_chunk(chunk, valid_article_ids, pair_counter)
+        pair_matrix = pair_matrix + process_transactions_chunk(chunk, article_code_lookup, n_articles)
 
         # Fortschritt berechnen und im gleichen Terminal-Output aktualisieren
         if total_rows_estimate > 0:
@@ -118,20 +221,115 @@ def build_copurchase_matrix(path_transactions: str, valid_article_ids: set,
 
     # Am Ende eine neue Zeile ausgeben, damit die letzte Progress-Zeile "fest" ist
     print()
+    return pair_matrix
 
-    print("Transaktionen verarbeitet. Erzeuge DataFrame aus Paaren...")
 
-    # Counter -> DataFrame
-    rows = []
-    for (a1, a2), cnt in pair_counter.items():
-        # Optionaler Filter auf Mindestanzahl
-        if cnt >= MIN_COUNT:
-            rows.append((a1, a2, cnt))
+class AdaptiveChunkRows:
+    """
+    Chunk-Größe aus dem Speicherbudget: budget / (Bytes pro Zeile +
+    Paare pro Zeile * Bytes pro Paar). Paare pro Zeile werden aus den
+    bereits verarbeiteten Chunks geschätzt (eher zu hoch als zu niedrig).
+    """
+
+    def __init__(self, budget_bytes: int, pairs_per_row: float = 4.0):
+        self.budget_bytes = budget_bytes
+        self.pairs_per_row = pairs_per_row
 
-    df_pairs = pd.DataFrame(rows, columns=["article_id_1", "article_id_2", "count"])
+    def __call__(self) -> int:
+        per_row = CHUNK_ROW_BYTES + self.pairs_per_row * CHUNK_PAIR_BYTES
+        return int(min(max(self.budget_bytes / per_row, MIN_CHUNK_ROWS), MAX_CHUNK_ROWS))
+
+    def observe(self, n_rows: int, n_pairs: int):
+        if n_rows > 0:
+            observed = n_pairs / n_rows
+            self.pairs_per_row = max(observed, 0.7 * self.pairs_per_row + 0.3 * observed)
+
+
+def count_copurchase_pairs_bounded(path_store: str, valid_article_ids: np.ndarray,
+                                   memory_budget_mb: int, date_from=None,
+                                   min_count: int = 1, spill_dir: str = SPILL_DIR):
+    """
+    Wie count_copurchase_pairs, aber mit begrenztem Speicher: die Hälfte
+    des Budgets geht an die Chunks, die andere Hälfte an den Paar-Puffer,
+    der bei Bedarf als sortierter Run ausgelagert wird.
+    Gibt (article_id_1, article_id_2, count) mit count >= min_count zurück.
+    """
+    budget_bytes = int(memory_budget_mb * 2**20)
+    n_articles = len(valid_article_ids)
+
+    print(f"Starte Verarbeitung von: {path_store} (Speicherbudget {memory_budget_mb} MB)")
+    store = TransactionStore(path_store)
+    article_code_lookup = build_article_code_lookup(store, valid_article_ids)
+    total_rows_estimate = store.n_rows_in_range(date_from=date_from)
+
+    chunk_rows = AdaptiveChunkRows(budget_bytes // 2)
+    counter = SpillingPairCounter(budget_bytes // 2, spill_dir)
+
+    reader = store.iter_basket_chunks(
+        ["customer_code", "t_dat", "article_idx"],
+        chunk_rows=chunk_rows,
+        date_from=date_from,
+    )
+
+    total_rows_processed = 0
+    try:
+        for i, chunk in enumerate(reader, start=1):
+            rows_in_chunk = len(chunk["article_idx"])
+            total_rows_processed += rows_in_chunk
+
+            # Paare in Artikel-Codes packen (Codes sind sortiert wie die article_ids)
+            coo = process_transactions_chunk(chunk, article_code_lookup, n_articles).tocoo()
+            counter.add(pack_pairs(coo.row, coo.col), coo.data)
+            chunk_rows.observe(rows_in_chunk, len(coo.data))
+
+            progress = (total_rows_processed / total_rows_estimate) * 100 if total_rows_estimate else 100.0
+            print(
+                f"Chunk {i} verarbeitet, Zeilen im Chunk: {rows_in_chunk}. "
+                f"Progress: {progress:6.2f}% | Runs auf Platte: {len(counter.run_paths)} | "
+                f"nächste Chunk-Größe: {chunk_rows():,}",
+                end="\r", file=sys.stdout, flush=True,
+            )
+        print()
+
+        print(f"Führe {len(counter.run_paths)} ausgelagerte Runs + RAM-Puffer zusammen ...")
+        parts = []
+        for keys, counts in counter.merged_blocks():
+            keep = counts >= min_count
+            parts.append((keys[keep], counts[keep]))
+    finally:
+        counter.cleanup()
+
+    keys = np.concatenate([k for k, _ in parts]) if parts else np.empty(0, dtype=np.uint64)
+    counts = np.concatenate([c for _, c in parts]) if parts else np.empty(0, dtype=np.int64)
+    code_1, code_2 = unpack_pairs(keys)
+    return valid_article_ids[code_1], valid_article_ids[code_2], counts
+
+
+def build_copurchase_matrix(path_store: str, valid_article_ids: np.ndarray,
+                            chunk_size: int = 1_000_000, date_from=None) -> pd.DataFrame:
+    """
+    Baut die Co-Purchase-Matrix aus dem Transaktions-Speicher auf
+    und gibt sie als DataFrame mit Paaren und Count zurück.
+    Mit MEMORY_BUDGET_MB wird speicherbegrenzt gezählt (gleiches Ergebnis).
+    """
+    if MEMORY_BUDGET_MB is not None:
+        id_1, id_2, counts = count_copurchase_pairs_bounded(
+            path_store, valid_article_ids, MEMORY_BUDGET_MB, date_from, min_count=MIN_COUNT
+        )
+        print("Transaktionen verarbeitet. Erzeuge DataFrame aus Paaren...")
+        df_pairs = pair_arrays_to_frame(id_1, id_2, counts, min_count=MIN_COUNT)
+        print(f"Anzahl Co-Purchase-Paare (count >= {MIN_COUNT}): {len(df_pairs)}")
+        return df_pairs
+
+    matrices = count_copurchase_windows(path_store, valid_article_ids, chunk_size, date_from)
+
+    print("Transaktionen verarbeitet. Erzeuge DataFrame aus Paaren...")
 
-    # Nach Häufigkeit sortieren
-    df_pairs = df_pairs.sort_values("count", ascending=False).reset_index(drop=True)
+    # Paar-Matrizen -> DataFrame (inkl. Filter auf Mindestanzahl, nach Häufigkeit sortiert)
+    id_1, id_2, columns = pair_matrices_to_columns(matrices, valid_article_ids)
+    counts = columns.pop("count")
+    df_pairs = pair_arrays_to_frame(id_1, id_2, counts, min_count=MIN_COUNT, extra_columns=columns)
+    df_pairs["score_decay"] = df_pairs["score_decay"].round(4)
     print(f"Anzahl Co-Purchase-Paare (count >= {MIN_COUNT}): {len(df_pairs)}")
 
     return df_pairs
@@ -145,9 +343,10 @@ def main():
 
     # 2) Co-Purchase-Matrix aufbauen
     df_copurchase = build_copurchase_matrix(
-        path_transactions=PATH_TRANSACTIONS,
+        path_store=PATH_STORE,
         valid_article_ids=valid_article_ids,
-        chunk_size=CHUNK_SIZE
+        chunk_size=CHUNK_SIZE,
+        date_from=DATE_FROM,
     )
 
     # 3) Speichern
@@ -0,0 +1,181 @@
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from build_copurchase_filtered import (
+    CHUNK_SIZE,
+    DECAY_HALF_LIFE_DAYS,
+    MIN_COUNT,
+    PATH_ARTICLES,
+    PATH_OUT,
+    PATH_STORE,
+    WINDOW_DAYS,
+    count_copurchase_windows,
+    load_filtered_article_ids,
+)
+from copurchase_counting import pair_arrays_to_frame, pair_matrices_to_columns, sum_pair_columns
+from transactions_store import TransactionStore, day_to_date
+
+# ---------------------------------------------------------
+# Inkrementelle Co-Purchase-Aktualisierung
+#
+# Im Zustandsordner liegen:
+#   pairs.npz    alle Paare mit ihren ungefilterten Gesamt-Counts,
+#                Zeitfenstern und score_decay (Stand: Watermark)
+#   state.json   Watermark (letzter verarbeiteter t_dat) + Fingerabdruck
+#                der gefilterten Artikelliste + Halbwertszeit
+#
+# Ein Lauf liest nur die neuen Transaktionen (t_dat > Watermark) und die
+# Tage des längsten Zeitfensters (der Datumsfilter wird auf die Row-Groups
+# des Speichers heruntergedrückt). In diesem einen Durchgang entstehen:
+#   - Deltas für count und score_decay (nur t_dat > Watermark); der alte
+#     score_decay wird vorher auf den neuen Referenztag abgewertet
+#   - die Zeitfenster count_4w/count_3m komplett neu
+# MIN_COUNT wird erst auf die zusammengeführten Counts angewendet.
+#
+# Ablauf für eine nächtliche Aktualisierung:
+#   python scripts/ingest_transactions.py --append data_raw/transactions_new.csv
+#   python scripts/build_copurchase_incremental.py
+#
+# Annahme: ein Tag wird immer komplett geliefert. Kommen Nachzügler für
+# einen bereits verarbeiteten Tag, ist ein Voll-Lauf (--full) nötig.
+# ---------------------------------------------------------
+STATE_DIR = "data_processed/copurchase_state"
+
+
+def articles_fingerprint(valid_article_ids: np.ndarray) -> str:
+    """Ändert sich die Artikelliste, passen die gespeicherten Counts nicht mehr."""
+    return hashlib.sha1(np.ascontiguousarray(valid_article_ids, dtype=np.int64).tobytes()).hexdigest()
+
+
+def load_state(state_dir: str):
+    """
+    Gibt (state, (id_1, id_2, {count, score_decay})) zurück oder None,
+    wenn es noch keinen (vollständigen) Zustand gibt.
+    """
+    state_path = Path(state_dir) / "state.json"
+    pairs_path = Path(state_dir) / "pairs.npz"
+    if not state_path.exists() or not pairs_path.exists():
+        return None
+    with open(state_path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    with np.load(pairs_path) as data:
+        if "score_decay" not in data:
+            return None   # Zustand aus einer Version ohne Zeitfenster
+        pairs = (data["article_id_1"], data["article_id_2"],
+                 {"count": data["count"], "score_decay": data["score_decay"]})
+    return state, pairs
+
+
+def save_state(state_dir: str, state: dict, pairs: tuple):
+    """
+    Schreibt erst die Paare, dann state.json – jeweils über eine
+    temporäre Datei, damit ein Abbruch nie einen inkonsistenten Zustand
+    (neue Watermark, alte Counts) hinterlässt.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    id_1, id_2, columns = pairs
+
+    pairs_tmp = Path(state_dir) / ".pairs_tmp.npz"
+    # Zeitfenster werden mitgespeichert (für build_copurchase_topk.py),
+    # beim nächsten Lauf aber neu berechnet
+    np.savez(pairs_tmp, article_id_1=id_1, article_id_2=id_2, **columns)
+    os.replace(pairs_tmp, Path(state_dir) / "pairs.npz")
+
+    state_tmp = Path(state_dir) / ".state_tmp.json"
+    with open(state_tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(state_tmp, Path(state_dir) / "state.json")
+
+
+def update_copurchase(full: bool = False, state_dir: str = STATE_DIR):
+    valid_article_ids = load_filtered_article_ids(PATH_ARTICLES)
+    fingerprint = articles_fingerprint(valid_article_ids)
+
+    store = TransactionStore(PATH_STORE)
+    store_max = store.t_dat_max
+    if store_max is None:
+        print("Transaktions-Speicher ist leer – nichts zu tun.")
+        return
+
+    loaded = None if full else load_state(state_dir)
+    if loaded is not None and loaded[0].get("articles_fingerprint") != fingerprint:
+        print("articles_filtered.csv hat sich geändert -> Voll-Lauf nötig.")
+        loaded = None
+    if loaded is not None and loaded[0].get("decay_half_life_days") != DECAY_HALF_LIFE_DAYS:
+        print("DECAY_HALF_LIFE_DAYS hat sich geändert -> Voll-Lauf nötig.")
+        loaded = None
+
+    if loaded is None:
+        print("Kein (gültiger) Zustand vorhanden -> verarbeite die komplette Historie.")
+        watermark = None
+        old_pairs = None
+        date_from = None
+    else:
+        state, old_pairs = loaded
+        watermark = state["watermark"]
+        if watermark >= store_max:
+            print(f"Keine neuen Transaktionen nach {day_to_date(watermark)} – nichts zu tun.")
+            return
+        # Neue Tage + alle Tage des längsten Zeitfensters
+        window_start = store_max - max(WINDOW_DAYS.values()) + 1
+        date_from = day_to_date(min(watermark + 1, window_start))
+        print(f"Watermark: {day_to_date(watermark)} -> verarbeite Transaktionen ab {date_from}")
+
+    # 1) Deltas (count, score_decay) und Zeitfenster in einem Durchgang zählen
+    matrices = count_copurchase_windows(
+        PATH_STORE, valid_article_ids, CHUNK_SIZE,
+        date_from=date_from, ref_day=store_max, since_day=watermark,
+    )
+    delta = pair_matrices_to_columns(matrices, valid_article_ids)
+    print(f"Neue bzw. veränderte Paare: {int((delta[2]['count'] > 0).sum()):,}")
+
+    # 2) Mit dem gespeicherten Stand zusammenführen (alten Score auf den neuen Tag abwerten)
+    if old_pairs is None:
+        merged = delta
+    else:
+        old_id_1, old_id_2, old_columns = old_pairs
+        decay = 0.5 ** ((store_max - watermark) / DECAY_HALF_LIFE_DAYS)
+        old_columns = {"count": old_columns["count"], "score_decay": old_columns["score_decay"] * decay}
+        merged = sum_pair_columns([(old_id_1, old_id_2, old_columns), delta])
+    id_1, id_2, columns = merged
+
+    # 3) Zustand sichern (ungefilterte Counts!)
+    save_state(state_dir, {
+        "watermark": int(store_max),
+        "watermark_date": day_to_date(store_max),
+        "articles_fingerprint": fingerprint,
+        "decay_half_life_days": DECAY_HALF_LIFE_DAYS,
+        "n_pairs": int(len(id_1)),
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+    }, merged)
+
+    # 4) MIN_COUNT auf die zusammengeführten Counts anwenden und CSV schreiben
+    counts = columns["count"]
+    df_pairs = pair_arrays_to_frame(id_1, id_2, counts, min_count=MIN_COUNT, extra_columns={
+        name: columns[name] for name in list(WINDOW_DAYS) + ["score_decay"]
+    })
+    df_pairs["score_decay"] = df_pairs["score_decay"].round(4)
+    os.makedirs(os.path.dirname(PATH_OUT), exist_ok=True)
+    df_pairs.to_csv(PATH_OUT, index=False)
+    print(f"Anzahl Co-Purchase-Paare (count >= {MIN_COUNT}): {len(df_pairs)}")
+    print(f"Fertig! Co-Purchase-Datei gespeichert unter: {PATH_OUT} "
+          f"(Stand: {day_to_date(store_max)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-Purchase-Counts inkrementell aktualisieren.")
+    parser.add_argument("--full", action="store_true",
+                        help="gespeicherten Zustand ignorieren und komplett neu aufbauen")
+    parser.add_argument("--state-dir", default=STATE_DIR)
+    args = parser.parse_args()
+    update_copurchase(full=args.full, state_dir=args.state_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store)
+
+from article_features import get_macro_by_article
+from copurchase_store import WINDOW_COLUMNS, write_partitioned_store
+
+# ---------------------------------------------------------
+# copurchase_filtered.csv -> nach Artikel partitionierter Binär-Speicher
+# (Layout siehe copurchase_store.py)
+#
+# Ersetzt split_copurchase_into_5.py für demo9: Statt fünf beliebiger
+# Zeilenbereiche, die die App alle parsen muss, liegt jeder Artikel mit
+# all seinen Partnern in genau einer Partition. Die App liest beim Start
+# nur index.npy und öffnet eine Partition erst, wenn ein Basisartikel
+# daraus angefragt wird.
+#
+#   python scripts/build_copurchase_partitions.py --max-partition-mb 40
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+PATH_ARTICLES = DATA_PROCESSED / "articles_filtered.csv"
+PATH_PAIRS_CSV = DATA_PROCESSED / "copurchase_filtered.csv"
+STORE_DIR = DATA_PROCESSED / "copurchase_store"
+
+# GitHub lehnt Dateien > 100 MB ab und warnt ab 50 MB
+MAX_PARTITION_MB = 40
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-Purchase-Paare als partitionierten Binär-Speicher ablegen.")
+    parser.add_argument("--max-partition-mb", type=float, default=MAX_PARTITION_MB)
+    args = parser.parse_args()
+
+    print("Lade Artikel ...")
+    macro_by_article = get_macro_by_article(pd.read_csv(PATH_ARTICLES))
+
+    print(f"Lade Paare aus {PATH_PAIRS_CSV} ...")
+    df = pd.read_csv(PATH_PAIRS_CSV)
+    columns = {c: df[c].to_numpy() for c in WINDOW_COLUMNS if c in df.columns}
+    print(f"Paare: {len(df):,} | Spalten: {', '.join(columns)}")
+
+    meta = write_partitioned_store(
+        df["article_id_1"].to_numpy(dtype=np.int64),
+        df["article_id_2"].to_numpy(dtype=np.int64),
+        columns,
+        macro_by_article,
+        STORE_DIR,
+        max_partition_mb=args.max_partition_mb,
+        source=PATH_PAIRS_CSV.name,
+    )
+    print(f"Partitionen: {meta['n_partitions']} | Artikel: {meta['n_articles']:,} | "
+          f"größte Partition: {meta['max_partition_bytes'] / 2**20:.1f} MB")
+    print(f"Fertig! Co-Purchase-Speicher gespeichert unter: {STORE_DIR}")
+
+
+if __name__ == "__main__":
+    main()
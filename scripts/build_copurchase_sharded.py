@@ -0,0 +1,278 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+from build_copurchase_filtered import (
+    CHUNK_SIZE,
+    DATE_FROM,
+    MIN_COUNT,
+    PATH_ARTICLES,
+    PATH_OUT,
+    PATH_STORE,
+    build_article_code_lookup,
+    load_filtered_article_ids,
+)
+from copurchase_counting import basket_keys, count_pairs_sparse, pair_arrays_to_frame, pair_matrix_to_arrays, sum_pair_tables
+from transactions_store import TransactionStore
+
+# ---------------------------------------------------------
+# Paralleler Co-Purchase-Build nach dem Map/Merge-Prinzip
+#
+# partition: ein Durchgang über den Transaktions-Speicher. Zeilen mit
+#        Artikeln außerhalb von articles_filtered.csv fallen weg, die
+#        übrigen gehen nach hash(customer) % n in die Eingabedateien
+#        ihres Shards (customer_code, t_dat, dichter Artikel-Code).
+#        Da ein Warenkorb = (Kunde, Datum) ist, landet jeder Warenkorb
+#        komplett in genau einem Shard.
+# map:   Shard i liest nur seine eigenen Eingabedateien und zählt die
+#        Paare. Ergebnis: eine einfache .npz-Datei pro Shard.
+# merge: summiert alle Shard-Dateien und schreibt copurchase_filtered.csv.
+# run:   alles lokal, map mit einem Prozess-Pool.
+#
+# Lesen, Hashen und der Artikel-Lookup passieren so nur einmal (in
+# partition); die map-Schritte zusammen lesen jede Zeile genau einmal.
+# Für mehrere Rechner: partition einmal ausführen, pro Rechner die
+# Eingabedateien seiner Shards plus article_ids.npy und meta.json aus
+# SHARD_INPUT_DIR kopieren, dort map laufen lassen, die Shard-Dateien
+# in einen Ordner kopieren und merge ausführen.
+#
+# Beispiele:
+#   python scripts/build_copurchase_sharded.py run --workers 8
+#   python scripts/build_copurchase_sharded.py partition --num-shards 16
+#   python scripts/build_copurchase_sharded.py map --shard 3 --num-shards 16
+#   python scripts/build_copurchase_sharded.py merge
+# ---------------------------------------------------------
+SHARD_DIR = "data_processed/copurchase_shards"
+SHARD_INPUT_DIR = "data_processed/copurchase_shard_input"
+
+# Spalten der Shard-Eingabedateien
+SHARD_INPUT_COLUMNS = {"customer_code": "uint32", "t_dat": "int16", "article_code": "int32"}
+
+
+def shard_of_customers(customer_codes: np.ndarray, num_shards: int) -> np.ndarray:
+    """
+    Shard-Nummer pro Kunde. Multiplikatives Hashing (Knuth) statt
+    einfachem Modulo, damit auch aufeinanderfolgende Codes gleichmäßig
+    verteilt werden.
+    """
+    hashed = (customer_codes.astype(np.uint64) * np.uint64(2654435761)) & np.uint64(0xFFFFFFFF)
+    return (hashed % np.uint64(num_shards)).astype(np.int64)
+
+
+def shard_path(shard_dir, shard: int, num_shards: int) -> Path:
+    return Path(shard_dir) / f"shard_{shard:03d}_of_{num_shards:03d}.npz"
+
+
+def shard_input_path(input_dir, shard: int, num_shards: int, column: str) -> Path:
+    return Path(input_dir) / f"shard_{shard:03d}_of_{num_shards:03d}_{column}.bin"
+
+
+def partition_transactions(num_shards: int, input_dir: str = SHARD_INPUT_DIR,
+                           path_store: str = PATH_STORE, path_articles: str = PATH_ARTICLES,
+                           chunk_size: int = CHUNK_SIZE, date_from=DATE_FROM) -> dict:
+    """
+    Verteilt die Transaktionen in einem Durchgang auf die Shards und
+    schreibt pro Shard und Spalte eine rohe Binärdatei (Reihenfolge wie
+    im Speicher, also nach t_dat sortiert). Gibt die Metadaten zurück.
+    """
+    valid_article_ids = load_filtered_article_ids(path_articles)
+    store = TransactionStore(path_store)
+    article_code_lookup = build_article_code_lookup(store, valid_article_ids)
+
+    input_dir = Path(input_dir)
+    if input_dir.exists():
+        shutil.rmtree(input_dir)
+    input_dir.mkdir(parents=True)
+    np.save(input_dir / "article_ids.npy", valid_article_ids)
+
+    files = {(shard, c): open(shard_input_path(input_dir, shard, num_shards, c), "wb")
+             for shard in range(num_shards) for c in SHARD_INPUT_COLUMNS}
+    n_rows = np.zeros(num_shards, dtype=np.int64)
+    try:
+        # iter_basket_chunks prüft die Sortierung nach t_dat, auf die sich map verlässt
+        reader = store.iter_basket_chunks(["customer_code", "t_dat", "article_idx"],
+                                          chunk_rows=chunk_size, date_from=date_from)
+        for chunk in reader:
+            article_code = article_code_lookup[chunk["article_idx"]]
+            keep = article_code >= 0
+            columns = {"customer_code": chunk["customer_code"][keep], "t_dat": chunk["t_dat"][keep],
+                       "article_code": article_code[keep]}
+            shards = shard_of_customers(columns["customer_code"], num_shards)
+            # stabil sortiert: innerhalb eines Shards bleibt die t_dat-Reihenfolge erhalten
+            order = np.argsort(shards, kind="stable")
+            bounds = np.searchsorted(shards[order], np.arange(num_shards + 1))
+            for c, values in columns.items():
+                values = values[order].astype(SHARD_INPUT_COLUMNS[c], copy=False)
+                for shard in range(num_shards):
+                    files[(shard, c)].write(values[bounds[shard]:bounds[shard + 1]].tobytes())
+            n_rows += np.diff(bounds)
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {"num_shards": num_shards, "n_articles": len(valid_article_ids), "n_rows": n_rows.tolist(),
+            "date_from": date_from, "columns": SHARD_INPUT_COLUMNS}
+    with open(input_dir / "meta.json", "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    print(f"Partitioniert: {int(n_rows.sum()):,} Zeilen auf {num_shards} Shards "
+          f"(min {n_rows.min():,}, max {n_rows.max():,}) -> {input_dir}")
+    return meta
+
+
+def iter_shard_chunks(input_dir, shard: int, num_shards: int, n_rows: int, chunk_size: int = CHUNK_SIZE):
+    """
+    Chunks der Eingabedateien eines Shards (memmap). Ein Chunk endet
+    immer am Ende eines Tages, damit kein Warenkorb geteilt wird.
+    """
+    if n_rows == 0:
+        return
+    cols = {c: np.memmap(shard_input_path(input_dir, shard, num_shards, c), dtype=dtype, mode="r", shape=(n_rows,))
+            for c, dtype in SHARD_INPUT_COLUMNS.items()}
+    t_dat = cols["t_dat"]
+    start = 0
+    while start < n_rows:
+        stop = min(start + chunk_size, n_rows)
+        # bis zum Ende des letzten Tages verlängern (t_dat ist sortiert)
+        stop = start + int(np.searchsorted(t_dat[start:], t_dat[stop - 1], side="right"))
+        yield {c: np.asarray(col[start:stop]) for c, col in cols.items()}
+        start = stop
+
+
+def map_shard(shard: int, num_shards: int, shard_dir: str = SHARD_DIR,
+              input_dir: str = SHARD_INPUT_DIR, chunk_size: int = CHUNK_SIZE) -> Path:
+    """
+    Zählt die Artikelpaare aller Warenkörbe eines Shards aus seinen
+    Eingabedateien (siehe partition_transactions) und speichert sie als
+    shard_XXX_of_YYY.npz (article_id_1, article_id_2, count).
+    """
+    meta_path = Path(input_dir) / "meta.json"
+    if not meta_path.exists():
+        raise FileNotFoundError(f"Keine Shard-Eingabe gefunden in {input_dir}. Bitte zuerst partition ausführen.")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta["num_shards"] != num_shards:
+        raise ValueError(f"Shard-Eingabe in {input_dir} ist für {meta['num_shards']} Shards, nicht {num_shards}")
+    valid_article_ids = np.load(Path(input_dir) / "article_ids.npy")
+    n_articles = len(valid_article_ids)
+
+    pair_matrix = sp.csr_matrix((n_articles, n_articles), dtype=np.int32)
+    for chunk in iter_shard_chunks(input_dir, shard, num_shards, meta["n_rows"][shard], chunk_size):
+        baskets = basket_keys(chunk["customer_code"], chunk["t_dat"])
+        pair_matrix = pair_matrix + count_pairs_sparse(baskets, chunk["article_code"], n_articles)
+
+    id_1, id_2, counts = pair_matrix_to_arrays(pair_matrix, valid_article_ids)
+
+    out_path = shard_path(shard_dir, shard, num_shards)
+    os.makedirs(out_path.parent, exist_ok=True)
+    # Erst in eine temporäre Datei schreiben, damit merge nie halbe Shards sieht
+    tmp_path = out_path.with_name(f".tmp_{out_path.name}")
+    np.savez(tmp_path, article_id_1=id_1, article_id_2=id_2, count=counts)
+    os.replace(tmp_path, out_path)
+
+    print(f"Shard {shard + 1}/{num_shards}: {len(counts):,} Paare -> {out_path}")
+    return out_path
+
+
+def load_shard(path):
+    with np.load(path) as data:
+        return data["article_id_1"], data["article_id_2"], data["count"]
+
+
+def merge_shards(shard_dir: str = SHARD_DIR, path_out: str = PATH_OUT,
+                 min_count: int = MIN_COUNT):
+    """
+    Summiert alle Shard-Dateien in shard_dir und schreibt die finale
+    Co-Purchase-CSV (MIN_COUNT wird erst auf die Summe angewendet).
+    """
+    shard_files = sorted(Path(shard_dir).glob("shard_*_of_*.npz"))
+    if not shard_files:
+        raise FileNotFoundError(f"Keine Shard-Dateien gefunden in {shard_dir}")
+
+    # Vollständigkeit prüfen: alle Shards derselben Aufteilung vorhanden?
+    num_shards = {f.stem.split("_of_")[1] for f in shard_files}
+    if len(num_shards) != 1:
+        raise ValueError(f"Shard-Dateien mit unterschiedlicher Aufteilung gefunden: {sorted(num_shards)}")
+    expected = int(num_shards.pop())
+    if len(shard_files) != expected:
+        raise ValueError(f"Es fehlen Shards: {len(shard_files)} von {expected} gefunden in {shard_dir}")
+
+    print(f"Merge von {len(shard_files)} Shards aus {shard_dir} ...")
+    id_1, id_2, counts = sum_pair_tables(load_shard(f) for f in shard_files)
+
+    df_pairs = pair_arrays_to_frame(id_1, id_2, counts, min_count=min_count)
+    os.makedirs(os.path.dirname(path_out) or ".", exist_ok=True)
+    df_pairs.to_csv(path_out, index=False)
+    print(f"Anzahl Co-Purchase-Paare (count >= {min_count}): {len(df_pairs)}")
+    print(f"Fertig! Co-Purchase-Datei gespeichert unter: {path_out}")
+    return df_pairs
+
+
+def run_parallel(workers: int, num_shards: int, shard_dir: str = SHARD_DIR, input_dir: str = SHARD_INPUT_DIR):
+    """Einmal partitionieren, alle Shards lokal mit einem Prozess-Pool zählen, danach mergen."""
+    # Alte Shards einer evtl. anderen Aufteilung entfernen
+    for f in Path(shard_dir).glob("shard_*_of_*.npz"):
+        f.unlink()
+
+    t0 = time.perf_counter()
+    partition_transactions(num_shards, input_dir)
+    t_partition = time.perf_counter() - t0
+
+    print(f"Starte {num_shards} Shards mit {workers} Prozessen ...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(map_shard, i, num_shards, shard_dir, input_dir) for i in range(num_shards)]
+        for f in futures:
+            f.result()
+    t_map = time.perf_counter() - t0 - t_partition
+
+    merge_shards(shard_dir)
+    t_total = time.perf_counter() - t0
+    print(f"Laufzeit partition: {t_partition:.1f} s | map: {t_map:.1f} s | gesamt: {t_total:.1f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-Purchase-Build parallel nach Kunden-Shards.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="map für alle Shards (Prozess-Pool) + merge")
+    p_run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_run.add_argument("--num-shards", type=int, default=None,
+                       help="Anzahl Shards (Default: = workers)")
+
+    p_partition = sub.add_parser("partition", help="Transaktionen einmal auf die Shards verteilen")
+    p_partition.add_argument("--num-shards", type=int, required=True)
+
+    p_map = sub.add_parser("map", help="einen einzelnen Shard zählen")
+    p_map.add_argument("--shard", type=int, required=True)
+    p_map.add_argument("--num-shards", type=int, required=True)
+
+    sub.add_parser("merge", help="alle Shard-Dateien zu copurchase_filtered.csv zusammenführen")
+
+    for p in (p_run, p_map, sub.choices["merge"]):
+        p.add_argument("--shard-dir", default=SHARD_DIR)
+    for p in (p_run, p_partition, p_map):
+        p.add_argument("--input-dir", default=SHARD_INPUT_DIR)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_parallel(args.workers, args.num_shards or args.workers, args.shard_dir, args.input_dir)
+    elif args.command == "partition":
+        partition_transactions(args.num_shards, args.input_dir)
+    elif args.command == "map":
+        if not 0 <= args.shard < args.num_shards:
+            sys.exit(f"--shard muss zwischen 0 und {args.num_shards - 1} liegen")
+        map_shard(args.shard, args.num_shards, args.shard_dir, args.input_dir)
+    else:
+        merge_shards(args.shard_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,42 @@
 from pathlib import Path
+import numpy as np
 import pandas as pd
-from itertools import combinations
+
+from copurchase_counting import basket_keys, count_pairs_sparse, encode_articles, pair_matrix_to_frame
+from transactions_store import TransactionStore
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_RAW = BASE_DIR / "data_raw"
 DATA_PROCESSED = BASE_DIR / "data_processed"
+TRANSACTIONS_STORE = DATA_PROCESSED / "transactions_store"   # erzeugt von scripts/ingest_transactions.py
+
+# Optional: Zeitraum einschränken (beschleunigt), z. B. "2019-06-01"; None = alles.
+# Der Filter wird auf die Row-Groups des Speichers heruntergedrückt.
+DATE_FROM = None
 
 print("Lade articles_top.csv ...")
 articles_top = pd.read_csv(DATA_PROCESSED / "articles_top.csv")
-top_ids = set(articles_top["article_id"].unique())
+top_ids = np.unique(articles_top["article_id"].astype(np.int64).to_numpy())
 print(f"Anzahl Top-Artikel: {len(top_ids)}")
 
 # Nur benötigte Spalten laden
-usecols = ["t_dat", "customer_id", "article_id"]
-print("Lade transactions_train.csv (nur benötigte Spalten) ...")
-transactions = pd.read_csv(DATA_RAW / "transactions_train.csv", usecols=usecols)
-print("Transactions:", transactions.shape)
-
-# Optional: Zeitraum einschränken (beschleunigt, kann man auskommentieren)
-# transactions["t_dat"] = pd.to_datetime(transactions["t_dat"])
-# transactions = transactions[transactions["t_dat"] >= "2019-06-01"]
-# print("Gefilterte Transactions:", transactions.shape)
+print("Lade Transaktionen aus dem Speicher (nur benötigte Spalten) ...")
+store = TransactionStore(TRANSACTIONS_STORE)
+transactions = store.read(["customer_code", "t_dat", "article_idx"], date_from=DATE_FROM)
+print("Transactions:", len(transactions["article_idx"]))
 
 # Nur Transaktionen mit unseren Top-Artikeln
-transactions = transactions[transactions["article_id"].isin(top_ids)].copy()
-print("Transactions mit Top-Artikeln:", transactions.shape)
+article_ids = store.article_ids[transactions["article_idx"]]
+article_codes, mask = encode_articles(article_ids, top_ids)
+print("Transactions mit Top-Artikeln:", int(mask.sum()))
 
-# Warenkorb-ID bilden (vereinfachte Annahme: gleicher Kunde + gleiches Datum = ein Warenkorb)
-transactions["basket_id"] = transactions["customer_id"].astype(str) + "_" + transactions["t_dat"].astype(str)
+# Warenkorb-Schlüssel bilden (vereinfachte Annahme: gleicher Kunde + gleiches Datum = ein Warenkorb)
+baskets = basket_keys(transactions["customer_code"][mask], transactions["t_dat"][mask])
 
 print("Baue Co-Purchase-Paare ...")
-pairs_counter: dict[tuple[int, int], int] = {}
-
-for _, group in transactions.groupby("basket_id")["article_id"]:
-    arts = group.unique()
-    if len(arts) < 2:
-        continue
-    # Alle Kombinationen aus dem Warenkorb
-    for a1, a2 in combinations(sorted(arts), 2):
-        key = (int(a1), int(a2))
-        pairs_counter[key] = pairs_counter.get(key, 0) + 1
-
-print(f"Anzahl verschiedener Artikel-Paare: {len(pairs_counter)}")
-
-rows = []
-for (a1, a2), count in pairs_counter.items():
-    rows.append({"article_id_1": a1, "article_id_2": a2, "count": count})
+pair_matrix = count_pairs_sparse(baskets, article_codes, len(top_ids))
+print(f"Anzahl verschiedener Artikel-Paare: {pair_matrix.nnz}")
 
-copurchase = pd.DataFrame(rows)
-copurchase.sort_values("count", ascending=False, inplace=True)
+copurchase = pair_matrix_to_frame(pair_matrix, top_ids)
 
 out_path = DATA_PROCESSED / "copurchase_top.csv"
 copurchase.to_csv(out_path, index=False)
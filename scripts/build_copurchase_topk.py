@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store)
+
+from article_features import get_macro_by_article
+from copurchase_store import WINDOW_COLUMNS, build_topk_table, write_topk_store
+
+# ---------------------------------------------------------
+# Top-K-Partnerlisten pro Artikel und Ziel-Makrokategorie
+#
+# Für jeden Artikel und jede Ziel-Makrokategorie (TOP/BOTTOM/SHOES/
+# OUTERWEAR/ACCESSORY) werden die K Partner mit den höchsten
+# Co-Purchase-Counts gespeichert. Die App liest damit direkt
+# "die K besten Hosen zu diesem Top".
+#
+# Quelle: bevorzugt der ungefilterte Zustand aus
+# scripts/build_copurchase_incremental.py (pairs.npz), damit auch
+# seltene Partner einer schwachen Kategorie nicht an MIN_COUNT scheitern;
+# sonst copurchase_filtered.csv. Vorhandene Zeitfenster-Spalten
+# (count_4w, count_3m, score_decay) werden übernommen.
+#
+#   python scripts/build_copurchase_topk.py --k 20
+#
+# Ausgabe: copurchase_topk.csv und dieselben Zeilen als Binär-Speicher
+# copurchase_topk_store/ (Layout wie copurchase_store, siehe
+# copurchase_store.py). demo9 öffnet den Speicher per memmap, damit sich
+# alle Sitzungen und Server-Prozesse die Seiten im Page-Cache teilen.
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+PATH_ARTICLES = DATA_PROCESSED / "articles_filtered.csv"
+PATH_STATE_PAIRS = DATA_PROCESSED / "copurchase_state" / "pairs.npz"
+PATH_PAIRS_CSV = DATA_PROCESSED / "copurchase_filtered.csv"
+PATH_OUT = DATA_PROCESSED / "copurchase_topk.csv"
+PATH_OUT_STORE = DATA_PROCESSED / "copurchase_topk_store"
+
+TOP_K = 20
+
+
+def load_pairs():
+    """(id_1, id_2, count, {zeitfenster: werte}) aus pairs.npz oder copurchase_filtered.csv."""
+    if PATH_STATE_PAIRS.exists():
+        print(f"Lade Paare aus {PATH_STATE_PAIRS} ...")
+        with np.load(PATH_STATE_PAIRS) as data:
+            windows = {c: data[c] for c in WINDOW_COLUMNS[1:] if c in data}
+            return data["article_id_1"], data["article_id_2"], data["count"], windows
+
+    print(f"Warnung: {PATH_STATE_PAIRS} nicht gefunden, nutze {PATH_PAIRS_CSV} (nur Paare ab MIN_COUNT).")
+    df = pd.read_csv(PATH_PAIRS_CSV, dtype={"article_id_1": np.int64, "article_id_2": np.int64, "count": np.int64})
+    windows = {c: df[c].to_numpy() for c in WINDOW_COLUMNS[1:] if c in df.columns}
+    return df["article_id_1"].to_numpy(), df["article_id_2"].to_numpy(), df["count"].to_numpy(), windows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-K-Co-Purchase-Partner pro Artikel und Ziel-Makro.")
+    parser.add_argument("--k", type=int, default=TOP_K, help="Partner pro Artikel und Ziel-Makro")
+    args = parser.parse_args()
+
+    print("Lade Artikel ...")
+    articles = pd.read_csv(PATH_ARTICLES)
+    macro_by_article = get_macro_by_article(articles)
+    print(f"Artikel mit Makrokategorie: {len(macro_by_article)}")
+
+    id_1, id_2, counts, windows = load_pairs()
+    print(f"Paare: {len(counts):,} | Zeitfenster: {', '.join(windows) or '-'}")
+
+    topk = build_topk_table(id_1, id_2, counts, macro_by_article, k=args.k, windows=windows)
+
+    os.makedirs(PATH_OUT.parent, exist_ok=True)
+    topk.to_csv(PATH_OUT, index=False, float_format="%.6g")
+    meta = write_topk_store(topk, PATH_OUT_STORE, source=PATH_OUT.name)
+    print(f"Artikel mit Partnern: {topk['article_id'].nunique():,} | Zeilen: {len(topk):,} | "
+          f"Speicher: {meta['n_partitions']} Partition(en)")
+    print(f"Fertig! Top-{args.k}-Partnerlisten gespeichert unter: {PATH_OUT} und {PATH_OUT_STORE}")
+
+
+if __name__ == "__main__":
+    main()
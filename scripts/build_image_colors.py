@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, image_store)
+
+from article_features import DOMINANT_COLORS, DOMINANT_TO_FAMILY, HIST_COLUMNS, color_histogram, prepare_color_pixels
+from image_store import image_relpath, load_manifest
+
+# ---------------------------------------------------------
+# Gemessene Bildfarbe für den ganzen Katalog
+# (gleiche Logik wie "Match my Closet" in demo9, siehe article_features.py)
+#
+#   python scripts/copy_images_sample.py      (Bilder + manifest.csv)
+#   python scripts/build_image_colors.py
+#
+# Ausgabe (data_processed/article_colors.csv), pro Artikel:
+#   checksum           Prüfsumme des Originals (aus dem Bild-Manifest)
+#   dominant_colour    Name aus DOMINANT_COLORS
+#   colour_family_measured  Farbfamilie wie in demo9 (COLOR_PALETTES)
+#   dominant_share     Anteil der dominanten Farbe in % (0-100)
+#   hist_<farbe>       gewichtetes Farbhistogramm in % (0-100), landet über
+#                      scripts/build_article_features.py auch in articles_store
+# Inkrementell: nur Bilder mit neuer Prüfsumme werden neu gemessen.
+# ---------------------------------------------------------
+SRC_IMG_ROOT = BASE_DIR / "images_sample"
+PATH_OUT = BASE_DIR / "data_processed" / "article_colors.csv"
+
+N_WORKERS = os.cpu_count() or 4
+
+
+def measure_image(article_id_str: str, src_root: str):
+    """Worker: Farbhistogramm (in %) eines Bildes oder None bei Fehler."""
+    try:
+        with Image.open(Path(src_root) / image_relpath(article_id_str)) as img:
+            img.draft("RGB", (100, 100))    # JPEG verkleinert dekodieren, danach ohnehin 50x50
+            hist = color_histogram(prepare_color_pixels(img))
+        return article_id_str, hist / max(hist.sum(), 1) * 100
+    except Exception:   # kaputte Einzelbilder sollen den Lauf nicht abbrechen
+        return article_id_str, None
+
+
+def hist_to_frame(article_ids, hists: np.ndarray) -> pd.DataFrame:
+    names = np.array(list(DOMINANT_COLORS))
+    dominant = names[hists.argmax(axis=1)] if len(hists) else np.array([], dtype=str)
+    df = pd.DataFrame(np.rint(hists).astype(np.uint8), columns=HIST_COLUMNS)
+    df.insert(0, "article_id", np.asarray(article_ids, dtype=np.int64))
+    df.insert(1, "dominant_colour", dominant)
+    df.insert(2, "colour_family_measured", [DOMINANT_TO_FAMILY.get(c, c) for c in dominant])
+    df.insert(3, "dominant_share", df[HIST_COLUMNS].max(axis=1).astype(np.uint8))
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dominante Bildfarbe für alle Katalogbilder messen.")
+    parser.add_argument("--src", type=Path, default=SRC_IMG_ROOT, help="Bildordner mit manifest.csv")
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--force", action="store_true", help="alle Bilder neu messen")
+    args = parser.parse_args()
+
+    images = load_manifest(args.src)
+    if images.empty:
+        sys.exit(f"Kein Bild-Manifest in {args.src}. Bitte zuerst scripts/copy_images_sample.py ausführen.")
+    images = images[~images["missing"]]
+
+    old = pd.DataFrame()
+    if PATH_OUT.exists() and not args.force:
+        old = pd.read_csv(PATH_OUT, dtype={"article_id": "int64", "checksum": "string"})
+        old = old[old["article_id"].isin(images.index)]
+        old = old[old["checksum"].to_numpy() == images.loc[old["article_id"], "checksum"].to_numpy()]
+    todo = images.index.difference(old["article_id"] if len(old) else [])
+    print(f"Bilder: {len(images):,} | aktuell: {len(old):,} | zu messen: {len(todo):,}")
+
+    t0 = time.perf_counter()
+    todo_str = [str(a).zfill(10) for a in todo]
+    measured_ids, hists, n_errors = [], [], 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = pool.map(measure_image, todo_str, [str(args.src)] * len(todo_str),
+                           chunksize=max(1, len(todo_str) // (args.workers * 8)))
+        for article_id_str, hist in results:
+            if hist is None:
+                n_errors += 1
+                continue
+            measured_ids.append(int(article_id_str))
+            hists.append(hist)
+
+    new = hist_to_frame(measured_ids, np.array(hists).reshape(-1, len(DOMINANT_COLORS)))
+    new.insert(1, "checksum", images.loc[new["article_id"], "checksum"].to_numpy())
+    df = pd.concat([old, new], ignore_index=True).sort_values("article_id")
+
+    os.makedirs(PATH_OUT.parent, exist_ok=True)
+    df.to_csv(PATH_OUT, index=False)
+    top_families = df["colour_family_measured"].value_counts().head(8)
+    print(f"Farbfamilien (gemessen): {', '.join(f'{name} {n}' for name, n in top_families.items())}")
+    print(f"Fertig in {time.perf_counter() - t0:.1f} s | Fehler: {n_errors} | gespeichert unter: {PATH_OUT}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store, outfit_engine)
+
+from article_features import load_article_artifact, segment_rankings
+from copurchase_store import CopurchasePartitions, load_topk
+from outfit_engine import (
+    COPURCHASE_TOP_K,
+    POOL_SIZE,
+    TOP_N,
+    WEATHER_VARIANTS,
+    empty_picks,
+    recommend_batch,
+    score_tables,
+    write_outfit_store,
+)
+
+# ---------------------------------------------------------
+# Outfit-Empfehlungen für alle Katalogartikel vorberechnen
+# (Logik und Layout siehe outfit_engine.py)
+#
+#   python scripts/build_article_features.py
+#   python scripts/build_copurchase_topk.py
+#   python scripts/build_outfit_recommendations.py --windows count count_4w
+#
+# Pro Artikel, Co-Purchase-Zeitfenster und Wetter-Variante (kein Wetter,
+# kalt/Regen/Schnee, heiß) die TOP_N Empfehlungen jeder Ziel-Makro.
+# Die Artikel werden in Blöcken auf einen Prozess-Pool verteilt; jeder
+# Worker öffnet die Speicher selbst (memmap, die Seiten teilen sich alle
+# Worker) und rechnet einen Block mit recommend_batch in einem Durchgang.
+#
+# demo9 schlägt Katalogartikel damit nur noch nach; online gerechnet wird
+# für hochgeladene Fotos und nach dem Blockieren einer Empfehlung.
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+ARTICLE_STORE_DIR = DATA_PROCESSED / "articles_store"
+COPURCHASE_TOPK_STORE_DIR = DATA_PROCESSED / "copurchase_topk_store"
+COPURCHASE_TOPK_FILE = DATA_PROCESSED / "copurchase_topk.csv"
+PATH_OUT = DATA_PROCESSED / "outfit_store"
+
+WINDOWS = ["count"]
+N_WORKERS = os.cpu_count() or 4
+CHUNK_SIZE = 5000
+
+# Daten pro Worker (_init_worker)
+_worker = {}
+
+
+def load_copurchase():
+    if (COPURCHASE_TOPK_STORE_DIR / "index.npy").exists():
+        return CopurchasePartitions(COPURCHASE_TOPK_STORE_DIR)
+    if COPURCHASE_TOPK_FILE.exists():
+        return load_topk(COPURCHASE_TOPK_FILE)
+    return None
+
+
+def _init_worker(windows: list):
+    df = load_article_artifact(ARTICLE_STORE_DIR)
+    _worker.update(
+        df=df,
+        copurchase=load_copurchase(),
+        rankings=segment_rankings(df, ["gender", "macro_category"]),
+        tables={variant: score_tables(df, condition) for variant, condition in WEATHER_VARIANTS.items()},
+        windows=windows,
+    )
+
+
+def compute_chunk(positions: np.ndarray) -> dict:
+    """Worker: {(fenster, wetter): (len(positions), n_makros, TOP_N) PICK_DTYPE}."""
+    df = _worker["df"]
+    article_ids = df["article_id"].to_numpy()[positions]
+    out = {}
+    for window in _worker["windows"]:
+        for variant, condition in WEATHER_VARIANTS.items():
+            result = recommend_batch(article_ids, df, _worker["copurchase"], _worker["rankings"],
+                                     window=window, weather_condition=condition, top_n=TOP_N,
+                                     pool_size=POOL_SIZE, copurchase_top_k=COPURCHASE_TOP_K,
+                                     tables=_worker["tables"][variant])
+            picks = empty_picks(len(positions))
+            picks["pick"] = result["positions"]
+            picks["copurchase"] = result["copurchase"]
+            out[(window, variant)] = picks
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outfit-Empfehlungen für alle Katalogartikel vorberechnen.")
+    parser.add_argument("--windows", nargs="+", default=WINDOWS,
+                        help="Co-Purchase-Zeitfenster (count, count_4w, count_3m, score_decay)")
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    if not (ARTICLE_STORE_DIR / "meta.json").exists():
+        sys.exit(f"{ARTICLE_STORE_DIR} fehlt. Bitte zuerst scripts/build_article_features.py ausführen.")
+    df = load_article_artifact(ARTICLE_STORE_DIR)
+    copurchase = load_copurchase()
+    if copurchase is None:
+        print("Warnung: keine Top-K-Partnerlisten gefunden, Empfehlungen nur aus den Segment-Pools.")
+    else:
+        columns = copurchase.meta["columns"] if isinstance(copurchase, CopurchasePartitions) else copurchase.columns
+        missing = [w for w in args.windows if w not in columns]
+        if missing:
+            sys.exit(f"Zeitfenster nicht in den Top-K-Listen: {', '.join(missing)}")
+    del copurchase
+
+    n = len(df)
+    chunks = [np.arange(lo, min(lo + args.chunk_size, n)) for lo in range(0, n, args.chunk_size)]
+    picks = {(w, v): empty_picks(len(df))
+             for w in args.windows for v in WEATHER_VARIANTS}
+    print(f"Artikel: {n:,} | Zeitfenster: {', '.join(args.windows)} | Wetter: {', '.join(WEATHER_VARIANTS)} | "
+          f"Worker: {args.workers}")
+
+    t0 = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.windows,)) as pool:
+        for positions, result in zip(chunks, pool.map(compute_chunk, chunks)):
+            for key, values in result.items():
+                picks[key][positions] = values
+            done += len(positions)
+            rate = done / max(time.perf_counter() - t0, 1e-9)
+            print(f"{done:,}/{n:,} Artikel ({rate:.0f}/s)", end="\r", flush=True)
+    print()
+
+    params = {"top_n": TOP_N, "pool_size": POOL_SIZE, "copurchase_top_k": COPURCHASE_TOP_K}
+    meta = write_outfit_store(df["article_id"].to_numpy(), picks, PATH_OUT, params)
+    filled = (picks[(args.windows[0], "none")]["pick"] >= 0).any(axis=2).sum(axis=1)
+    size_mb = sum(p.stat().st_size for p in PATH_OUT.iterdir()) / 2**20
+    print(f"Ziel-Makros mit Empfehlungen pro Artikel (Mittel): {filled.mean():.2f} | "
+          f"{len(meta['windows']) * len(meta['weather'])} Varianten, {size_mb:.1f} MB | "
+          f"{time.perf_counter() - t0:.1f} s")
+    print(f"Fertig! Gespeichert unter: {PATH_OUT}")
+
+
+if __name__ == "__main__":
+    main()
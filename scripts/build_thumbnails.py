@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from PIL import Image
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (image_store)
+
+from image_store import (
+    THUMBNAIL_FORMAT,
+    THUMBNAIL_QUALITY,
+    THUMBNAIL_SIZES,
+    image_relpath,
+    load_manifest,
+    thumbnail_relpath,
+)
+
+# ---------------------------------------------------------
+# Thumbnails für demo9 (grid / carousel / medium, siehe image_store.py)
+#
+#   python scripts/copy_images_sample.py      (Bilder + manifest.csv)
+#   python scripts/build_thumbnails.py        (-> images_thumbs/)
+#
+# Inkrementell gegen das Bild-Manifest: ein Artikel wird nur neu
+# gerechnet, wenn sich die Prüfsumme seines Originals geändert hat oder
+# die Größen/das Format in image_store.py geändert wurden. Die Bilder
+# werden in einem Prozess-Pool skaliert (Pillow ist CPU-gebunden).
+# images_thumbs/ wird danach wie die Originale in den Bucket hochgeladen
+# (z. B. Präfix thumbs/); erst dann in demo9 THUMBNAILS_BASE_URL setzen
+# (siehe get_image_url), sonst lädt die App weiter die Originale.
+# ---------------------------------------------------------
+SRC_IMG_ROOT = BASE_DIR / "images_sample"
+DST_THUMB_ROOT = BASE_DIR / "images_thumbs"
+THUMB_MANIFEST = "manifest.csv"
+
+N_WORKERS = os.cpu_count() or 4
+
+
+def thumbnail_spec() -> str:
+    """Kurzer Hash der Thumbnail-Einstellungen; ändern sie sich, wird alles neu gerechnet."""
+    spec = json.dumps([THUMBNAIL_SIZES, THUMBNAIL_FORMAT, THUMBNAIL_QUALITY], sort_keys=True)
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()[:12]
+
+
+def make_thumbnails(article_id_str: str, src_root: str, dst_root: str):
+    """Worker: alle Größen eines Artikels, vom größten zum kleinsten Thumbnail verkleinert."""
+    try:
+        with Image.open(Path(src_root) / image_relpath(article_id_str)) as img:
+            # JPEG direkt verkleinert dekodieren (1/2, 1/4, 1/8), mindestens so groß wie die größte Box
+            img.draft("RGB", max(THUMBNAIL_SIZES.values(), key=lambda box: box[0] * box[1]))
+            img = img.convert("RGB")
+            for size, box in sorted(THUMBNAIL_SIZES.items(), key=lambda kv: -kv[1][0] * kv[1][1]):
+                img.thumbnail(box, Image.LANCZOS)
+                dst = Path(dst_root) / thumbnail_relpath(article_id_str, size)
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dst.with_name(dst.name + ".tmp")
+                if THUMBNAIL_FORMAT == "webp":
+                    img.save(tmp, "WEBP", quality=THUMBNAIL_QUALITY, method=4)
+                else:
+                    img.save(tmp, "JPEG", quality=THUMBNAIL_QUALITY, optimize=True, progressive=True)
+                os.replace(tmp, dst)
+        return article_id_str, None
+    except Exception as e:   # kaputte Einzelbilder sollen den Lauf nicht abbrechen
+        return article_id_str, str(e)
+
+
+def load_thumb_manifest(dst_root: Path) -> pd.DataFrame:
+    path = dst_root / THUMB_MANIFEST
+    if not path.exists():
+        return pd.DataFrame(columns=["checksum", "spec"], index=pd.Index([], name="article_id"))
+    return pd.read_csv(path, dtype={"article_id": "int64", "checksum": "string", "spec": "string"}) \
+        .set_index("article_id")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thumbnails inkrementell erzeugen.")
+    parser.add_argument("--src", type=Path, default=SRC_IMG_ROOT, help="Bildordner mit manifest.csv")
+    parser.add_argument("--dst", type=Path, default=DST_THUMB_ROOT)
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--force", action="store_true", help="alle Thumbnails neu erzeugen")
+    args = parser.parse_args()
+
+    images = load_manifest(args.src)
+    if images.empty:
+        sys.exit(f"Kein Bild-Manifest in {args.src}. Bitte zuerst scripts/copy_images_sample.py ausführen.")
+    images = images[~images["missing"]]
+
+    spec = thumbnail_spec()
+    done = load_thumb_manifest(args.dst)
+    merged = images[["checksum"]].join(done.add_prefix("done_"), how="left")
+    up_to_date = (merged["done_checksum"] == merged["checksum"]) & (merged["done_spec"] == spec)
+    if args.force:
+        up_to_date[:] = False
+    todo = [str(a).zfill(10) for a in merged.index[~up_to_date.fillna(False).astype(bool)]]
+    print(f"Bilder: {len(images):,} | aktuell: {int(up_to_date.sum()):,} | zu erzeugen: {len(todo):,} "
+          f"({', '.join(f'{k} {w}x{h}' for k, (w, h) in THUMBNAIL_SIZES.items())}, {THUMBNAIL_FORMAT})")
+
+    t0 = time.perf_counter()
+    errors = {}
+    if todo:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = pool.map(make_thumbnails, todo, [str(args.src)] * len(todo), [str(args.dst)] * len(todo),
+                               chunksize=max(1, len(todo) // (args.workers * 8)))
+            for i, (article_id_str, error) in enumerate(results, start=1):
+                if error:
+                    errors[int(article_id_str)] = error
+                if i % 500 == 0 or i == len(todo):
+                    print(f"{i:,}/{len(todo):,} Artikel", end="\r", flush=True)
+        print()
+
+    # Manifest: nur erfolgreich erzeugte Artikel mit aktueller Prüfsumme
+    manifest = merged[["checksum"]].copy()
+    manifest["spec"] = spec
+    manifest = manifest.drop(index=list(errors))
+    args.dst.mkdir(parents=True, exist_ok=True)
+    manifest.reset_index().to_csv(args.dst / THUMB_MANIFEST, index=False)
+
+    for article_id, error in list(errors.items())[:10]:
+        print(f"Warnung: {article_id}: {error}")
+    print(f"Fertig in {time.perf_counter() - t0:.1f} s | Fehler: {len(errors)} | Thumbnails unter: {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+# ---------------------------------------------------------
+# Vektorisierte Co-Purchase-Zählung
+#
+# Idee: Pro Chunk wird eine dünnbesetzte Inzidenzmatrix X
+# (Warenkorb x Artikel, 1 = Artikel liegt im Warenkorb) gebaut.
+# Das Produkt X^T X enthält dann in Zelle (i, j), in wie vielen
+# Warenkörben die Artikel i und j gemeinsam vorkommen.
+# Wir behalten nur das obere Dreieck (i < j), das entspricht
+# exakt combinations(sorted(articles), 2) aus der alten Schleife.
+# ---------------------------------------------------------
+
+
+def encode_articles(article_ids, valid_article_ids: np.ndarray):
+    """
+    Übersetzt article_ids in dichte Integer-Codes (Position in
+    valid_article_ids, muss sortiert sein).
+
+    Gibt (codes, mask) zurück: mask markiert die Zeilen, deren Artikel
+    in valid_article_ids enthalten ist; codes gilt nur für diese Zeilen.
+    """
+    article_ids = np.asarray(article_ids, dtype=np.int64)
+    if len(valid_article_ids) == 0:
+        return np.empty(0, dtype=np.int32), np.zeros(len(article_ids), dtype=bool)
+
+    pos = np.searchsorted(valid_article_ids, article_ids)
+    pos_clipped = np.minimum(pos, len(valid_article_ids) - 1)
+    mask = valid_article_ids[pos_clipped] == article_ids
+    return pos_clipped[mask].astype(np.int32), mask
+
+
+def basket_keys(customer_codes: np.ndarray, t_dat_days: np.ndarray) -> np.ndarray:
+    """
+    Warenkorb-Schlüssel aus dem integer-kodierten Transaktions-Speicher:
+    (customer_code << 16) | t_dat als int64. Kein String-Hashing nötig.
+    """
+    return (customer_codes.astype(np.int64) << 16) | (t_dat_days.astype(np.int64) & 0xFFFF)
+
+
+def _basket_article_matrix(basket_codes: np.ndarray, article_codes: np.ndarray, n_articles: int):
+    """
+    Inzidenzmatrix X (Warenkorb x Artikel, 0/1) nur für Warenkörbe mit
+    mind. 2 verschiedenen Artikeln. Gibt (X, first_row) zurück; first_row
+    ist pro Zeile von X die erste Transaktionszeile des Warenkorbs.
+    """
+    # Warenkorb-Codes verdichten, damit X keine leeren Zeilen hat
+    baskets, first_row, basket_idx = np.unique(basket_codes, return_index=True, return_inverse=True)
+    ones = np.ones(len(basket_idx), dtype=np.int32)
+    X = sp.csr_matrix(
+        (ones, (basket_idx, article_codes)),
+        shape=(len(baskets), n_articles),
+    )
+    # Duplikate (gleicher Artikel mehrfach im Korb) auf 1 setzen
+    X.sum_duplicates()
+    X.data[:] = 1
+
+    # Nur Warenkörbe mit mind. 2 verschiedenen Artikeln erzeugen Paare
+    keep = np.diff(X.indptr) >= 2
+    return X[keep], first_row[keep]
+
+
+def count_pairs_sparse(basket_codes: np.ndarray, article_codes: np.ndarray,
+                       n_articles: int) -> sp.csr_matrix:
+    """
+    Zählt alle Artikelpaare pro Warenkorb als dünnbesetzte Matrix.
+
+    Ergebnis: CSR-Matrix (n_articles x n_articles), nur oberes Dreieck
+    (Zeile < Spalte), Wert = Anzahl Warenkörbe mit beiden Artikeln.
+    Mehrfachkäufe desselben Artikels im selben Warenkorb zählen einmal
+    (wie groupby(...).unique() im alten Code).
+
+    basket_codes muss nicht dicht sein (z. B. Schlüssel aus basket_keys).
+    """
+    if len(basket_codes) == 0:
+        return sp.csr_matrix((n_articles, n_articles), dtype=np.int32)
+
+    X, _ = _basket_article_matrix(basket_codes, article_codes, n_articles)
+    if X.shape[0] == 0:
+        return sp.csr_matrix((n_articles, n_articles), dtype=np.int32)
+
+    co = (X.T @ X).tocsr()
+    return sp.triu(co, k=1, format="csr")
+
+
+def count_pairs_weighted(basket_codes: np.ndarray, article_codes: np.ndarray,
+                         n_articles: int, row_weights: dict) -> dict:
+    """
+    Wie count_pairs_sparse, aber für mehrere Gewichtungen in einem Durchgang:
+    pro Eintrag in row_weights wird X^T diag(w) X berechnet (oberes Dreieck).
+
+    row_weights: {name: Gewicht pro Transaktionszeile oder None (= 1)}.
+    Das Gewicht muss innerhalb eines Warenkorbs gleich sein (z. B. eine
+    Funktion von t_dat). Warenkörbe mit Gewicht 0 werden übersprungen.
+    """
+    empty = {
+        name: sp.csr_matrix((n_articles, n_articles),
+                            dtype=np.float64 if w is not None and w.dtype.kind == "f" else np.int32)
+        for name, w in row_weights.items()
+    }
+    if len(basket_codes) == 0:
+        return empty
+
+    X, first_row = _basket_article_matrix(basket_codes, article_codes, n_articles)
+    if X.shape[0] == 0:
+        return empty
+
+    result = {}
+    for name, w in row_weights.items():
+        if w is None:
+            Xw, XtD = X, X.T
+        else:
+            basket_w = w[first_row]
+            nz = basket_w != 0
+            Xw = X[nz]
+            XtD = Xw.T @ sp.diags(basket_w[nz], dtype=basket_w.dtype)
+        result[name] = sp.triu((XtD @ Xw).tocsr(), k=1, format="csr")
+    return result
+
+
+def pair_matrix_to_frame(pair_matrix: sp.spmatrix, article_ids: np.ndarray,
+                         min_count: int = 1) -> pd.DataFrame:
+    """
+    Wandelt die Paar-Matrix in das bekannte CSV-Format um:
+    article_id_1, article_id_2, count (absteigend nach count sortiert).
+    """
+    id_1, id_2, counts = pair_matrix_to_arrays(pair_matrix, article_ids)
+    return pair_arrays_to_frame(id_1, id_2, counts, min_count=min_count)
+
+
+# ---------------------------------------------------------
+# Paar-Tabellen (article_id_1, article_id_2, count) als Arrays,
+# z. B. für Shard-Dateien. Ein Paar wird dafür in einen uint64-
+# Schlüssel gepackt: (article_id_1 << 32) | article_id_2.
+# ---------------------------------------------------------
+
+
+def pack_pairs(id_1: np.ndarray, id_2: np.ndarray) -> np.ndarray:
+    return (id_1.astype(np.uint64) << np.uint64(32)) | id_2.astype(np.uint64)
+
+
+def unpack_pairs(keys: np.ndarray):
+    id_1 = (keys >> np.uint64(32)).astype(np.int64)
+    id_2 = (keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+    return id_1, id_2
+
+
+def pair_matrix_to_arrays(pair_matrix: sp.spmatrix, article_ids: np.ndarray):
+    """Paar-Matrix -> (article_id_1, article_id_2, count) als Arrays (ohne Filter)."""
+    coo = pair_matrix.tocoo()
+    return article_ids[coo.row], article_ids[coo.col], coo.data.astype(np.int64)
+
+
+def sum_pair_tables(tables) -> tuple:
+    """
+    Summiert mehrere Paar-Tabellen [(id_1, id_2, count), ...] auf.
+    Gibt (id_1, id_2, count) mit eindeutigen Paaren zurück.
+    """
+    tables = list(tables)
+    if not tables:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    keys = np.concatenate([pack_pairs(t[0], t[1]) for t in tables])
+    counts = np.concatenate([np.asarray(t[2], dtype=np.int64) for t in tables])
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    summed = np.bincount(inverse, weights=counts, minlength=len(unique_keys)).astype(np.int64)
+    id_1, id_2 = unpack_pairs(unique_keys)
+    return id_1, id_2, summed
+
+
+def pair_matrices_to_columns(matrices: dict, article_ids: np.ndarray):
+    """
+    Mehrere Paar-Matrizen (z. B. aus count_pairs_weighted) auf eine
+    gemeinsame Paarliste bringen. Gibt (id_1, id_2, {name: werte}) zurück;
+    fehlt ein Paar in einer Matrix, ist der Wert dort 0.
+    """
+    parts = {}
+    for name, matrix in matrices.items():
+        coo = matrix.tocoo()
+        parts[name] = (pack_pairs(article_ids[coo.row], article_ids[coo.col]), coo.data)
+
+    all_keys = np.unique(np.concatenate([k for k, _ in parts.values()])) if parts else np.empty(0, np.uint64)
+    columns = {}
+    for name, (keys, values) in parts.items():
+        col = np.zeros(len(all_keys), dtype=np.int64 if values.dtype.kind in "iub" else np.float64)
+        col[np.searchsorted(all_keys, keys)] = values
+        columns[name] = col
+    id_1, id_2 = unpack_pairs(all_keys)
+    return id_1, id_2, columns
+
+
+def sum_pair_columns(tables) -> tuple:
+    """
+    Wie sum_pair_tables, aber für mehrere Wertspalten:
+    tables = [(id_1, id_2, {name: werte}), ...]. Spalten, die in einer
+    Tabelle fehlen, zählen dort als 0. Gibt (id_1, id_2, {name: summe}) zurück.
+    """
+    tables = list(tables)
+    keys = [pack_pairs(t[0], t[1]) for t in tables]
+    all_keys = np.unique(np.concatenate(keys)) if keys else np.empty(0, dtype=np.uint64)
+
+    columns = {}
+    for table_keys, (_, _, table_columns) in zip(keys, tables):
+        pos = np.searchsorted(all_keys, table_keys)
+        for name, values in table_columns.items():
+            values = np.asarray(values)
+            if name not in columns:
+                dtype = np.float64 if values.dtype.kind == "f" else np.int64
+                columns[name] = np.zeros(len(all_keys), dtype=dtype)
+            # Schlüssel sind pro Tabelle eindeutig -> einfache Addition reicht
+            columns[name][pos] += values
+    id_1, id_2 = unpack_pairs(all_keys)
+    return id_1, id_2, columns
+
+
+def pair_arrays_to_frame(id_1: np.ndarray, id_2: np.ndarray, counts: np.ndarray,
+                         min_count: int = 1, extra_columns: dict = None) -> pd.DataFrame:
+    """
+    Wie pair_matrix_to_frame, aber für bereits aufgelöste Paar-Arrays.
+    extra_columns (z. B. Zeitfenster) werden hinter count angehängt.
+    """
+    keep = counts >= min_count
+    df_pairs = pd.DataFrame({
+        "article_id_1": id_1[keep],
+        "article_id_2": id_2[keep],
+        "count": counts[keep],
+    })
+    for name, values in (extra_columns or {}).items():
+        df_pairs[name] = values[keep]
+    df_pairs = df_pairs.sort_values(
+        ["count", "article_id_1", "article_id_2"],
+        ascending=[False, True, True],
+    ).reset_index(drop=True)
+    return df_pairs
+
+
+# ---------------------------------------------------------
+# Speicherbegrenzte Zählung mit Auslagerung auf die Platte
+#
+# Statt alle Paare im RAM zu halten, sammelt SpillingPairCounter
+# gepackte uint64-Paarschlüssel + Counts bis zu einem Speicherbudget.
+# Ist das Budget erreicht, wird der Puffer verdichtet (gleiche Schlüssel
+# aufsummiert) und als sortierter "Run" (keys.npy + counts.npy) auf die
+# Platte geschrieben. Am Ende führt merge_sorted_runs alle Runs per
+# k-Wege-Merge blockweise zusammen, ohne einen Run komplett zu laden.
+# ---------------------------------------------------------
+PAIR_ENTRY_BYTES = 12   # uint64-Schlüssel + uint32-Count
+
+
+def compact_pairs(keys: np.ndarray, counts: np.ndarray):
+    """Gleiche Schlüssel aufsummieren; Ergebnis ist nach Schlüssel sortiert."""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    summed = np.bincount(inverse, weights=counts, minlength=len(unique_keys))
+    return unique_keys, summed.astype(np.uint32)
+
+
+def merge_sorted_runs(runs, block_size: int = 1_000_000):
+    """
+    k-Wege-Merge sortierter Runs [(keys, counts), ...] (Arrays oder memmaps,
+    Schlüssel innerhalb eines Runs eindeutig). Liefert Blöcke
+    (keys, counts) in aufsteigender Schlüsselreihenfolge, jeder Schlüssel
+    kommt genau einmal vor.
+
+    Pro Runde wird aus jedem Run ein Block gelesen. Grenze ist der kleinste
+    letzte Schlüssel aller Blöcke, deren Run danach noch weitergeht: bis
+    dorthin liegen alle Vorkommen eines Schlüssels sicher in den gelesenen
+    Blöcken und können vektorisiert aufsummiert werden.
+    """
+    runs = [(k, c) for k, c in runs if len(k) > 0]
+    positions = [0] * len(runs)
+
+    while True:
+        active = [i for i, (keys, _) in enumerate(runs) if positions[i] < len(keys)]
+        if not active:
+            return
+
+        blocks = {}
+        cutoff = None
+        for i in active:
+            keys, counts = runs[i]
+            stop = min(positions[i] + block_size, len(keys))
+            block_keys = np.asarray(keys[positions[i]:stop])
+            blocks[i] = (block_keys, np.asarray(counts[positions[i]:stop]))
+            if stop < len(keys) and (cutoff is None or block_keys[-1] < cutoff):
+                cutoff = block_keys[-1]
+
+        out_keys, out_counts = [], []
+        for i, (block_keys, block_counts) in blocks.items():
+            n_take = len(block_keys) if cutoff is None else int(np.searchsorted(block_keys, cutoff, side="right"))
+            out_keys.append(block_keys[:n_take])
+            out_counts.append(block_counts[:n_take].astype(np.int64))
+            positions[i] += n_take
+
+        keys = np.concatenate(out_keys)
+        counts = np.concatenate(out_counts)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        yield unique_keys, np.bincount(inverse, weights=counts, minlength=len(unique_keys)).astype(np.int64)
+
+
+class SpillingPairCounter:
+    """
+    Zählt Paarschlüssel innerhalb eines Speicherbudgets.
+
+    Beispiel:
+        counter = SpillingPairCounter(budget_bytes=512 * 2**20, spill_dir="data_processed/copurchase_spill")
+        for chunk in ...:
+            counter.add(keys, counts)
+        for keys, counts in counter.merged_blocks():
+            ...
+        counter.cleanup()
+    """
+
+    def __init__(self, budget_bytes: int, spill_dir):
+        self.budget_bytes = int(budget_bytes)
+        self.spill_dir = Path(spill_dir)
+        self.run_paths = []
+        self._pending = []          # noch nicht verdichtete (keys, counts) der Chunks
+        self._pending_bytes = 0
+        self._keys = np.empty(0, dtype=np.uint64)      # verdichteter Puffer
+        self._counts = np.empty(0, dtype=np.uint32)
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._pending_bytes + len(self._keys) * PAIR_ENTRY_BYTES
+
+    def add(self, keys: np.ndarray, counts: np.ndarray):
+        if len(keys) == 0:
+            return
+        self._pending.append((keys.astype(np.uint64, copy=False), counts.astype(np.uint32, copy=False)))
+        self._pending_bytes += len(keys) * PAIR_ENTRY_BYTES
+        # Verdichten kostet kurzzeitig ein Mehrfaches des Puffers,
+        # deshalb schon bei der Hälfte des Budgets.
+        if self.buffered_bytes >= self.budget_bytes // 2:
+            self._compact()
+            if len(self._keys) * PAIR_ENTRY_BYTES >= self.budget_bytes // 4:
+                self._spill()
+
+    def _compact(self):
+        if not self._pending:
+            return
+        keys = np.concatenate([self._keys] + [k for k, _ in self._pending])
+        counts = np.concatenate([self._counts] + [c for _, c in self._pending])
+        self._pending, self._pending_bytes = [], 0
+        self._keys, self._counts = compact_pairs(keys, counts)
+
+    def _spill(self):
+        """Verdichteten Puffer als sortierten Run auf die Platte schreiben."""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        run_path = self.spill_dir / f"run_{len(self.run_paths):05d}"
+        np.save(f"{run_path}_keys.npy", self._keys)
+        np.save(f"{run_path}_counts.npy", self._counts)
+        self.run_paths.append(run_path)
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._counts = np.empty(0, dtype=np.uint32)
+
+    def merged_blocks(self, block_size: int = None):
+        """
+        Alle Runs + Rest im RAM zusammenführen. Liefert sortierte Blöcke
+        (keys, counts) mit eindeutigen Schlüsseln.
+        """
+        self._compact()
+        if block_size is None:
+            # Pro Run ein Block; zusammen etwa ein Viertel des Budgets
+            n_runs = len(self.run_paths) + 1
+            block_size = max(10_000, self.budget_bytes // (4 * PAIR_ENTRY_BYTES * n_runs))
+
+        runs = [
+            (np.load(f"{p}_keys.npy", mmap_mode="r"), np.load(f"{p}_counts.npy", mmap_mode="r"))
+            for p in self.run_paths
+        ]
+        runs.append((self._keys, self._counts))
+        yield from merge_sorted_runs(runs, block_size)
+
+    def cleanup(self):
+        for p in self.run_paths:
+            for suffix in ("_keys.npy", "_counts.npy"):
+                Path(f"{p}{suffix}").unlink(missing_ok=True)
+        self.run_paths = []
+        if self.spill_dir.exists() and not any(self.spill_dir.iterdir()):
+            self.spill_dir.rmdir()
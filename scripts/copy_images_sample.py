@@ -1,59 +1,197 @@
+import argparse
+import hashlib
 import os
 import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-# ---------------------------------------------------------
-# Pfade an dein Projekt anpassen (falls nötig)
-# ---------------------------------------------------------
-PATH_ARTICLES = "data_processed/articles_filtered.csv"
-SRC_IMG_ROOT = "data_raw/images"      # Original-H&M-Bilder
-DST_IMG_ROOT = "images_sample"        # Zielordner für das Sample
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (image_store)
+
+from image_store import MANIFEST_COLUMNS, MANIFEST_NAME, image_relpath, load_manifest
 
 # ---------------------------------------------------------
-# 1. Artikel einlesen
+# Bilder-Sample synchronisieren (data_raw/images -> images_sample)
+#
+#   python scripts/copy_images_sample.py                  (kopieren)
+#   python scripts/copy_images_sample.py --mode hardlink  (gleiches Dateisystem)
+#   python scripts/copy_images_sample.py --mode reflink   (Btrfs/XFS: Copy-on-Write-Klon)
+#
+# - Quellordner werden pro Unterordner (010/, 011/, ...) einmal per
+#   os.scandir gelesen statt zweimal os.path.exists pro Artikel.
+# - Schreibt images_sample/manifest.csv (siehe image_store.py) mit
+#   Größe, mtime und SHA-1 der Quelle sowie missing für Artikel ohne Bild.
+# - Beim nächsten Lauf werden nur neue oder geänderte Bilder (Größe oder
+#   mtime anders als im Manifest) übertragen; --verify prüft zusätzlich,
+#   ob die Zieldateien noch da sind.
+# - Kopieren/Verlinken und Prüfsummen laufen in einem Thread-Pool.
+# - hardlink/reflink fallen pro Datei auf normales Kopieren zurück, wenn
+#   das Dateisystem es nicht kann.
 # ---------------------------------------------------------
-print(f"Lese Artikel aus: {PATH_ARTICLES}")
-df = pd.read_csv(PATH_ARTICLES, usecols=["article_id"])
+PATH_ARTICLES = BASE_DIR / "data_processed" / "articles_filtered.csv"
+SRC_IMG_ROOT = BASE_DIR / "data_raw" / "images"      # Original-H&M-Bilder
+DST_IMG_ROOT = BASE_DIR / "images_sample"            # Zielordner für das Sample
 
-# article_id -> 10-stellige Zeichenkette
-df["article_id_str"] = df["article_id"].astype(str).str.zfill(10)
-article_ids = df["article_id_str"].unique()
+N_WORKERS = 16
+FICLONE = 0x40049409    # Linux ioctl: Datei als Copy-on-Write-Klon anlegen
 
-print(f"Anzahl distinct article_id in Filter-Datei: {len(article_ids)}")
 
-# ---------------------------------------------------------
-# 2. Bilder kopieren
-#    Struktur: data_raw/images/010/0101234567.jpg
-#              -> images_sample/010/0101234567.jpg
-# ---------------------------------------------------------
-copied = 0
-missing = 0
-already_existing = 0
+def scan_folder(folder: Path) -> dict:
+    """Dateiname -> (size, mtime_ns) für alle Dateien eines Unterordners."""
+    try:
+        with os.scandir(folder) as entries:
+            return {
+                e.name: (st.st_size, st.st_mtime_ns)
+                for e in entries if e.is_file()
+                for st in [e.stat()]
+            }
+    except FileNotFoundError:
+        return {}
+
 
-for art_id_str in article_ids:
-    folder = art_id_str[:3]
-    filename = f"{art_id_str}.jpg"
+def file_sha1(path: Path) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
 
-    src_path = os.path.join(SRC_IMG_ROOT, folder, filename)
-    dst_folder = os.path.join(DST_IMG_ROOT, folder)
-    dst_path = os.path.join(dst_folder, filename)
 
-    # Zielordner anlegen
-    os.makedirs(dst_folder, exist_ok=True)
+def reflink(src: Path, dst: Path):
+    import fcntl
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+    shutil.copystat(src, dst)
 
-    if os.path.exists(src_path):
-        if not os.path.exists(dst_path):
-            shutil.copy2(src_path, dst_path)
-            copied += 1
+
+def place_file(src: Path, dst: Path, mode: str) -> str:
+    """Legt dst als Kopie/Hardlink/Reflink von src an (atomar über .tmp); gibt den genutzten Modus zurück."""
+    tmp = dst.with_name(dst.name + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+    used = mode
+    try:
+        if mode == "hardlink":
+            os.link(src, tmp)
+        elif mode == "reflink":
+            reflink(src, tmp)
         else:
-            already_existing += 1
-    else:
-        print(f"Warnung: Bild nicht gefunden für article_id {art_id_str}: {src_path}")
-        missing += 1
-
-print("-----------------------------------------------------")
-print(f"Fertig.")
-print(f"Neu kopierte Bilder:        {copied}")
-print(f"Bereits vorhandene Bilder:  {already_existing}")
-print(f"Fehlende Bilder:            {missing}")
-print(f"Zielverzeichnis:            {DST_IMG_ROOT}")
+            shutil.copy2(src, tmp)
+    except (OSError, ImportError):
+        if mode == "copy":
+            raise
+        if tmp.exists():
+            tmp.unlink()
+        shutil.copy2(src, tmp)
+        used = "copy"
+    os.replace(tmp, dst)
+    return used
+
+
+def sync_images(article_ids_str, src_root: Path, dst_root: Path, mode: str = "copy",
+                workers: int = N_WORKERS, verify: bool = False) -> pd.DataFrame:
+    old = load_manifest(dst_root)
+
+    # 1) Quellordner scannen (ein scandir pro Unterordner)
+    folders = sorted({a[:3] for a in article_ids_str})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        listings = dict(zip(folders, pool.map(lambda f: scan_folder(src_root / f), folders)))
+
+    df = pd.DataFrame({"article_id_str": article_ids_str})
+    df["article_id"] = df["article_id_str"].astype(np.int64)
+    stats = [listings[a[:3]].get(f"{a}.jpg") for a in article_ids_str]
+    df["missing"] = [s is None for s in stats]
+    df["size"] = [s[0] if s else -1 for s in stats]
+    df["mtime_ns"] = [s[1] if s else -1 for s in stats]
+
+    # 2) Was ist neu oder geändert?
+    df = df.merge(old[["size", "mtime_ns", "checksum", "missing"]].add_prefix("old_"),
+                  left_on="article_id", right_index=True, how="left")
+    unchanged = (
+        ~df["missing"]
+        & df["old_missing"].eq(False)    # neue Artikel: NaN
+        & (df["old_size"] == df["size"])
+        & (df["old_mtime_ns"] == df["mtime_ns"])
+    )
+    if verify:
+        def dst_ok(row):
+            try:
+                return (dst_root / image_relpath(row.article_id_str)).stat().st_size == row.size
+            except FileNotFoundError:
+                return False
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            checked = list(pool.map(dst_ok, df[unchanged].itertuples()))
+        unchanged.loc[unchanged] = checked
+
+    todo = df[~df["missing"] & ~unchanged]
+    for folder in sorted({a[:3] for a in todo["article_id_str"]}):
+        (dst_root / folder).mkdir(parents=True, exist_ok=True)
+
+    # 3) Übertragen + Prüfsummen
+    def sync_one(article_id_str: str):
+        rel = image_relpath(article_id_str)
+        used = place_file(src_root / rel, dst_root / rel, mode)
+        return used, file_sha1(src_root / rel)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(sync_one, todo["article_id_str"]))
+
+    df["checksum"] = df["old_checksum"].where(unchanged, None)
+    df.loc[todo.index, "checksum"] = [checksum for _, checksum in results]
+    df["status"] = np.select(
+        [df["missing"], unchanged, df["old_size"].isna()],
+        ["fehlt", "unverändert", "neu"],
+        default="geändert",
+    )
+    df["fallback"] = False
+    df.loc[todo.index, "fallback"] = [used != mode for used, _ in results]
+    return df
+
+
+def write_manifest(df: pd.DataFrame, dst_root: Path):
+    dst_root.mkdir(parents=True, exist_ok=True)
+    path = dst_root / MANIFEST_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    df[MANIFEST_COLUMNS].sort_values("article_id").to_csv(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bilder-Sample inkrementell synchronisieren (mit Manifest).")
+    parser.add_argument("--src", type=Path, default=SRC_IMG_ROOT)
+    parser.add_argument("--dst", type=Path, default=DST_IMG_ROOT)
+    parser.add_argument("--mode", choices=["copy", "hardlink", "reflink"], default="copy")
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    parser.add_argument("--verify", action="store_true", help="Zieldateien unveränderter Bilder prüfen")
+    args = parser.parse_args()
+
+    print(f"Lese Artikel aus: {PATH_ARTICLES}")
+    df_articles = pd.read_csv(PATH_ARTICLES, usecols=["article_id"])
+    article_ids = df_articles["article_id"].astype(str).str.zfill(10).unique()
+    print(f"Anzahl distinct article_id in Filter-Datei: {len(article_ids)}")
+
+    t0 = time.perf_counter()
+    df = sync_images(list(article_ids), args.src, args.dst, args.mode, args.workers, args.verify)
+    path_manifest = write_manifest(df, args.dst)
+
+    counts = df["status"].value_counts()
+    print("-----------------------------------------------------")
+    print(f"Fertig in {time.perf_counter() - t0:.1f} s ({args.mode}, {args.workers} Threads).")
+    print(f"Neue Bilder:                {counts.get('neu', 0)}")
+    print(f"Geänderte Bilder:           {counts.get('geändert', 0)}")
+    print(f"Unveränderte Bilder:        {counts.get('unverändert', 0)}")
+    print(f"Fehlende Bilder:            {counts.get('fehlt', 0)}")
+    if df["fallback"].any():
+        print(f"Davon kopiert statt {args.mode}: {int(df['fallback'].sum())}")
+    print(f"Zielverzeichnis:            {args.dst}")
+    print(f"Manifest:                   {path_manifest}")
+
+
+if __name__ == "__main__":
+    main()
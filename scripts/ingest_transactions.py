@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from transactions_store import EPOCH, STORE_COLUMNS, day_to_date
+
+# ---------------------------------------------------------
+# Einmaliger Ingest: transactions_train.csv -> spaltenbasierter Speicher
+# (siehe scripts/transactions_store.py für das Layout)
+#
+# Danach muss kein Skript mehr die mehrere GB große CSV parsen oder
+# 64-stellige customer_id-Strings hashen.
+#
+# Neue Transaktionen (z. B. nächtlicher Export) können mit
+#   python scripts/ingest_transactions.py --append data_raw/transactions_new.csv
+# hinten angehängt werden, ohne die Historie neu einzulesen.
+# ---------------------------------------------------------
+PATH_TRANSACTIONS = "data_raw/transactions_train.csv"
+PATH_ARTICLES_RAW = "data_raw/articles.csv"
+STORE_DIR = "data_processed/transactions_store"
+
+# Zeilen pro Row-Group (= Chunk beim Einlesen). Pro Row-Group wird
+# min/max von t_dat gespeichert, damit Datumsfilter ganze Row-Groups
+# überspringen können.
+ROW_GROUP_SIZE = 1_000_000
+
+
+def load_article_dictionary(path_articles: str) -> pd.Index:
+    """
+    Startwert für das Artikel-Dictionary: alle article_id aus articles.csv
+    (sortiert). Dadurch ist article_idx stabil, solange sich der Katalog
+    nicht ändert.
+    """
+    if not os.path.exists(path_articles):
+        print(f"Warnung: {path_articles} nicht gefunden, Artikel-Dictionary startet leer.")
+        return pd.Index(np.empty(0, dtype=np.int64))
+    ids = pd.read_csv(path_articles, usecols=["article_id"])["article_id"].astype(np.int64)
+    return pd.Index(np.unique(ids.to_numpy()))
+
+
+def encode_with_dictionary(values: np.ndarray, dictionary: pd.Index):
+    """
+    Kodiert values über ein wachsendes Dictionary (pd.Index).
+    Unbekannte Werte werden hinten angehängt.
+    Gibt (codes, neues_dictionary) zurück.
+    """
+    uniques = pd.unique(values)
+    missing = uniques[dictionary.get_indexer(uniques) == -1]
+    if len(missing) > 0:
+        dictionary = dictionary.append(pd.Index(missing))
+    return dictionary.get_indexer(values), dictionary
+
+
+def encode_dates(t_dat: pd.Series) -> np.ndarray:
+    """'YYYY-MM-DD' -> int16 Tage seit 1970-01-01 (nur einmal pro Datum geparst)."""
+    codes, uniques = pd.factorize(t_dat)
+    days = (pd.to_datetime(uniques, format="%Y-%m-%d").values.astype("datetime64[D]") - EPOCH).astype(np.int64)
+    return days[codes].astype(np.int16)
+
+
+def open_existing_store(store_dir: str):
+    """
+    Lädt Meta-Daten und Dictionaries eines vorhandenen Speichers für
+    den Append-Modus. Spaltendateien werden auf die in meta.json
+    vermerkte Zeilenanzahl gekürzt (Reste eines abgebrochenen Laufs).
+    """
+    meta_path = os.path.join(store_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(
+            f"Kein Transaktions-Speicher unter {store_dir} gefunden – "
+            f"erst ohne --append einen vollständigen Ingest ausführen."
+        )
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    for c, dtype in STORE_COLUMNS.items():
+        with open(os.path.join(store_dir, f"{c}.bin"), "r+b") as f:
+            f.truncate(meta["n_rows"] * np.dtype(dtype).itemsize)
+
+    article_dict = pd.Index(np.load(os.path.join(store_dir, "article_ids.npy")))
+    customer_dict = pd.Index(np.load(os.path.join(store_dir, "customer_ids.npy")).astype(str).astype(object))
+    return meta, article_dict, customer_dict
+
+
+def ingest(path_transactions: str, store_dir: str = STORE_DIR, append: bool = False):
+    """
+    Liest path_transactions in Row-Groups und schreibt/erweitert den
+    Speicher in store_dir. meta.json wird erst ganz am Ende geschrieben,
+    d. h. ein abgebrochener Lauf hinterlässt nie einen halben Speicher.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    meta_path = os.path.join(store_dir, "meta.json")
+
+    if append:
+        meta, article_dict, customer_dict = open_existing_store(store_dir)
+        row_groups = meta["row_groups"]
+        n_rows = meta["n_rows"]
+        sources = meta.get("sources", [])
+        file_mode = "ab"
+    else:
+        # Alten Speicher ungültig machen, bis der neue komplett geschrieben ist
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+        article_dict = load_article_dictionary(PATH_ARTICLES_RAW)
+        customer_dict = pd.Index(np.empty(0, dtype=object))
+        row_groups = []
+        n_rows = 0
+        sources = []
+        file_mode = "wb"
+    rows_before = n_rows
+
+    files = {c: open(os.path.join(store_dir, f"{c}.bin"), file_mode) for c in STORE_COLUMNS}
+
+    print(f"Lese {path_transactions} in Row-Groups à {ROW_GROUP_SIZE:,} Zeilen ...")
+    reader = pd.read_csv(
+        path_transactions,
+        dtype={"customer_id": str, "t_dat": str, "article_id": np.int64,
+               "price": np.float32, "sales_channel_id": np.int8},
+        chunksize=ROW_GROUP_SIZE,
+    )
+
+    try:
+        for i, chunk in enumerate(reader, start=1):
+            customer_codes, customer_dict = encode_with_dictionary(
+                chunk["customer_id"].to_numpy(), customer_dict
+            )
+            article_idx, article_dict = encode_with_dictionary(
+                chunk["article_id"].to_numpy(), article_dict
+            )
+            t_dat = encode_dates(chunk["t_dat"])
+
+            columns = {
+                "customer_code": customer_codes.astype(np.uint32),
+                "t_dat": t_dat,
+                "article_idx": article_idx.astype(np.int32),
+                "price": chunk["price"].to_numpy(dtype=np.float32),
+                "sales_channel_id": chunk["sales_channel_id"].to_numpy(dtype=np.int8),
+            }
+            for c, arr in columns.items():
+                arr.astype(STORE_COLUMNS[c], copy=False).tofile(files[c])
+
+            row_groups.append({
+                "start": n_rows,
+                "stop": n_rows + len(chunk),
+                "t_dat_min": int(t_dat.min()),
+                "t_dat_max": int(t_dat.max()),
+            })
+            n_rows += len(chunk)
+
+            print(
+                f"Row-Group {i}: {len(chunk):,} Zeilen "
+                f"({day_to_date(t_dat.min())} .. {day_to_date(t_dat.max())}), "
+                f"gesamt {n_rows:,}",
+                end="\r", file=sys.stdout, flush=True,
+            )
+    finally:
+        for f in files.values():
+            f.close()
+    print()
+
+    # Dictionaries speichern
+    np.save(os.path.join(store_dir, "article_ids.npy"), article_dict.to_numpy(dtype=np.int64))
+    np.save(os.path.join(store_dir, "customer_ids.npy"), customer_dict.to_numpy().astype("S64"))
+
+    meta = {
+        "n_rows": n_rows,
+        "columns": STORE_COLUMNS,
+        "row_group_size": ROW_GROUP_SIZE,
+        "row_groups": row_groups,
+        "n_customers": len(customer_dict),
+        "n_articles": len(article_dict),
+        "t_dat_epoch": str(EPOCH),
+        "t_dat_max": max((rg["t_dat_max"] for rg in row_groups), default=None),
+        "sources": sources + [path_transactions],
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"Fertig! {n_rows - rows_before:,} Transaktionen gespeichert unter: {store_dir} "
+          f"(gesamt {n_rows:,})")
+    print(f"Kunden: {len(customer_dict):,} | Artikel im Dictionary: {len(article_dict):,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaktionen in den spaltenbasierten Speicher übernehmen.")
+    parser.add_argument("--append", metavar="CSV", default=None,
+                        help="neue Transaktionen an einen vorhandenen Speicher anhängen")
+    args = parser.parse_args()
+
+    if args.append:
+        ingest(args.append, append=True)
+    else:
+        ingest(PATH_TRANSACTIONS)
+
+
+if __name__ == "__main__":
+    main()
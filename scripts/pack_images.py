@@ -0,0 +1,57 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (image_store)
+
+from image_store import THUMBNAIL_FORMAT, THUMBNAIL_SIZES, thumbnail_relpath, write_image_pack
+
+# ---------------------------------------------------------
+# Thumbnails -> wenige Blob-Dateien mit Offset-Index (images_packed/)
+# (Layout siehe image_store.py)
+#
+#   python scripts/build_thumbnails.py
+#   python scripts/pack_images.py --max-blob-mb 40
+#
+# demo9 liest die Bilder daraus per mmap, wenn kein Bild-Host
+# konfiguriert ist (IMAGES_BASE_URL leer), z. B. offline:
+#   IMAGES_BASE_URL= streamlit run demo9.py
+# ---------------------------------------------------------
+SRC_THUMB_ROOT = BASE_DIR / "images_thumbs"
+DST_PACK_ROOT = BASE_DIR / "images_packed"
+
+# GitHub lehnt Dateien > 100 MB ab und warnt ab 50 MB
+MAX_BLOB_MB = 40
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thumbnails in Blob-Dateien packen.")
+    parser.add_argument("--src", type=Path, default=SRC_THUMB_ROOT)
+    parser.add_argument("--dst", type=Path, default=DST_PACK_ROOT)
+    parser.add_argument("--sizes", nargs="+", choices=list(THUMBNAIL_SIZES), default=list(THUMBNAIL_SIZES))
+    parser.add_argument("--max-blob-mb", type=float, default=MAX_BLOB_MB)
+    args = parser.parse_args()
+
+    path_manifest = args.src / "manifest.csv"
+    if not path_manifest.exists():
+        sys.exit(f"Kein Thumbnail-Manifest in {args.src}. Bitte zuerst scripts/build_thumbnails.py ausführen.")
+    article_ids = pd.read_csv(path_manifest, usecols=["article_id"])["article_id"].astype("int64").tolist()
+    print(f"Thumbnails laut Manifest: {len(article_ids):,}")
+
+    for size in args.sizes:
+        t0 = time.perf_counter()
+        paths = [args.src / thumbnail_relpath(str(a).zfill(10), size) for a in article_ids]
+        meta = write_image_pack(article_ids, paths, args.dst / size, args.max_blob_mb, THUMBNAIL_FORMAT)
+        total = sum(p.stat().st_size for p in (args.dst / size).glob("blob_*.bin"))
+        print(f"{size:>9}: {meta['n_images']:,} Bilder in {meta['n_blobs']} Blob(s), "
+              f"{total / 2**20:.1f} MB, {time.perf_counter() - t0:.1f} s")
+
+    print(f"Fertig! Gepackte Bilder gespeichert unter: {args.dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Näherungsweise Paar-Zählung mit festem Speicher
+#
+# CountMinSketch:   depth x width Zähler für beliebige Paarschlüssel.
+#                   Schätzt nie zu niedrig; mit Wahrscheinlichkeit
+#                   1 - delta höchstens eps * N zu hoch
+#                   (eps = e / width, delta = exp(-depth), N = Summe aller Counts).
+# SpaceSavingTable: pro Artikel höchstens `capacity` überwachte Partner
+#                   (gewichtetes SpaceSaving). Für jeden überwachten
+#                   Partner gilt count - error <= wahrer Count <= count,
+#                   nicht überwachte Partner liegen höchstens bei floor.
+#
+# Der Speicher hängt nur von width/depth bzw. Artikelanzahl x capacity ab,
+# nicht von der Anzahl verschiedener Paare.
+# ---------------------------------------------------------
+
+
+class CountMinSketch:
+    def __init__(self, width: int = 2**20, depth: int = 4, seed: int = 42):
+        if width & (width - 1):
+            raise ValueError("width muss eine Zweierpotenz sein")
+        self.width = width
+        self.depth = depth
+        self.shift = np.uint64(64 - int(np.log2(width)))
+        rng = np.random.default_rng(seed)
+        # Multiply-Shift-Hashing: ungerade 64-bit-Multiplikatoren
+        self.a = rng.integers(1, 2**63, size=depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 2**63, size=depth, dtype=np.uint64)
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def eps(self) -> float:
+        return float(np.e / self.width)
+
+    @property
+    def delta(self) -> float:
+        return float(np.exp(-self.depth))
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes
+
+    def _buckets(self, keys: np.ndarray, row: int) -> np.ndarray:
+        with np.errstate(over="ignore"):
+            return ((keys * self.a[row] + self.b[row]) >> self.shift).astype(np.int64)
+
+    def add(self, keys: np.ndarray, counts: np.ndarray):
+        keys = np.asarray(keys, dtype=np.uint64)
+        counts = np.asarray(counts, dtype=np.int64)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(
+                self._buckets(keys, row), weights=counts, minlength=self.width
+            ).astype(np.int64)
+        self.total += int(counts.sum())
+
+    def query(self, keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.uint64)
+        estimates = [self.table[row][self._buckets(keys, row)] for row in range(self.depth)]
+        return np.min(estimates, axis=0)
+
+
+class SpaceSavingTable:
+    """
+    Gewichtetes SpaceSaving pro Artikel, blockweise aktualisiert:
+    Pro Chunk werden die exakten Chunk-Counts mit der bisherigen
+    Zusammenfassung verschmolzen (neue Partner starten mit floor des
+    Artikels als Fehler) und danach auf `capacity` Partner gekürzt.
+    """
+
+    def __init__(self, n_articles: int, capacity: int = 50):
+        self.capacity = capacity
+        self.floor = np.zeros(n_articles, dtype=np.int64)
+        self.entries = pd.DataFrame({
+            "article": pd.Series(dtype=np.int32),
+            "partner": pd.Series(dtype=np.int32),
+            "count": pd.Series(dtype=np.int64),
+            "error": pd.Series(dtype=np.int64),
+        })
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.floor.nbytes + self.entries.memory_usage(index=False).sum())
+
+    def update(self, article: np.ndarray, partner: np.ndarray, counts: np.ndarray):
+        """article/partner als dichte Codes; jedes (article, partner) höchstens einmal."""
+        new = pd.DataFrame({"article": article, "partner": partner, "chunk_count": counts})
+        df = self.entries.merge(new, on=["article", "partner"], how="outer")
+
+        floor = self.floor[df["article"].to_numpy()]
+        unseen = df["count"].isna().to_numpy()
+        df["count"] = np.where(unseen, floor, df["count"].fillna(0)).astype(np.int64) \
+            + df["chunk_count"].fillna(0).astype(np.int64)
+        df["error"] = np.where(unseen, floor, df["error"].fillna(0)).astype(np.int64)
+
+        df = df.sort_values(["article", "count"], ascending=[True, False])
+        rank = df.groupby("article", sort=False).cumcount().to_numpy()
+        keep = rank < self.capacity
+
+        # Größter verdrängter Count wird zur neuen Untergrenze des Artikels
+        dropped = df[~keep]
+        if len(dropped) > 0:
+            max_dropped = dropped.groupby("article")["count"].max()
+            idx = max_dropped.index.to_numpy()
+            self.floor[idx] = np.maximum(self.floor[idx], max_dropped.to_numpy())
+
+        self.entries = df[keep].drop(columns="chunk_count").reset_index(drop=True)
+
+    def top(self, k: int) -> pd.DataFrame:
+        """Top-k pro Artikel: article, rank, partner, count, error."""
+        df = self.entries.sort_values(["article", "count", "partner"], ascending=[True, False, True])
+        df["rank"] = df.groupby("article", sort=False).cumcount()
+        return df[df["rank"] < k].reset_index(drop=True)
+
+
+def topk_per_article(id_1: np.ndarray, id_2: np.ndarray, counts: np.ndarray, k: int) -> pd.DataFrame:
+    """Exakte Top-k-Partner pro Artikel aus Paar-Arrays (beide Richtungen)."""
+    df = pd.DataFrame({
+        "article_id": np.concatenate([id_1, id_2]),
+        "partner_id": np.concatenate([id_2, id_1]),
+        "count": np.concatenate([counts, counts]),
+    })
+    df = df.sort_values(["article_id", "count", "partner_id"], ascending=[True, False, True])
+    df["rank"] = df.groupby("article_id", sort=False).cumcount()
+    return df[df["rank"] < k].reset_index(drop=True)
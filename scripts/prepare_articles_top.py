@@ -6,18 +6,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_RAW = BASE_DIR / "data_raw"
 DATA_PROCESSED = BASE_DIR / "data_processed"
 DATA_PROCESSED.mkdir(exist_ok=True)
+POPULARITY_FILE = DATA_PROCESSED / "article_popularity.csv"   # erzeugt von scripts/build_article_popularity.py
 
 # Daten laden
 articles = pd.read_csv(DATA_RAW / "articles.csv")
-transactions = pd.read_csv(DATA_RAW / "transactions_train.csv")
+popularity = pd.read_csv(POPULARITY_FILE)
 
 print("Articles:", articles.shape)
-print("Transactions:", transactions.shape)
+print("Verkaufte Artikel:", len(popularity))
 
-# Top 500 meistverkaufte Artikel
-top_ids = transactions["article_id"].value_counts().head(500).index
+# Top 500 meistverkaufte Artikel (bei Gleichstand kleinere article_id zuerst)
+top = popularity.sort_values(["sales", "article_id"], ascending=[False, True], kind="stable").head(500)
 
-articles_top = articles[articles["article_id"].isin(top_ids)].copy()
+# Verkaufsstatistik mitnehmen: demo1 sortiert damit seine Fallbacks
+articles_top = articles.merge(top, on="article_id", how="inner")
 
 # Auf sinnvolle Produktgruppen einschränken
 allowed_groups = ["Garment Upper body", "Trousers", "Shoes", "Outerwear"]
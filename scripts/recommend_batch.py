@@ -0,0 +1,116 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store, outfit_engine)
+
+from article_features import MACRO_DISPLAY_ORDER, load_article_artifact, segment_rankings
+from copurchase_store import CopurchasePartitions, load_topk
+from outfit_engine import COPURCHASE_TOP_K, POOL_SIZE, TOP_N, recommend_batch, score_tables
+
+# ---------------------------------------------------------
+# Outfit-Empfehlungen für viele Basisartikel als JSONL
+# (recommend_batch in outfit_engine.py, gleiche Regeln wie demo9)
+#
+#   python scripts/recommend_batch.py --ids 108775015 108775044
+#   python scripts/recommend_batch.py --ids-file basis.txt --window count_4w --weather Cold --out recs.jsonl
+#   python scripts/recommend_batch.py --all --out data_processed/recommendations.jsonl
+#
+# Eine Zeile pro Basisartikel:
+#   {"article_id": 108775015, "found": true,
+#    "recommendations": {"TOP": {"article_ids": [...], "scores": [...], "copurchase": [...]}, ...}}
+# Nur Ziel-Makros mit Empfehlungen; unbekannte Artikel: found false.
+# Fortschritt geht nach stderr, damit stdout als JSONL weiterverarbeitet
+# werden kann.
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+ARTICLE_STORE_DIR = DATA_PROCESSED / "articles_store"
+COPURCHASE_TOPK_STORE_DIR = DATA_PROCESSED / "copurchase_topk_store"
+COPURCHASE_TOPK_FILE = DATA_PROCESSED / "copurchase_topk.csv"
+
+BATCH_SIZE = 5000
+
+
+def load_copurchase():
+    if (COPURCHASE_TOPK_STORE_DIR / "index.npy").exists():
+        return CopurchasePartitions(COPURCHASE_TOPK_STORE_DIR)
+    if COPURCHASE_TOPK_FILE.exists():
+        return load_topk(COPURCHASE_TOPK_FILE)
+    return None
+
+
+def read_ids(path: Path) -> list:
+    """article_ids aus einer Textdatei (eine pro Zeile, # = Kommentar)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [int(line.split("#")[0]) for line in f if line.split("#")[0].strip()]
+
+
+def to_records(base_ids: np.ndarray, result: dict, article_ids: np.ndarray):
+    for i, base_id in enumerate(base_ids):
+        recommendations = {}
+        for t, macro in enumerate(MACRO_DISPLAY_ORDER):
+            positions = result["positions"][i, t]
+            n = int((positions >= 0).sum())
+            if n == 0:
+                continue
+            recommendations[macro] = {
+                "article_ids": article_ids[positions[:n]].tolist(),
+                "scores": result["scores"][i, t, :n].tolist(),
+                "copurchase": result["copurchase"][i, t, :n].tolist(),
+            }
+        yield {"article_id": int(base_id), "found": bool(result["found"][i]), "recommendations": recommendations}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outfit-Empfehlungen für viele Basisartikel als JSONL.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--ids", nargs="+", type=int, help="Basisartikel")
+    source.add_argument("--ids-file", type=Path, help="Datei mit einer article_id pro Zeile")
+    source.add_argument("--all", action="store_true", help="alle Katalogartikel")
+    parser.add_argument("--macros", nargs="+", choices=MACRO_DISPLAY_ORDER, help="Ziel-Makros (Standard: alle)")
+    parser.add_argument("--window", default="count", help="Co-Purchase-Zeitfenster (count, count_4w, count_3m, score_decay)")
+    parser.add_argument("--weather", choices=["Cold", "Rain", "Snow", "Hot", "Normal"], help="Wetterlage (Standard: aus)")
+    parser.add_argument("--blocked", nargs="+", type=int, default=[], help="nie empfehlen")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--out", default="-", help="Ausgabedatei (Standard: stdout)")
+    args = parser.parse_args()
+
+    if not (ARTICLE_STORE_DIR / "meta.json").exists():
+        sys.exit(f"{ARTICLE_STORE_DIR} fehlt. Bitte zuerst scripts/build_article_features.py ausführen.")
+    df = load_article_artifact(ARTICLE_STORE_DIR)
+    copurchase = load_copurchase()
+    rankings = segment_rankings(df, ["gender", "macro_category"])
+    tables = score_tables(df, args.weather)
+    article_ids = df["article_id"].to_numpy()
+
+    if args.all:
+        base_ids = article_ids
+    else:
+        base_ids = np.asarray(args.ids if args.ids else read_ids(args.ids_file), dtype=np.int64)
+
+    t0 = time.perf_counter()
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    try:
+        for lo in range(0, len(base_ids), args.batch_size):
+            batch = base_ids[lo:lo + args.batch_size]
+            result = recommend_batch(batch, df, copurchase, rankings, args.macros, args.window, args.weather,
+                                     args.blocked, args.top_n, POOL_SIZE, COPURCHASE_TOP_K, tables)
+            for record in to_records(batch, result, article_ids):
+                out.write(json.dumps(record) + "\n")
+            done = lo + len(batch)
+            print(f"{done:,}/{len(base_ids):,} Basisartikel", end="\r", file=sys.stderr, flush=True)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"\nFertig in {time.perf_counter() - t0:.1f} s"
+          + ("" if args.out == "-" else f" | gespeichert unter: {args.out}"), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
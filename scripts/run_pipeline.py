@@ -0,0 +1,393 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Pipeline-Runner für die Skripte in scripts/
+#
+# Kennt die Abhängigkeiten der Stufen und führt nur aus, was sich
+# geändert hat: Pro Stufe wird ein Schlüssel aus
+#   - dem Inhalt des Skripts + aller importierten Projekt-Module
+#     (d. h. auch geänderte Konstanten wie MIN_COUNT),
+#   - den Kommandozeilen-Argumenten,
+#   - dem Inhalt aller Eingabedateien
+# gebildet. Ist der Schlüssel gleich wie beim letzten erfolgreichen Lauf
+# und sind alle Ausgaben vorhanden, wird die Stufe übersprungen.
+# Unabhängige Stufen (z. B. Bilder kopieren und Co-Purchase zählen)
+# laufen parallel.
+#
+#   python scripts/run_pipeline.py                 (alle Stufen)
+#   python scripts/run_pipeline.py topk            (topk + Abhängigkeiten)
+#   python scripts/run_pipeline.py --dry-run
+#   python scripts/run_pipeline.py copurchase --force
+#
+# Bericht pro Stufe (Status, Laufzeit, Zeilen): data_processed/pipeline_report.csv
+# Ausgabe der Skripte:                        data_processed/pipeline_logs/<stufe>.log
+# ---------------------------------------------------------
+BASE_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = BASE_DIR / "scripts"
+STATE_FILE = BASE_DIR / "data_processed" / "pipeline_state.json"
+REPORT_FILE = BASE_DIR / "data_processed" / "pipeline_report.csv"
+LOG_DIR = BASE_DIR / "data_processed" / "pipeline_logs"
+
+# Pfade relativ zu BASE_DIR. Quellbilder (data_raw/images) werden nicht
+# gehasht – bei neuen Bildern die Stufe images mit --force starten.
+# optional_deps: Stufen, deren Ausgabe das Skript nutzt, falls vorhanden.
+# Sie werden nicht automatisch mitgenommen; laufen sie mit (z. B. bei
+# allen Stufen), wird auf sie gewartet, ein Fehler dort blockiert nicht.
+STAGES = {
+    "ingest": {
+        "script": "ingest_transactions.py",
+        "deps": [],
+        "inputs": ["data_raw/transactions_train.csv", "data_raw/articles.csv"],
+        "outputs": ["data_processed/transactions_store/meta.json"],
+    },
+    "articles_filtered": {
+        "script": "build_articles_filtered.py",
+        "deps": [],
+        "inputs": ["data_raw/articles.csv"],
+        "outputs": ["data_processed/articles_filtered.csv"],
+    },
+    "copurchase": {
+        "script": "build_copurchase_incremental.py",
+        "deps": ["ingest", "articles_filtered"],
+        "inputs": ["data_processed/articles_filtered.csv", "data_processed/transactions_store/meta.json"],
+        "outputs": ["data_processed/copurchase_filtered.csv", "data_processed/copurchase_state/pairs.npz"],
+    },
+    "split": {
+        "script": "split_copurchase_into_5.py",
+        "deps": ["copurchase"],
+        "inputs": ["data_processed/copurchase_filtered.csv"],
+        "outputs": ["data_processed/copurchase_parts_5"],
+    },
+    "partitions": {
+        "script": "build_copurchase_partitions.py",
+        "deps": ["copurchase", "articles_filtered"],
+        "inputs": ["data_processed/copurchase_filtered.csv", "data_processed/articles_filtered.csv"],
+        "outputs": ["data_processed/copurchase_store/index.npy"],
+    },
+    "csr": {
+        "script": "build_copurchase_compressed.py",
+        "deps": ["copurchase"],
+        "inputs": ["data_processed/copurchase_filtered.csv"],
+        "outputs": ["data_processed/copurchase_csr.npz"],
+    },
+    "topk": {
+        "script": "build_copurchase_topk.py",
+        "deps": ["copurchase", "articles_filtered"],
+        "inputs": ["data_processed/articles_filtered.csv", "data_processed/copurchase_state/pairs.npz"],
+        "outputs": ["data_processed/copurchase_topk.csv", "data_processed/copurchase_topk_store/meta.json"],
+    },
+    "images": {
+        "script": "copy_images_sample.py",
+        "deps": ["articles_filtered"],
+        "inputs": ["data_processed/articles_filtered.csv"],
+        "outputs": ["images_sample/manifest.csv"],
+    },
+    "thumbnails": {
+        "script": "build_thumbnails.py",
+        "deps": ["images"],
+        "inputs": ["images_sample/manifest.csv"],
+        "outputs": ["images_thumbs/manifest.csv"],
+    },
+    "pack_images": {
+        "script": "pack_images.py",
+        "deps": ["thumbnails"],
+        "inputs": ["images_thumbs/manifest.csv"],
+        "outputs": ["images_packed/grid/index.npy"],
+    },
+    "image_colors": {
+        "script": "build_image_colors.py",
+        "deps": ["images"],
+        "inputs": ["images_sample/manifest.csv"],
+        "outputs": ["data_processed/article_colors.csv"],
+    },
+    "popularity": {
+        "script": "build_article_popularity.py",
+        "deps": ["ingest"],
+        "inputs": ["data_processed/transactions_store/meta.json"],
+        "outputs": ["data_processed/article_popularity.csv"],
+    },
+    "article_features": {
+        "script": "build_article_features.py",
+        # Bildfarben sind optional: ohne Bilder nur aus den CSVs
+        "deps": ["articles_filtered", "popularity"],
+        "optional_deps": ["image_colors"],
+        "inputs": ["data_processed/articles_filtered.csv", "data_processed/article_colors.csv",
+                   "data_processed/article_popularity.csv"],
+        "outputs": ["data_processed/articles_store/meta.json"],
+    },
+    "outfits": {
+        "script": "build_outfit_recommendations.py",
+        "deps": ["article_features", "topk"],
+        # Quellen der beiden Speicher (deren meta.json ändert sich bei neuen Daten nicht)
+        "inputs": ["data_processed/articles_filtered.csv", "data_processed/article_colors.csv",
+                   "data_processed/article_popularity.csv", "data_processed/copurchase_topk.csv"],
+        "outputs": ["data_processed/outfit_store/meta.json"],
+    },
+    "articles_top": {
+        "script": "prepare_articles_top.py",
+        "deps": ["popularity"],
+        "inputs": ["data_raw/articles.csv", "data_processed/article_popularity.csv"],
+        "outputs": ["data_processed/articles_top.csv"],
+    },
+    "copurchase_top": {
+        "script": "build_copurchase_top.py",
+        "deps": ["articles_top"],
+        "inputs": ["data_processed/articles_top.csv", "data_processed/transactions_store/meta.json"],
+        "outputs": ["data_processed/copurchase_top.csv"],
+    },
+}
+
+
+# ---------------- Hashing ----------------
+def file_sha1(path: Path, cache: dict) -> str:
+    """
+    SHA1 des Dateiinhalts. Der Cache (Größe + mtime -> Hash) sorgt dafür,
+    dass große, unveränderte Dateien wie transactions_train.csv nicht bei
+    jedem Lauf neu gelesen werden.
+    """
+    stat = path.stat()
+    key = str(path.relative_to(BASE_DIR))
+    cached = cache.get(key)
+    if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+        return cached["sha1"]
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    cache[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": h.hexdigest()}
+    return cache[key]["sha1"]
+
+
+def local_code_files(script: Path) -> list:
+    """Skript + alle (rekursiv) importierten Module aus scripts/ bzw. dem Projektordner."""
+    found = []
+    todo = [script]
+    while todo:
+        path = todo.pop()
+        if path in found:
+            continue
+        found.append(path)
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for folder in (SCRIPTS_DIR, BASE_DIR):
+                    candidate = folder / f"{name.split('.')[0]}.py"
+                    if candidate.exists():
+                        todo.append(candidate)
+                        break
+    return sorted(found)
+
+
+def stage_key(name: str, args: list, cache: dict) -> str:
+    stage = STAGES[name]
+    h = hashlib.sha1()
+    for path in local_code_files(SCRIPTS_DIR / stage["script"]):
+        h.update(f"code:{path.relative_to(BASE_DIR)}:{file_sha1(path, cache)}".encode())
+    h.update(f"args:{json.dumps(args)}".encode())
+    for rel in stage["inputs"]:
+        path = BASE_DIR / rel
+        digest = file_sha1(path, cache) if path.exists() else "missing"
+        h.update(f"input:{rel}:{digest}".encode())
+    return h.hexdigest()
+
+
+# ---------------- Zeilen für den Bericht ----------------
+def count_output_rows(rel: str):
+    path = BASE_DIR / rel
+    if not path.exists():
+        return None
+    if path.is_dir():
+        return sum(1 for p in path.rglob("*") if p.is_file())
+    if path.suffix == ".csv":
+        with open(path, "rb") as f:
+            return max(sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b"")) - 1, 0)
+    if path.name == "meta.json":
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("n_rows")
+    if path.suffix == ".npy":
+        return len(np.load(path, mmap_mode="r"))
+    if path.suffix == ".npz":
+        with np.load(path) as data:
+            return len(data[data.files[0]])
+    return None
+
+
+# ---------------- Ausführung ----------------
+def load_state() -> dict:
+    if STATE_FILE.exists():
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+
+def save_state(state: dict):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_name(".pipeline_state_tmp.json")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def upstream(name: str, selected: list) -> list:
+    """Vorgänger, auf die name wartet: deps + die mitlaufenden optional_deps."""
+    stage = STAGES[name]
+    return stage["deps"] + [d for d in stage.get("optional_deps", []) if d in selected]
+
+
+def with_dependencies(targets: list) -> list:
+    """Ziel-Stufen + alle (nicht optionalen) Vorgänger, in der Reihenfolge von STAGES."""
+    needed = set()
+    todo = list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in needed:
+            needed.add(name)
+            todo.extend(STAGES[name]["deps"])
+    return [name for name in STAGES if name in needed]
+
+
+def run_stage(name: str, args: list) -> tuple:
+    """Startet das Skript im Projektordner (die Skripte nutzen relative Pfade)."""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    cmd = [sys.executable, str(SCRIPTS_DIR / STAGES[name]["script"])] + args
+    t0 = time.perf_counter()
+    with open(LOG_DIR / f"{name}.log", "w", encoding="utf-8") as log:
+        result = subprocess.run(cmd, cwd=BASE_DIR, stdout=log, stderr=subprocess.STDOUT)
+    return result.returncode, time.perf_counter() - t0
+
+
+def run_pipeline(targets: list, workers: int = 4, force: bool = False,
+                 stage_args: dict = None, dry_run: bool = False) -> pd.DataFrame:
+    stage_args = stage_args or {}
+    selected = with_dependencies(targets)
+    state = load_state()
+    cache = state["files"]
+
+    status = {}        # name -> "run" | "skipped" | "failed" | "blocked"
+    report = {}
+    pending = list(selected)
+    running = {}
+
+    def decide(name):
+        """Schlüssel berechnen und entscheiden, ob die Stufe laufen muss."""
+        args = stage_args.get(name, [])
+        key = stage_key(name, args, cache)
+        last = state["stages"].get(name, {})
+        outputs_ok = all((BASE_DIR / rel).exists() for rel in STAGES[name]["outputs"])
+        return key, force or last.get("key") != key or not outputs_ok
+
+    if dry_run:
+        # Ohne Ausführung: eine Stufe läuft, wenn sich ihr Schlüssel geändert
+        # hat oder ein Vorgänger läuft (dessen Ausgaben sich ändern könnten).
+        for name in selected:
+            _, changed = decide(name)
+            upstream_runs = any(status.get(d) == "run" for d in upstream(name, selected))
+            status[name] = "run" if changed or upstream_runs else "skipped"
+            print(f"{name:<18} {'läuft' if status[name] == 'run' else 'übersprungen'}"
+                  f"{' (Vorgänger läuft)' if upstream_runs and not changed else ''}")
+        save_state(state)
+        return pd.DataFrame()
+
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            # Alle Stufen starten, deren Vorgänger fertig sind
+            for name in list(pending):
+                deps = STAGES[name]["deps"]
+                if any(status.get(d) in ("failed", "blocked") for d in deps):
+                    status[name] = "blocked"
+                    report[name] = {"stage": name, "status": "blocked", "seconds": 0.0}
+                    pending.remove(name)
+                    continue
+                if not all(d in status for d in upstream(name, selected)):
+                    continue
+                pending.remove(name)
+
+                key, must_run = decide(name)
+                if not must_run:
+                    status[name] = "skipped"
+                    report[name] = {"stage": name, "status": "skipped", "seconds": 0.0}
+                    print(f"[{name}] unverändert – übersprungen")
+                    continue
+                print(f"[{name}] gestartet ({STAGES[name]['script']})")
+                running[pool.submit(run_stage, name, stage_args.get(name, []))] = (name, key)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                returncode, seconds = future.result()
+                if returncode == 0:
+                    status[name] = "run"
+                    state["stages"][name] = {
+                        "key": key,
+                        "finished_at": datetime.now().isoformat(timespec="seconds"),
+                        "seconds": round(seconds, 2),
+                    }
+                    save_state(state)
+                    print(f"[{name}] fertig in {seconds:.1f} s")
+                else:
+                    status[name] = "failed"
+                    print(f"[{name}] FEHLER (Exit-Code {returncode}), siehe {LOG_DIR / (name + '.log')}")
+                report[name] = {"stage": name, "status": status[name], "seconds": round(seconds, 2)}
+
+    for name, row in report.items():
+        rows = [count_output_rows(rel) for rel in STAGES[name]["outputs"]]
+        row["rows"] = next((r for r in rows if r is not None), None)
+        row["outputs"] = ";".join(STAGES[name]["outputs"])
+
+    df_report = pd.DataFrame([report[name] for name in selected if name in report])
+    REPORT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    df_report.to_csv(REPORT_FILE, index=False)
+    save_state(state)
+
+    print("\n" + df_report[["stage", "status", "seconds", "rows"]].to_string(index=False))
+    print(f"\nGesamt: {time.perf_counter() - t_start:.1f} s | Bericht: {REPORT_FILE}")
+    return df_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline mit Abhängigkeiten und Hash-basiertem Überspringen.")
+    parser.add_argument("stages", nargs="*",
+                        help=f"Ziel-Stufen (Default: alle), Vorgänger werden mitgenommen: {', '.join(STAGES)}")
+    parser.add_argument("--workers", type=int, default=4, help="parallel laufende Stufen")
+    parser.add_argument("--force", action="store_true", help="ausgewählte Stufen immer ausführen")
+    parser.add_argument("--dry-run", action="store_true", help="nur anzeigen, was laufen würde")
+    parser.add_argument("--topk", type=int, default=None, help="K für die Stufe topk")
+    args = parser.parse_args()
+    unknown = [s for s in args.stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unbekannte Stufe(n): {', '.join(unknown)}")
+
+    stage_args = {}
+    if args.topk is not None:
+        stage_args["topk"] = ["--k", str(args.topk)]
+
+    df_report = run_pipeline(args.stages or list(STAGES), args.workers, args.force, stage_args, args.dry_run)
+    if not df_report.empty and (df_report["status"].isin(["failed", "blocked"])).any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))   # gemeinsame Module der App (article_features, copurchase_store, outfit_engine)
+
+from article_features import MACRO_DISPLAY_ORDER
+from copurchase_store import WINDOW_COLUMNS
+from outfit_engine import OutfitEngine, outfit_payload
+
+# ---------------------------------------------------------
+# Outfit-Empfehlungen als lokale HTTP/JSON-API (ohne Streamlit)
+#
+#   python scripts/serve_outfits.py --port 8008 --workers 4
+#   curl "http://127.0.0.1:8008/outfit/108775015?macros=TOP,SHOES&blocked=123,456"
+#
+#   GET /outfit/{article_id}   Empfehlungen pro Ziel-Makro
+#       gender=Damen           Gender der Segment-Pools (Standard: das der Basis)
+#       macros=TOP,SHOES       Ziel-Makros (Standard: alle)
+#       blocked=1,2,3          nie empfehlen
+#       window=count_4w        Co-Purchase-Zeitfenster (Standard: count)
+#       weather=Cold           Wetterlage (Standard: aus)
+#   GET /health                geladene Daten
+#
+# Die Daten werden einmal geladen (OutfitEngine.from_dir, memmaps) und
+# von allen Anfragen gemeinsam gelesen. Die Event-Loop nimmt nur
+# Verbindungen an und parst HTTP; gerechnet wird in einem Thread-Pool
+# (--workers). Nur Standardbibliothek, lauscht standardmäßig auf
+# 127.0.0.1 und braucht kein Netz (auch für Tests und Lasttests).
+# ---------------------------------------------------------
+DATA_PROCESSED = BASE_DIR / "data_processed"
+
+HOST = "127.0.0.1"
+PORT = 8008
+N_WORKERS = 4
+WEATHER_CONDITIONS = ["Cold", "Rain", "Snow", "Hot", "Normal"]
+MAX_HEADER_LINES = 100
+# Request-Bodies werden nie gebraucht; bis zu dieser Größe gelesen und
+# verworfen (Verbindung bleibt offen), darüber wird die Verbindung geschlossen
+MAX_DRAIN_BYTES = 1 << 20
+READ_TIMEOUT_S = 30
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _list(query: dict, name: str) -> list:
+    """Komma-getrennte Werte aus ?name=a,b&name=c."""
+    return [v for value in query.get(name, []) for v in value.split(",") if v]
+
+
+def parse_outfit_request(engine: OutfitEngine, query: dict) -> dict:
+    """Query-Parameter -> Argumente für OutfitEngine.outfit (400 bei ungültigen Werten)."""
+    request = {}
+    gender = query.get("gender", [None])[-1]
+    if gender is not None:
+        if gender not in {g for g, _ in engine.rankings}:
+            raise RequestError(400, f"unbekanntes gender: {gender}")
+        request["gender"] = gender
+
+    macros = _list(query, "macros")
+    unknown = [m for m in macros if m not in MACRO_DISPLAY_ORDER]
+    if unknown:
+        raise RequestError(400, f"unbekannte macros: {', '.join(unknown)}")
+    request["selected_macros"] = macros or None
+
+    try:
+        request["blocked_ids"] = [int(v) for v in _list(query, "blocked")]
+    except ValueError:
+        raise RequestError(400, "blocked: nur article_ids (Zahlen)")
+
+    request["window"] = query.get("window", ["count"])[-1]
+    if request["window"] not in WINDOW_COLUMNS:
+        raise RequestError(400, f"window: eines von {', '.join(WINDOW_COLUMNS)}")
+
+    request["weather_condition"] = query.get("weather", [None])[-1]
+    if request["weather_condition"] not in WEATHER_CONDITIONS + [None]:
+        raise RequestError(400, f"weather: eines von {', '.join(WEATHER_CONDITIONS)}")
+    return request
+
+
+def handle(engine: OutfitEngine, method: str, target: str):
+    """(Status, JSON-Body) für eine Anfrage; läuft im Thread-Pool."""
+    if method != "GET":
+        raise RequestError(405, "nur GET")
+    url = urlsplit(target)
+    parts = [p for p in url.path.split("/") if p]
+
+    if parts == ["health"]:
+        return 200, {"articles": len(engine.df), "copurchase": engine.copurchase is not None,
+                     "precomputed": engine.store is not None}
+
+    if len(parts) == 2 and parts[0] == "outfit":
+        try:
+            article_id = int(parts[1])
+        except ValueError:
+            raise RequestError(400, f"article_id ist keine Zahl: {parts[1]}")
+        request = parse_outfit_request(engine, parse_qs(url.query))
+        outfit = engine.outfit(article_id, **request)
+        if outfit is None:
+            raise RequestError(404, f"Artikel {article_id} nicht im Katalog")
+        return 200, {"article_id": article_id, "outfit": outfit_payload(outfit)}
+
+    raise RequestError(404, f"unbekannter Pfad: {url.path}")
+
+
+async def read_request(reader: asyncio.StreamReader):
+    """(Methode, Ziel, Version, Header) oder None, wenn der Client die Verbindung schließt."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(400, "ungültige Anfragezeile")
+    headers = {}
+    for _ in range(MAX_HEADER_LINES):
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, sep, value = line.decode("latin-1").partition(":")
+        if not sep or not name.strip() or name != name.strip():
+            raise RequestError(400, f"ungültige Header-Zeile: {line[:100]!r}")
+        headers[name.lower()] = value.strip()
+    else:
+        raise RequestError(400, "zu viele Header")
+    try:
+        content_length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise RequestError(400, "ungültige Content-Length")
+    if content_length < 0:
+        raise RequestError(400, "ungültige Content-Length")
+    return method, target, version, headers
+
+
+def response_bytes(status: int, body: dict, keep_alive: bool) -> bytes:
+    data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + data
+
+
+def make_handler(engine: OutfitEngine, pool: ThreadPoolExecutor):
+    loop = asyncio.get_running_loop()
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # HTTP/1.1 keep-alive: mehrere Anfragen nacheinander auf einer Verbindung
+        keep_alive = True
+        try:
+            while keep_alive:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), READ_TIMEOUT_S)
+                except RequestError as e:
+                    writer.write(response_bytes(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, version, headers = request
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+                # Body (z. B. bei POST) überspringen, damit er nicht als nächste
+                # Anfrage gelesen wird; chunked oder zu groß: danach schließen
+                content_length = int(headers.get("content-length", 0))
+                if "transfer-encoding" in headers or content_length > MAX_DRAIN_BYTES:
+                    keep_alive = False
+                elif content_length:
+                    await asyncio.wait_for(reader.readexactly(content_length), READ_TIMEOUT_S)
+                try:
+                    status, body = await loop.run_in_executor(pool, handle, engine, method, target)
+                except RequestError as e:
+                    status, body = e.status, {"error": str(e)}
+                except Exception as e:
+                    print(f"Fehler bei {method} {target}: {e!r}", file=sys.stderr)
+                    status, body = 500, {"error": "interner Fehler"}
+                writer.write(response_bytes(status, body, keep_alive))
+                await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return handle_connection
+
+
+async def serve(engine: OutfitEngine, host: str, port: int, workers: int):
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outfit") as pool:
+        server = await asyncio.start_server(make_handler(engine, pool), host, port)
+        address = server.sockets[0].getsockname()
+        # Zeile wird von scripts/benchmark_service.py gelesen (Port bei --port 0)
+        print(f"Bereit: http://{address[0]}:{address[1]} | Worker: {workers}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outfit-Empfehlungen als lokale HTTP/JSON-API.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT, help="0 = freien Port wählen")
+    parser.add_argument("--workers", type=int, default=N_WORKERS, help="Threads für die Empfehlungen")
+    parser.add_argument("--data-dir", type=Path, default=DATA_PROCESSED)
+    args = parser.parse_args()
+
+    if not (args.data_dir / "articles_store" / "meta.json").exists():
+        sys.exit(f"{args.data_dir / 'articles_store'} fehlt. Bitte zuerst scripts/build_article_features.py ausführen.")
+    t0 = time.perf_counter()
+    engine = OutfitEngine.from_dir(args.data_dir)
+    print(f"Artikel: {len(engine.df):,} | Co-Purchase: {'ja' if engine.copurchase is not None else 'nein'} | "
+          f"vorberechnet: {'ja' if engine.store is not None else 'nein'} | "
+          f"geladen in {time.perf_counter() - t0:.1f} s", flush=True)
+    try:
+        asyncio.run(serve(engine, args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        print("\nBeendet.")
+
+
+if __name__ == "__main__":
+    main()
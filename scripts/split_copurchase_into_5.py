@@ -2,6 +2,9 @@ import pandas as pd
 from pathlib import Path
 import math
 
+# Nur noch für demo2–demo8. demo9 liest den nach Artikel partitionierten
+# Speicher aus scripts/build_copurchase_partitions.py.
+
 # Pfad zur großen Datei
 INPUT = Path("data_processed/copurchase_filtered.csv")
 
@@ -0,0 +1,223 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# Spaltenbasierter, integer-kodierter Transaktions-Speicher
+#
+# Layout (ein Ordner, z. B. data_processed/transactions_store/):
+#   meta.json              Zeilenanzahl, Spalten + dtypes, Row-Groups mit min/max t_dat
+#   customer_code.bin      uint32  Dictionary-Code von customer_id
+#   t_dat.bin              int16   Tage seit 1970-01-01
+#   article_idx.bin        int32   dichter Artikel-Index (Position in article_ids.npy)
+#   price.bin              float32
+#   sales_channel_id.bin   int8
+#   customer_ids.npy       Dictionary: customer_code -> customer_id (64 Zeichen Hex)
+#   article_ids.npy        Dictionary: article_idx -> article_id
+#
+# Jede Spalte ist eine rohe Binärdatei und wird per np.memmap geöffnet,
+# d. h. ein Skript liest wirklich nur die Spalten, die es braucht.
+# Datumsfilter werden über die min/max-Statistik der Row-Groups
+# "heruntergedrückt": Row-Groups außerhalb des Zeitraums werden gar
+# nicht erst angefasst.
+# ---------------------------------------------------------
+
+STORE_COLUMNS = {
+    "customer_code": "uint32",
+    "t_dat": "int16",
+    "article_idx": "int32",
+    "price": "float32",
+    "sales_channel_id": "int8",
+}
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def date_to_day(value) -> int:
+    """'2019-06-01' (oder datetime) -> Tage seit 1970-01-01."""
+    return int((np.datetime64(pd.Timestamp(value).date(), "D") - EPOCH).astype(int))
+
+
+def day_to_date(day: int) -> str:
+    """Tage seit 1970-01-01 -> 'YYYY-MM-DD'."""
+    return str(EPOCH + np.timedelta64(int(day), "D"))
+
+
+class TransactionStore:
+    """
+    Lesezugriff auf den Transaktions-Speicher.
+
+    Beispiel:
+        store = TransactionStore("data_processed/transactions_store")
+        for chunk in store.iter_chunks(["customer_code", "t_dat", "article_idx"],
+                                       date_from="2019-06-01"):
+            ...
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        meta_path = self.store_dir / "meta.json"
+        if not meta_path.exists():
+            raise FileNotFoundError(
+                f"Kein Transaktions-Speicher gefunden unter {self.store_dir}. "
+                f"Bitte zuerst scripts/ingest_transactions.py ausführen."
+            )
+        with open(meta_path, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.n_rows = int(self.meta["n_rows"])
+        self._article_ids = None
+        self._customer_ids = None
+
+    @property
+    def t_dat_max(self):
+        """Letzter Verkaufstag im Speicher (Tage seit 1970-01-01), None wenn leer."""
+        return max((rg["t_dat_max"] for rg in self.meta["row_groups"]), default=None)
+
+    # ---------------- Dictionaries ----------------
+    @property
+    def article_ids(self) -> np.ndarray:
+        """article_idx -> article_id"""
+        if self._article_ids is None:
+            self._article_ids = np.load(self.store_dir / "article_ids.npy")
+        return self._article_ids
+
+    @property
+    def customer_ids(self) -> np.ndarray:
+        """customer_code -> customer_id (bytes)"""
+        if self._customer_ids is None:
+            self._customer_ids = np.load(self.store_dir / "customer_ids.npy", mmap_mode="r")
+        return self._customer_ids
+
+    def article_index_lookup(self, article_ids) -> np.ndarray:
+        """
+        Übersetzt article_ids in article_idx des Speichers.
+        Artikel, die nie verkauft wurden (nicht im Dictionary), bekommen -1.
+        """
+        return pd.Index(self.article_ids).get_indexer(np.asarray(article_ids, dtype=np.int64))
+
+    # ---------------- Spalten ----------------
+    def column(self, name: str) -> np.ndarray:
+        """Öffnet eine Spalte als read-only memmap (kein Einlesen in den RAM)."""
+        dtype = self.meta["columns"][name]
+        if self.n_rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.store_dir / f"{name}.bin", dtype=dtype, mode="r", shape=(self.n_rows,))
+
+    def row_ranges(self, date_from=None, date_to=None) -> list:
+        """
+        Liefert die (start, stop)-Zeilenbereiche aller Row-Groups, deren
+        t_dat-Spanne den Zeitraum [date_from, date_to] überlappt.
+        """
+        day_from = date_to_day(date_from) if date_from is not None else None
+        day_to = date_to_day(date_to) if date_to is not None else None
+
+        ranges = []
+        for rg in self.meta["row_groups"]:
+            if day_from is not None and rg["t_dat_max"] < day_from:
+                continue
+            if day_to is not None and rg["t_dat_min"] > day_to:
+                continue
+            # Benachbarte Row-Groups zu einem Bereich zusammenfassen
+            if ranges and ranges[-1][1] == rg["start"]:
+                ranges[-1] = (ranges[-1][0], rg["stop"])
+            else:
+                ranges.append((rg["start"], rg["stop"]))
+        return ranges
+
+    def iter_chunks(self, columns: list, chunk_rows: int = 1_000_000,
+                    date_from=None, date_to=None):
+        """
+        Iteriert in Chunks von höchstens chunk_rows Zeilen über die
+        gewünschten Spalten. Gibt dicts {spalte: np.ndarray} zurück;
+        der Datumsfilter ist innerhalb der Row-Groups exakt.
+
+        chunk_rows darf auch eine Funktion ohne Argumente sein, die vor
+        jedem Chunk die gewünschte Größe liefert (adaptive Chunk-Größe).
+        """
+        next_chunk_rows = chunk_rows if callable(chunk_rows) else (lambda: chunk_rows)
+
+        day_from = date_to_day(date_from) if date_from is not None else None
+        day_to = date_to_day(date_to) if date_to is not None else None
+        need_t_dat = day_from is not None or day_to is not None
+
+        cols = {c: self.column(c) for c in columns}
+        t_dat_col = self.column("t_dat") if need_t_dat else None
+
+        for start, stop in self.row_ranges(date_from, date_to):
+            chunk_start = start
+            while chunk_start < stop:
+                chunk_stop = min(chunk_start + max(1, int(next_chunk_rows())), stop)
+                chunk = {c: np.asarray(col[chunk_start:chunk_stop]) for c, col in cols.items()}
+
+                if need_t_dat:
+                    t_dat = np.asarray(t_dat_col[chunk_start:chunk_stop])
+                    mask = np.ones(len(t_dat), dtype=bool)
+                    if day_from is not None:
+                        mask &= t_dat >= day_from
+                    if day_to is not None:
+                        mask &= t_dat <= day_to
+                    if not mask.all():
+                        chunk = {c: arr[mask] for c, arr in chunk.items()}
+
+                chunk_start = chunk_stop
+                if len(next(iter(chunk.values()), [])) == 0:
+                    continue
+                yield chunk
+
+    def iter_basket_chunks(self, columns: list, chunk_rows: int = 1_000_000,
+                           date_from=None, date_to=None):
+        """
+        Wie iter_chunks, liefert aber nur vollständige Warenkörbe.
+
+        Ein Warenkorb ist (Kunde, t_dat). Da die Transaktionen nach t_dat
+        sortiert vorliegen (wie transactions_train.csv), kann ein Korb nur
+        am Ende eines Chunks abgeschnitten sein – und zwar nur am letzten
+        Tag. Diese Zeilen werden in den nächsten Chunk übernommen. Dadurch
+        ändert die Chunk-Größe nur Speicherbedarf/Durchsatz, nie das Ergebnis.
+        Ein Chunk kann so größer als chunk_rows werden (höchstens um einen Tag).
+        """
+        read_cols = list(dict.fromkeys(list(columns) + ["t_dat"]))
+        carry = None
+        last_day = None
+
+        for chunk in self.iter_chunks(read_cols, chunk_rows, date_from, date_to):
+            t_dat = chunk["t_dat"]
+            # Sortierung prüfen (innerhalb des Chunks und zum vorherigen Chunk)
+            if np.any(t_dat[1:] < t_dat[:-1]) or (last_day is not None and t_dat[0] < last_day):
+                raise ValueError(
+                    "Transaktionen sind nicht nach t_dat sortiert – ein "
+                    "warenkorbsicheres Lesen in Chunks ist so nicht möglich. "
+                    "Bitte die CSV vor dem Ingest nach t_dat sortieren."
+                )
+            last_day = t_dat[-1]
+
+            if carry is not None:
+                chunk = {c: np.concatenate([carry[c], chunk[c]]) for c in read_cols}
+                t_dat = chunk["t_dat"]
+
+            # Alles ab dem ersten Vorkommen des letzten Tages zurückhalten
+            cut = int(np.searchsorted(t_dat, t_dat[-1], side="left"))
+            carry = {c: arr[cut:] for c, arr in chunk.items()}
+            if cut > 0:
+                yield {c: arr[:cut] for c, arr in chunk.items()}
+
+        if carry is not None and len(carry["t_dat"]) > 0:
+            yield carry
+
+    def read(self, columns: list, date_from=None, date_to=None) -> dict:
+        """Liest die gewünschten Spalten (gefiltert) komplett in den RAM."""
+        parts = {c: [] for c in columns}
+        for chunk in self.iter_chunks(columns, date_from=date_from, date_to=date_to):
+            for c in columns:
+                parts[c].append(chunk[c])
+        dtypes = self.meta["columns"]
+        return {
+            c: np.concatenate(p) if p else np.empty(0, dtype=dtypes[c])
+            for c, p in parts.items()
+        }
+
+    def n_rows_in_range(self, date_from=None, date_to=None) -> int:
+        """Obergrenze der Zeilen, die ein gefilterter Scan anfasst (für Fortschrittsanzeigen)."""
+        return sum(stop - start for start, stop in self.row_ranges(date_from, date_to))